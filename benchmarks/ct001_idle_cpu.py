@@ -0,0 +1,100 @@
+"""
+Measure CPU used by the CT001 emulator while serving idle TCP clients.
+
+Starts a CT001 in this process, connects N clients from a separate process
+and reports the CPU time the emulator process consumed per wall-clock second.
+
+    python -m benchmarks.ct001_idle_cpu --clients 50 --poll-interval 1
+"""
+
+import argparse
+import multiprocessing
+import os
+import selectors
+import socket
+import sys
+import time
+
+from ct001 import CT001
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("", 0))
+        return sock.getsockname()[1]
+
+
+def _run_clients(port, clients, duration, ready):
+    selector = selectors.DefaultSelector()
+    sockets = []
+    for _ in range(clients):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(b"hello")
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+        sockets.append(sock)
+    ready.set()
+
+    frames = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        for key, _ in selector.select(timeout=0.1):
+            try:
+                if key.fileobj.recv(4096):
+                    frames += 1
+            except BlockingIOError:
+                pass
+    for sock in sockets:
+        sock.close()
+    print(f"clients received {frames} frames")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--hook",
+        action="store_true",
+        help="set values from a before_send hook like main.py does",
+    )
+    args = parser.parse_args()
+
+    port = _free_port()
+    device = CT001(udp_port=port, tcp_port=port, poll_interval=args.poll_interval)
+    device.value = [100, 200, 300]
+    if args.hook:
+
+        def update_readings(addr):
+            device.value = [100, 200, 300]
+
+        device.before_send = update_readings
+    device.start()
+    time.sleep(0.5)
+
+    ready = multiprocessing.Event()
+    client_process = multiprocessing.Process(
+        target=_run_clients, args=(port, args.clients, args.duration + 2, ready)
+    )
+    client_process.start()
+    ready.wait()
+    time.sleep(1)
+
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    time.sleep(args.duration)
+    cpu = time.process_time() - cpu_start
+    wall = time.monotonic() - wall_start
+
+    print(
+        f"{args.clients} clients, poll interval {args.poll_interval}s: "
+        f"{cpu * 1000 / wall:.1f} ms CPU per second ({cpu / wall:.2%} of one core)"
+    )
+    client_process.join()
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Measure the per-message cost of extracting values with JSONPath.
+
+Compares parsing the expression on every message (the previous behaviour
+of the MQTT and JSON HTTP powermeters) with paths compiled once, for a
+single value and for three phase values sharing a prefix. The payload is
+decoded once up front, so only the extraction itself is measured.
+
+    python -m benchmarks.json_path --messages 20000
+"""
+
+import argparse
+import json
+import time
+
+from jsonpath_ng import parse
+
+import config  # noqa: F401  (resolves the powermeter <-> config import cycle)
+from powermeter.json_path import JsonPath, JsonPaths
+
+PAYLOAD = json.dumps(
+    {
+        "Time": "2024-01-01T00:00:00",
+        "StatusSNS": {
+            "ENERGY": {
+                "Total": 1234.5,
+                "Power": [120.5, -30.25, 75],
+                "Voltage": [230, 231, 229],
+            }
+        },
+    }
+)
+SINGLE = ["$.StatusSNS.ENERGY.Total"]
+PHASES = [f"$.StatusSNS.ENERGY.Power[{phase}]" for phase in range(3)]
+
+
+def parse_per_message(paths):
+    def extract(data):
+        return [float(parse(path).find(data)[0].value) for path in paths]
+
+    return extract
+
+
+def compiled_jsonpath_ng(paths):
+    expressions = [parse(path) for path in paths]
+
+    def extract(data):
+        return [float(expression.find(data)[0].value) for expression in expressions]
+
+    return extract
+
+
+def compiled(paths):
+    if len(paths) == 1:
+        path = JsonPath(paths[0])
+        return lambda data: [path.extract(data)]
+    return JsonPaths(paths).extract
+
+
+def measure(extract, messages):
+    data = json.loads(PAYLOAD)
+    start = time.process_time()
+    for _ in range(messages):
+        extract(data)
+    return (time.process_time() - start) * 1e6 / messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    for name, paths in (("1 path", SINGLE), ("3 phase paths", PHASES)):
+        for variant in (parse_per_message, compiled_jsonpath_ng, compiled):
+            cost = measure(variant(paths), args.messages)
+            print(f"{name}, {variant.__name__}: {cost:.2f} us CPU per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measure the per-request CPU cost of the Shelly emulator's request handler.
+
+Requests are passed straight to the handler with a static powermeter and a
+socket stub, so the numbers isolate parsing, response rendering and
+serialization from networking and upstream latency.
+
+    python -m benchmarks.shelly_response --requests 100000
+"""
+
+import argparse
+import json
+import time
+from ipaddress import IPv4Network
+
+from config import ClientFilter
+from powermeter import Powermeter
+from shelly import Shelly
+
+
+class _StaticPowermeter(Powermeter):
+    def get_powermeter_watts(self):
+        return [123.4, -56.0, 78.9]
+
+
+class _NullSocket:
+    def __init__(self):
+        self.sent = 0
+
+    def sendto(self, data, addr):
+        self.sent += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+
+    client_filter = ClientFilter([IPv4Network("0.0.0.0/0")])
+    shelly = Shelly(
+        [(_StaticPowermeter(), client_filter)], udp_port=0, device_id="bench"
+    )
+    sock = _NullSocket()
+    addr = ("192.168.1.50", 40000)
+
+    for method in ("EM.GetStatus", "EM1.GetStatus"):
+        requests = [
+            json.dumps(
+                {"id": i, "src": "bench", "method": method, "params": {"id": 0}},
+                separators=(",", ":"),
+            ).encode()
+            for i in range(1000)
+        ]
+        start = time.process_time()
+        for i in range(args.requests):
+            shelly._handle_request(sock, requests[i % 1000], addr)
+        elapsed = time.process_time() - start
+        print(
+            f"{method}: {elapsed * 1e6 / args.requests:.2f} us CPU per request "
+            f"({args.requests / elapsed:.0f} requests/s)"
+        )
+    assert sock.sent == 2 * args.requests
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Flood the UDP emulators and report how many requests per second they answer.
+
+A separate process sends requests as fast as it can and counts the replies,
+so the number is the end-to-end throughput of the receive path. With
+``--trace-memory`` the emulator process runs under tracemalloc and the peak
+traced memory during the flood is reported as well.
+
+    python -m benchmarks.udp_flood ct001
+    python -m benchmarks.udp_flood shelly --trace-memory
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from ipaddress import IPv4Network
+
+from config import ClientFilter
+from ct001 import CT001
+from powermeter import Powermeter
+from shelly import Shelly
+
+
+class _StaticPowermeter(Powermeter):
+    def get_powermeter_watts(self):
+        return [100.0, 200.0, 300.0]
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("", 0))
+        return sock.getsockname()[1]
+
+
+def _flood(port, payload, duration, result):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    sock.settimeout(0.5)
+    replies = 0
+    sending = True
+
+    def receive():
+        nonlocal replies
+        while True:
+            try:
+                sock.recv(2048)
+                replies += 1
+            except socket.timeout:
+                if not sending:
+                    return
+
+    receiver = threading.Thread(target=receive)
+    receiver.start()
+    sent = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        for _ in range(64):
+            sock.sendto(payload, ("127.0.0.1", port))
+        sent += 64
+        # Leave the receiver some room, the loopback queue is small
+        time.sleep(0.0005)
+    sending = False
+    receiver.join()
+    result.put((sent, replies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("device", choices=["ct001", "shelly"])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--trace-memory", action="store_true")
+    args = parser.parse_args()
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    port = _free_port()
+    if args.device == "ct001":
+        # A zero dedupe window answers every "hame", so replies count requests
+        device = CT001(udp_port=port, tcp_port=_free_port(), dedupe_time_window=0)
+        payload = b"hame"
+    else:
+        client_filter = ClientFilter([IPv4Network("127.0.0.1/32")])
+        device = Shelly(
+            [(_StaticPowermeter(), client_filter)], udp_port=port, device_id="bench"
+        )
+        payload = json.dumps(
+            {"id": 1, "src": "bench", "method": "EM.GetStatus", "params": {"id": 0}}
+        ).encode()
+    device.start()
+    time.sleep(0.5)
+
+    if args.trace_memory:
+        tracemalloc.clear_traces()
+        baseline = tracemalloc.get_traced_memory()[0]
+    result = multiprocessing.Queue()
+    flood = multiprocessing.Process(
+        target=_flood, args=(port, payload, args.duration, result)
+    )
+    flood.start()
+    sent, replies = result.get()
+    flood.join()
+
+    print(
+        f"{args.device}: sent {sent}, answered {replies} "
+        f"({replies / args.duration:.0f} requests/s, {replies / sent:.1%})"
+    )
+    if args.trace_memory:
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        print(f"{args.device}: peak traced memory during flood {peak / 1024:.1f} KiB")
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
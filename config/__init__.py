@@ -1,2 +1,6 @@
-from .config_loader import read_all_powermeter_configs, ClientFilter
+from .config_loader import (
+    read_all_powermeter_configs,
+    ClientFilter,
+    PowermeterResolver,
+)
 from .logger import setLogLevel, logger
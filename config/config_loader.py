@@ -1,6 +1,10 @@
 import configparser
+import heapq
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
 from ipaddress import IPv4Network, IPv4Address
-from typing import List, Union, Tuple
+from typing import Dict, List, Optional, Union, Tuple
 from config.logger import logger
 
 from powermeter import (
@@ -15,15 +19,23 @@ from powermeter import (
     Emlog,
     IoBroker,
     HomeAssistant,
+    HomeAssistantWebSocket,
     VZLogger,
     AmisReader,
     ModbusPowermeter,
+    ModbusMultiPowermeter,
+    RegisterPoint,
     MqttPowermeter,
     Script,
     ESPHome,
     JsonHttpPowermeter,
     TQEnergyManager,
     ThrottledPowermeter,
+    SingleFlightPowermeter,
+    BackgroundPolledPowermeter,
+    CircuitBreakerPowermeter,
+    CompositePowermeter,
+    HedgedPowermeter,
 )
 
 SHELLY_SECTION = "SHELLY"
@@ -36,9 +48,12 @@ VZLOGGER_SECTION = "VZLOGGER"
 SCRIPT_SECTION = "SCRIPT"
 ESPHOME_SECTION = "ESPHOME"
 AMIS_READER_SECTION = "AMIS_READER"
+MODBUS_MULTI_SECTION = "MODBUS_MULTI"
 MODBUS_SECTION = "MODBUS"
 JSON_HTTP_SECTION = "JSON_HTTP"
 TQ_EM_SECTION = "TQ_EM"
+COMPOSITE_SECTION = "COMPOSITE"
+FAILOVER_SECTION = "FAILOVER"
 
 
 class ClientFilter:
@@ -56,37 +71,262 @@ class ClientFilter:
             return False
 
 
+class PowermeterResolver:
+    """
+    Resolves a client IP to the first powermeter whose ClientFilter matches.
+
+    All netmasks are compiled into sorted, non-overlapping integer ranges
+    that each carry the index of the first matching powermeter, so a new
+    client is resolved with a binary search. Results are memoized per
+    client IP in a bounded LRU cache, making repeat lookups O(1).
+    """
+
+    def __init__(
+        self,
+        powermeters: List[Tuple[Powermeter, ClientFilter]],
+        cache_size: int = 1024,
+    ):
+        self.powermeters = powermeters
+        self.cache_size = cache_size
+        self._starts, self._ends, self._indexes = self._compile(powermeters)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _compile(powermeters):
+        intervals = sorted(
+            (
+                int(netmask.network_address),
+                int(netmask.broadcast_address),
+                index,
+            )
+            for index, (_, client_filter) in enumerate(powermeters)
+            for netmask in client_filter.netmasks
+        )
+        boundaries = sorted(
+            {start for start, _, _ in intervals} | {end + 1 for _, end, _ in intervals}
+        )
+
+        starts, ends, indexes = [], [], []
+        active = []  # heap of (index, end) for intervals covering the sweep
+        position = 0
+        for segment_start, next_boundary in zip(boundaries, boundaries[1:]):
+            while position < len(intervals) and intervals[position][0] == segment_start:
+                _, end, index = intervals[position]
+                heapq.heappush(active, (index, end))
+                position += 1
+            while active and active[0][1] < segment_start:
+                heapq.heappop(active)
+            if not active:
+                continue
+            index = active[0][0]
+            segment_end = next_boundary - 1
+            if indexes and indexes[-1] == index and ends[-1] + 1 == segment_start:
+                ends[-1] = segment_end
+            else:
+                starts.append(segment_start)
+                ends.append(segment_end)
+                indexes.append(index)
+        return starts, ends, indexes
+
+    def index(self, client_ip) -> Optional[int]:
+        """Index into ``powermeters`` serving ``client_ip``, or None."""
+        with self._lock:
+            if client_ip in self._cache:
+                self._cache.move_to_end(client_ip)
+                return self._cache[client_ip]
+
+        try:
+            address = int(IPv4Address(client_ip))
+        except ValueError as e:
+            logger.error(f"Error: {e}")
+            return None
+
+        position = bisect_right(self._starts, address) - 1
+        if position >= 0 and address <= self._ends[position]:
+            index = self._indexes[position]
+        else:
+            index = None
+
+        with self._lock:
+            self._cache[client_ip] = index
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return index
+
+    def resolve(self, client_ip) -> Optional[Powermeter]:
+        """Powermeter serving ``client_ip``, or None."""
+        index = self.index(client_ip)
+        return None if index is None else self.powermeters[index][0]
+
+
 def read_all_powermeter_configs(
     config: configparser.ConfigParser,
 ) -> List[Tuple[Powermeter, ClientFilter]]:
-    powermeters = []
-    global_throttle_interval = config.getfloat(
-        "GENERAL", "THROTTLE_INTERVAL", fallback=0.0
-    )
+    # Sections combined by a composite or failover section are only read
+    # through it, so the global rate limits apply to the combining section
+    # alone instead of once per level.
+    referenced = set()
+    for section in config.sections():
+        if section.startswith((COMPOSITE_SECTION, FAILOVER_SECTION)):
+            referenced.update(composite_source_names(section, config))
 
+    sources = {}
     for section in config.sections():
         powermeter = create_powermeter(section, config)
         if powermeter is not None:
-            section_throttle_interval = config.getfloat(
-                section, "THROTTLE_INTERVAL", fallback=global_throttle_interval
+            sources[section] = wrap_powermeter(
+                section, config, powermeter, top_level=section not in referenced
             )
 
-            if section_throttle_interval > 0:
-                throttle_source = (
-                    "section-specific"
-                    if config.has_option(section, "THROTTLE_INTERVAL")
-                    else "global"
-                )
-                print(
-                    f"Applying {throttle_source} throttling ({section_throttle_interval}s) to {section}"
-                )
-                powermeter = ThrottledPowermeter(powermeter, section_throttle_interval)
+    # Combining sections may refer to combining sections defined above them
+    combined = {}
+    for section in config.sections():
+        if section.startswith(COMPOSITE_SECTION):
+            create = create_composite_powermeter
+        elif section.startswith(FAILOVER_SECTION):
+            create = create_failover_powermeter
+        else:
+            continue
+        powermeter = create(section, config, {**sources, **combined})
+        combined[section] = wrap_powermeter(
+            section, config, powermeter, top_level=section not in referenced
+        )
 
-            client_filter = create_client_filter(section, config)
-            powermeters.append((powermeter, client_filter))
+    powermeters = []
+    for section in config.sections():
+        powermeter = combined.get(section) or sources.get(section)
+        if powermeter is None or section in referenced:
+            continue
+        client_filter = create_client_filter(section, config)
+        powermeters.append((powermeter, client_filter))
     return powermeters
 
 
+def wrap_powermeter(
+    section: str,
+    config: configparser.ConfigParser,
+    powermeter: Powermeter,
+    top_level: bool = True,
+) -> Powermeter:
+    """
+    Apply the per-section timeout, failure handling and rate limiting.
+
+    The global ``THROTTLE_INTERVAL`` and ``BACKGROUND_POLL_INTERVAL`` only
+    apply to ``top_level`` sections; sources of a composite or failover
+    section are rate limited only if their own section says so.
+    """
+    rate_limits = "GENERAL" if top_level else section
+    if config.has_option(section, "TIMEOUT"):
+        powermeter.timeout = config.getfloat(section, "TIMEOUT")
+
+    failure_threshold = config.getint(
+        section,
+        "CIRCUIT_BREAKER_THRESHOLD",
+        fallback=config.getint("GENERAL", "CIRCUIT_BREAKER_THRESHOLD", fallback=3),
+    )
+    # Push sources are not contacted per request, nothing to protect. The
+    # sources of combining sections are already guarded individually.
+    if (
+        failure_threshold > 0
+        and not powermeter.supports_subscribe()
+        and not isinstance(powermeter, (CompositePowermeter, HedgedPowermeter))
+    ):
+        powermeter = CircuitBreakerPowermeter(
+            powermeter,
+            failure_threshold,
+            max_delay=config.getfloat(
+                section,
+                "CIRCUIT_BREAKER_MAX_BACKOFF",
+                fallback=config.getfloat(
+                    "GENERAL", "CIRCUIT_BREAKER_MAX_BACKOFF", fallback=60.0
+                ),
+            ),
+        )
+
+    section_throttle_interval = config.getfloat(
+        section,
+        "THROTTLE_INTERVAL",
+        fallback=config.getfloat(rate_limits, "THROTTLE_INTERVAL", fallback=0.0),
+    )
+
+    if section_throttle_interval > 0:
+        throttle_source = (
+            "section-specific"
+            if config.has_option(section, "THROTTLE_INTERVAL")
+            else "global"
+        )
+        print(
+            f"Applying {throttle_source} throttling ({section_throttle_interval}s) to {section}"
+        )
+        powermeter = ThrottledPowermeter(powermeter, section_throttle_interval)
+
+    poll_interval = config.getfloat(
+        section,
+        "BACKGROUND_POLL_INTERVAL",
+        fallback=config.getfloat(rate_limits, "BACKGROUND_POLL_INTERVAL", fallback=0.0),
+    )
+    if poll_interval > 0:
+        max_staleness = config.getfloat(
+            section,
+            "MAX_STALENESS",
+            fallback=config.getfloat("GENERAL", "MAX_STALENESS", fallback=10.0),
+        )
+        logger.info(
+            f"Polling {section} in the background every {poll_interval}s "
+            f"(max staleness {max_staleness}s)"
+        )
+        powermeter = BackgroundPolledPowermeter(
+            powermeter, poll_interval, max_staleness
+        )
+
+    # Concurrent requests (several storages, several emulated ports)
+    # share one in-flight fetch instead of hitting the source N times
+    return SingleFlightPowermeter(powermeter)
+
+
+def composite_source_names(
+    section: str, config: configparser.ConfigParser
+) -> List[str]:
+    sources = config.get(section, "SOURCES", fallback="").split(",")
+    return [source.strip() for source in sources if source.strip()]
+
+
+def resolve_source_sections(
+    section: str, config: configparser.ConfigParser, sources: Dict[str, Powermeter]
+) -> List[Powermeter]:
+    names = composite_source_names(section, config)
+    if not names:
+        raise ValueError(f"{section}: SOURCES must list at least one section")
+    unknown = [name for name in names if name not in sources]
+    if unknown:
+        raise ValueError(
+            f"{section}: unknown powermeter section(s) in SOURCES: {', '.join(unknown)}"
+        )
+    return [sources[name] for name in names]
+
+
+def create_composite_powermeter(
+    section: str, config: configparser.ConfigParser, sources: Dict[str, Powermeter]
+) -> Powermeter:
+    return CompositePowermeter(
+        resolve_source_sections(section, config, sources),
+        config.get(section, "MODE", fallback=CompositePowermeter.SUM),
+    )
+
+
+def create_failover_powermeter(
+    section: str, config: configparser.ConfigParser, sources: Dict[str, Powermeter]
+) -> Powermeter:
+    max_deviation = config.get(section, "MAX_DEVIATION", fallback=None)
+    return HedgedPowermeter(
+        resolve_source_sections(section, config, sources),
+        percentile=config.getfloat(section, "HEDGE_PERCENTILE", fallback=95) / 100,
+        initial_delay=config.getfloat(section, "HEDGE_INITIAL_DELAY", fallback=0.5),
+        max_deviation=None if max_deviation is None else float(max_deviation),
+    )
+
+
 def create_client_filter(
     section: str, config: configparser.ConfigParser
 ) -> ClientFilter:
@@ -119,6 +359,8 @@ def create_powermeter(
         return create_esphome_powermeter(section, config)
     elif section.startswith(AMIS_READER_SECTION):
         return create_amisreader_powermeter(section, config)
+    elif section.startswith(MODBUS_MULTI_SECTION):
+        return create_modbus_multi_powermeter(section, config)
     elif section.startswith(MODBUS_SECTION):
         return create_modbus_powermeter(section, config)
     elif section.startswith(TQ_EM_SECTION):
@@ -166,13 +408,36 @@ def create_script_powermeter(
 def create_mqtt_powermeter(
     section: str, config: configparser.ConfigParser
 ) -> Powermeter:
+    def split(value: str) -> List[str]:
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    # One topic per phase, each with its own JSON path or one path for all;
+    # a single topic may also carry all phases under different JSON paths
+    topics = split(config.get(section, "TOPICS", fallback="")) or [
+        config.get(section, "TOPIC", fallback="")
+    ]
+    json_paths = split(config.get(section, "JSON_PATHS", fallback="")) or [
+        config.get(section, "JSON_PATH", fallback=None)
+    ]
+    phases = max(len(topics), len(json_paths))
+    if len(topics) == 1:
+        topics = topics * phases
+    if len(json_paths) == 1:
+        json_paths = json_paths * phases
+    if len(topics) != len(json_paths):
+        raise ValueError(
+            f"{section}: TOPICS and JSON_PATHS must have the same number of entries"
+        )
+
     return MqttPowermeter(
         config.get(section, "BROKER", fallback=""),
         config.getint(section, "PORT", fallback=1883),
-        config.get(section, "TOPIC", fallback=""),
-        config.get(section, "JSON_PATH", fallback=None),
+        topics[0],
+        json_paths[0],
         config.get(section, "USERNAME", fallback=None),
         config.get(section, "PASSWORD", fallback=None),
+        topics=list(zip(topics, json_paths)),
+        phase_window=config.getfloat(section, "PHASE_WINDOW", fallback=5.0),
     )
 
 
@@ -222,6 +487,39 @@ def create_modbus_powermeter(
     )
 
 
+def create_modbus_multi_powermeter(
+    section: str, config: configparser.ConfigParser
+) -> Powermeter:
+    def split(value: str) -> List[str]:
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    # Decimal or 0x-prefixed hexadecimal register addresses, one per phase
+    addresses = [int(address, 0) for address in split(config.get(section, "ADDRESSES"))]
+    data_types = split(config.get(section, "DATA_TYPES", fallback="")) or [
+        config.get(section, "DATA_TYPE", fallback="UINT16")
+    ]
+    if len(data_types) == 1:
+        data_types = data_types * len(addresses)
+    if len(data_types) != len(addresses):
+        raise ValueError(
+            f"{section}: DATA_TYPES must have one entry per address in ADDRESSES"
+        )
+    byte_order = config.get(section, "BYTE_ORDER", fallback="BIG")
+    word_order = config.get(section, "WORD_ORDER", fallback="BIG")
+
+    return ModbusMultiPowermeter(
+        config.get(section, "HOST", fallback=""),
+        config.getint(section, "PORT", fallback=502),
+        config.getint(section, "UNIT_ID", fallback=1),
+        [
+            RegisterPoint(address, data_type, byte_order, word_order)
+            for address, data_type in zip(addresses, data_types)
+        ],
+        config.get(section, "REGISTER_TYPE", fallback="HOLDING"),
+        config.getint(section, "MAX_GAP", fallback=8),
+    )
+
+
 def create_esphome_powermeter(
     section: str, config: configparser.ConfigParser
 ) -> Powermeter:
@@ -264,7 +562,7 @@ def create_homeassistant_powermeter(
         config.get(section, "POWER_OUTPUT_ALIAS", fallback="")
     )
 
-    return HomeAssistant(
+    args = (
         config.get(section, "IP", fallback=""),
         config.get(section, "PORT", fallback=""),
         config.getboolean(section, "HTTPS", fallback=False),
@@ -275,6 +573,10 @@ def create_homeassistant_powermeter(
         power_output_alias,
         config.get(section, "API_PATH_PREFIX", fallback=None),
     )
+    fetch_mode = config.get(section, "FETCH_MODE", fallback=HomeAssistant.ENTITY)
+    if fetch_mode.upper() == HomeAssistantWebSocket.FETCH_MODE:
+        return HomeAssistantWebSocket(*args)
+    return HomeAssistant(*args, fetch_mode)
 
 
 def create_iobroker_powermeter(
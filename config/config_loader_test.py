@@ -3,6 +3,7 @@ import configparser
 from ipaddress import IPv4Network
 from config.config_loader import (
     ClientFilter,
+    PowermeterResolver,
     read_all_powermeter_configs,
     create_client_filter,
     create_powermeter,
@@ -23,7 +24,14 @@ from config.config_loader import (
 )
 import unittest
 from unittest.mock import patch, Mock
-from powermeter import ThrottledPowermeter
+from powermeter import (
+    BackgroundPolledPowermeter,
+    CircuitBreakerPowermeter,
+    CompositePowermeter,
+    HedgedPowermeter,
+    ModbusMultiPowermeter,
+    ThrottledPowermeter,
+)
 
 
 def test_client_filter():
@@ -221,6 +229,55 @@ def test_create_mqtt_powermeter():
             raise
 
 
+@patch("paho.mqtt.client.Client")
+def test_create_mqtt_powermeter_phase_topics(client_class):
+    """TOPICS and JSON_PATHS map one topic and path to each phase."""
+    config = configparser.ConfigParser()
+    config["MQTT"] = {
+        "BROKER": "127.0.0.1",
+        "TOPICS": "meter/l1, meter/l2, meter/l3",
+        "JSON_PATH": "$.power",
+        "PHASE_WINDOW": "2",
+    }
+    powermeter = create_mqtt_powermeter("MQTT", config)
+    try:
+        assert powermeter.phases == [
+            ("meter/l1", "$.power"),
+            ("meter/l2", "$.power"),
+            ("meter/l3", "$.power"),
+        ]
+        assert powermeter.phase_window == 2
+    finally:
+        powermeter.stop()
+
+    config["MQTT"] = {
+        "BROKER": "127.0.0.1",
+        "TOPICS": "meter/l1, meter/l2",
+        "JSON_PATHS": "$.a, $.b, $.c",
+    }
+    with pytest.raises(ValueError):
+        create_mqtt_powermeter("MQTT", config)
+
+
+def test_create_modbus_multi_powermeter():
+    """MODBUS_MULTI sections read one register point per address."""
+    config = configparser.ConfigParser()
+    config["MODBUS_MULTI"] = {
+        "HOST": "127.0.0.1",
+        "ADDRESSES": "0x0C, 0x0E, 0x10",
+        "DATA_TYPE": "FLOAT32",
+        "MAX_GAP": "0",
+    }
+    powermeter = create_powermeter("MODBUS_MULTI", config)
+    assert isinstance(powermeter, ModbusMultiPowermeter)
+    assert [point.address for point in powermeter.points] == [12, 14, 16]
+    assert powermeter.blocks == [(12, 6, [0, 1, 2])]
+
+    config["MODBUS_MULTI"]["DATA_TYPES"] = "FLOAT32, INT16"
+    with pytest.raises(ValueError):
+        create_powermeter("MODBUS_MULTI", config)
+
+
 def test_create_json_http_powermeter():
     """Test JSON HTTP powermeter creation."""
     config = configparser.ConfigParser()
@@ -302,3 +359,166 @@ def test_read_all_powermeter_configs():
     except Exception as e:
         if "Connection" not in str(e) and "timed out" not in str(e):
             raise
+
+
+def test_read_all_powermeter_configs_background_polling():
+    """Sections with BACKGROUND_POLL_INTERVAL are polled in the background."""
+    config = configparser.ConfigParser()
+    config["SCRIPT_1"] = {
+        "COMMAND": "echo 42",
+        "BACKGROUND_POLL_INTERVAL": "5",
+        "MAX_STALENESS": "20",
+    }
+    config["SCRIPT_2"] = {"COMMAND": "echo 1"}
+
+    powermeters = read_all_powermeter_configs(config)
+    polled = powermeters[0][0].wrapped_powermeter
+    try:
+        assert isinstance(polled, BackgroundPolledPowermeter)
+        assert polled.interval == 5
+        assert polled.max_staleness == 20
+        polled.wait_for_message(timeout=5)
+        assert powermeters[0][0].get_powermeter_watts() == [42]
+        assert not isinstance(
+            powermeters[1][0].wrapped_powermeter, BackgroundPolledPowermeter
+        )
+    finally:
+        polled.stop()
+
+
+def test_read_all_powermeter_configs_circuit_breaker():
+    """Pull sources get a circuit breaker unless disabled per section."""
+    config = configparser.ConfigParser()
+    config["GENERAL"] = {"CIRCUIT_BREAKER_MAX_BACKOFF": "30"}
+    config["SCRIPT_1"] = {"COMMAND": "echo 1", "CIRCUIT_BREAKER_THRESHOLD": "5"}
+    config["SCRIPT_2"] = {"COMMAND": "echo 2", "CIRCUIT_BREAKER_THRESHOLD": "0"}
+
+    powermeters = read_all_powermeter_configs(config)
+    breaker = powermeters[0][0].wrapped_powermeter
+    assert isinstance(breaker, CircuitBreakerPowermeter)
+    assert breaker.failure_threshold == 5
+    assert breaker.max_delay == 30
+    assert not isinstance(
+        powermeters[1][0].wrapped_powermeter, CircuitBreakerPowermeter
+    )
+
+
+def test_read_all_powermeter_configs_composite():
+    """Sections combined by a composite are only served through it."""
+    config = configparser.ConfigParser()
+    config["SCRIPT_MAIN"] = {"COMMAND": "echo 500"}
+    config["SCRIPT_PV"] = {"COMMAND": "echo -200"}
+    config["COMPOSITE"] = {
+        "SOURCES": "SCRIPT_MAIN, SCRIPT_PV",
+        "MODE": "SUBTRACT",
+        "NETMASK": "192.168.1.0/24",
+    }
+    config["SCRIPT_OTHER"] = {"COMMAND": "echo 1"}
+
+    powermeters = read_all_powermeter_configs(config)
+    assert len(powermeters) == 2
+    composite, client_filter = powermeters[0]
+    assert isinstance(composite.wrapped_powermeter, CompositePowermeter)
+    assert composite.get_powermeter_watts() == [700]
+    assert client_filter.matches("192.168.1.10")
+
+
+def test_read_all_powermeter_configs_global_rate_limits_apply_once():
+    """Global throttling wraps the composite, not each of its sources too."""
+    config = configparser.ConfigParser()
+    config["GENERAL"] = {"THROTTLE_INTERVAL": "2"}
+    config["SCRIPT_MAIN"] = {"COMMAND": "echo 500"}
+    config["SCRIPT_PV"] = {"COMMAND": "echo -200", "THROTTLE_INTERVAL": "5"}
+    config["COMPOSITE"] = {"SOURCES": "SCRIPT_MAIN, SCRIPT_PV", "MODE": "SUBTRACT"}
+
+    powermeters = read_all_powermeter_configs(config)
+    throttled = powermeters[0][0].wrapped_powermeter
+    assert isinstance(throttled, ThrottledPowermeter)
+    assert throttled.throttle_interval == 2
+    main, pv = throttled.wrapped_powermeter.sources
+    assert not isinstance(main.wrapped_powermeter, ThrottledPowermeter)
+    # An interval set on the source section itself still applies
+    assert isinstance(pv.wrapped_powermeter, ThrottledPowermeter)
+    assert pv.wrapped_powermeter.throttle_interval == 5
+
+
+def test_read_all_powermeter_configs_failover():
+    """Failover sections hedge their sources and can feed a composite."""
+    config = configparser.ConfigParser()
+    config["SCRIPT_HEAD"] = {"COMMAND": "echo 300"}
+    config["SCRIPT_BACKUP"] = {"COMMAND": "echo 310"}
+    config["FAILOVER"] = {
+        "SOURCES": "SCRIPT_HEAD, SCRIPT_BACKUP",
+        "HEDGE_PERCENTILE": "90",
+        "MAX_DEVIATION": "50",
+    }
+    config["SCRIPT_PV"] = {"COMMAND": "echo 100"}
+    config["COMPOSITE"] = {"SOURCES": "FAILOVER, SCRIPT_PV", "MODE": "SUBTRACT"}
+
+    powermeters = read_all_powermeter_configs(config)
+    assert len(powermeters) == 1
+    composite = powermeters[0][0].wrapped_powermeter
+    failover = composite.sources[0].wrapped_powermeter
+    assert isinstance(failover, HedgedPowermeter)
+    assert failover.percentile == 0.9
+    assert failover.max_deviation == 50
+    assert powermeters[0][0].get_powermeter_watts() == [200]
+
+
+def test_read_all_powermeter_configs_composite_unknown_source():
+    config = configparser.ConfigParser()
+    config["COMPOSITE"] = {"SOURCES": "SCRIPT_MISSING"}
+    with pytest.raises(ValueError):
+        read_all_powermeter_configs(config)
+
+
+def test_powermeter_resolver_first_match_order():
+    """Overlapping filters resolve to the first matching section."""
+    pm_a, pm_b, pm_c = Mock(), Mock(), Mock()
+    resolver = PowermeterResolver(
+        [
+            (pm_a, ClientFilter([IPv4Network("192.168.1.50/32")])),
+            (
+                pm_b,
+                ClientFilter(
+                    [IPv4Network("192.168.1.0/24"), IPv4Network("10.0.0.0/8")]
+                ),
+            ),
+            (pm_c, ClientFilter([IPv4Network("0.0.0.0/0")])),
+        ]
+    )
+    assert resolver.resolve("192.168.1.50") is pm_a
+    assert resolver.resolve("192.168.1.51") is pm_b
+    assert resolver.resolve("192.168.1.49") is pm_b
+    assert resolver.resolve("10.20.30.40") is pm_b
+    assert resolver.resolve("172.16.0.1") is pm_c
+    assert resolver.resolve("255.255.255.255") is pm_c
+    assert resolver.index("0.0.0.0") == 2
+
+
+def test_powermeter_resolver_no_match_and_invalid_ip():
+    pm = Mock()
+    resolver = PowermeterResolver([(pm, ClientFilter([IPv4Network("10.0.0.0/8")]))])
+    assert resolver.resolve("192.168.1.1") is None
+    assert resolver.resolve("invalid_ip") is None
+
+
+def test_powermeter_resolver_matches_client_filter_scan():
+    """The compiled index agrees with a linear ClientFilter scan."""
+    import random
+
+    rng = random.Random(42)
+    powermeters = []
+    for _ in range(200):
+        prefix = rng.randint(8, 32)
+        address = rng.randint(0, 2**32 - 1)
+        network = IPv4Network((address, prefix), strict=False)
+        powermeters.append((Mock(), ClientFilter([network])))
+    resolver = PowermeterResolver(powermeters, cache_size=16)
+
+    for network in [cf.netmasks[0] for _, cf in powermeters]:
+        for address in (network.network_address, network.broadcast_address):
+            for ip in (str(address), str(address - 1 if int(address) else address)):
+                expected = next((pm for pm, cf in powermeters if cf.matches(ip)), None)
+                assert resolver.resolve(ip) is expected
+    assert len(resolver._cache) <= 16
@@ -1,34 +1,124 @@
+import asyncio
+import logging
 import socket
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 from config.logger import logger
+from .dedupe import DedupeCache
+from .scheduler import DeadlineScheduler
+
+
+class _HookResults:
+    """Frames rendered by hook jobs, handed to the event loop in bursts."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._outcomes = []
+
+    def put(self, future, message, error=None):
+        """Resolve ``future`` on the loop thread (called from worker threads)."""
+        with self._lock:
+            self._outcomes.append((future, message, error))
+            if len(self._outcomes) > 1:
+                return  # delivery already scheduled, it takes this one along
+        try:
+            self._loop.call_soon_threadsafe(self._deliver)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _deliver(self):
+        with self._lock:
+            outcomes, self._outcomes = self._outcomes, []
+        for future, message, error in outcomes:
+            if future.done():
+                continue  # connection closed meanwhile
+            if error is None:
+                future.set_result(message)
+            else:
+                future.set_exception(error)
 
 
 class CT001:
+    """
+    CT001 emulator serving UDP discovery and all TCP sessions from a single
+    asyncio event loop running in one thread.
+
+    Sends are paced by a deadline scheduler sharing a single timer, so
+    fractional ``poll_interval`` values are supported and idle connections
+    cost no wakeups between sends.
+
+    The blocking ``before_send`` hook (which usually queries a powermeter)
+    runs on a small, bounded worker pool so a slow data source never stalls
+    the loop for other clients. Every send runs its hook as its own job;
+    sends due within ``TICK_COALESCE`` seconds of each other share a
+    scheduler tick, and frames finished close together are handed back to
+    the loop in a single callback instead of one wakeup per send.
+
+    When both ``group_key`` and ``read_group`` are set, the emulator runs in
+    broadcast mode: ``group_key(addr)`` assigns every connection to a group
+    (e.g. the powermeter serving it), and a single tick per group calls
+    ``read_group(key)`` once per poll interval and sends the resulting frame
+    to all of its connections. ``before_send`` is not used in that mode.
+    ``notify(key)`` sends a group's frame right away instead of waiting for
+    its next tick, so pushed readings reach the storages without delay.
+    """
+
+    # Upper bound of datagrams handled per readiness callback so a flood
+    # cannot starve the TCP sessions sharing the loop.
+    MAX_DATAGRAMS_PER_WAKEUP = 64
+
+    # Sends due this close together are released by the same scheduler tick
+    # (capped at a tenth of the poll interval).
+    TICK_COALESCE = 0.02
+
     def __init__(
         self,
         udp_port=12345,
         tcp_port=12345,
         dedupe_time_window=10,
+        dedupe_max_entries=1024,
         on_connect=None,
         on_disconnect=None,
         before_send=None,
         after_send=None,
         poll_interval=1,
+        max_hook_workers=4,
+        group_key=None,
+        read_group=None,
     ):
-        self.dedupe_time_window = dedupe_time_window
+        self._discovery_dedupe = DedupeCache(
+            ttl=dedupe_time_window, max_size=dedupe_max_entries
+        )
         self.poll_interval = poll_interval
         self._udp_port = udp_port
         self._tcp_port = tcp_port
-        self._last_response_time = {}
         self._on_connect = on_connect
         self._on_disconnect = on_disconnect
         self._before_send = before_send
         self._after_send = after_send
         self._value = [0, 0, 0]
         self._value_mutex = threading.Lock()
-        self._udp_thread = None
-        self._tcp_thread = None
+        self._max_hook_workers = max_hook_workers
+        self._hook_executor = None
+        self._hook_results = None
+        self._loop = None
+        self._thread = None
+        self._stop_future = None
+        self._scheduler = None
+        self._client_tasks = set()
+        self.group_key = group_key
+        self.read_group = read_group
+        self._groups = {}
+        self._group_tasks = {}
+        self._group_waits = {}
+        self._group_notified = set()
+        self._udp_sock = None
+        self._tcp_sock = None
+        self._rx_buffer = bytearray(1024)
+        self._rx_view = memoryview(self._rx_buffer)
+        self._ready = threading.Event()
+        self._lifecycle = threading.RLock()
         self._stop = False
 
     @property
@@ -72,135 +162,370 @@ class CT001:
         with self._value_mutex:
             self._value = value
 
-    def udp_server(self):
-        udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        udp_sock.bind(("", self._udp_port))
-        logger.info("UDP server is listening...")
+    @property
+    def dedupe_time_window(self):
+        return self._discovery_dedupe.ttl
 
+    @dedupe_time_window.setter
+    def dedupe_time_window(self, value):
+        self._discovery_dedupe.ttl = value
+
+    @property
+    def dedupe_stats(self):
+        return self._discovery_dedupe.stats()
+
+    def _on_discovery_readable(self, sock):
+        """Drain queued discovery datagrams into the preallocated buffer."""
+        view = self._rx_view
+        for _ in range(self.MAX_DATAGRAMS_PER_WAKEUP):
+            try:
+                nbytes, addr = sock.recvfrom_into(self._rx_buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug(f"Error receiving discovery datagram: {e}")
+                return
+            self._handle_discovery(sock, view[:nbytes], addr)
+
+    def _handle_discovery(self, sock, data, addr):
+        if logger.isEnabledFor(logging.DEBUG):
+            decoded = bytes(data).decode(errors="replace")
+            logger.debug(f"Received '{decoded}' ({data.hex()}) from {addr}")
+        if data == b"hame":
+            if self._discovery_dedupe.check_and_add(addr):
+                try:
+                    sock.sendto(b"ack", addr)
+                except OSError as e:
+                    logger.debug(f"Failed to send 'ack' to {addr}: {e}")
+                    return
+                logger.debug(f"Received 'hame' from {addr}, sent 'ack'")
+            else:
+                logger.debug(
+                    f"Received 'hame' from {addr} but ignored due to dedupe window"
+                )
+        else:
+            logger.debug(f"Ignoring unknown message")
+
+    @staticmethod
+    def _render_frame(values):
+        value1, value2, value3 = values
+        return f"HM:{round(value1)}|{round(value2)}|{round(value3)}"
+
+    def _next_message(self, addr):
+        """Run the before_send hook and render the next frame (worker thread)."""
+        if self.before_send:
+            self.before_send(addr)
+
+        with self._value_mutex:
+            if self._value is None:
+                return None
+            values = self._value
+
+        return self._render_frame(values)
+
+    def _hook_message(self, addr):
+        """Future for the next frame of ``addr``, rendered by a hook job."""
+        future = asyncio.get_running_loop().create_future()
+        # One job per send, so a slow hook never holds up another client
+        self._hook_executor.submit(self._run_hook, self._hook_results, addr, future)
+        return future
+
+    def _run_hook(self, results, addr, future):
+        """Run the before_send hook and render the frame (worker thread)."""
         try:
-            while not self._stop:
-                data, addr = udp_sock.recvfrom(1024)
-                decoded = data.decode()
-                current_time = time.time()
-
-                logger.debug(f"Received '{decoded}' ({data.hex()}) from {addr}")
-                if decoded == "hame":
-                    if (
-                        addr not in self._last_response_time
-                        or (current_time - self._last_response_time[addr])
-                        > self.dedupe_time_window
-                    ):
-                        logger.debug(f"Received 'hame' from {addr}")
-                        udp_sock.sendto(b"ack", addr)
-
-                        self._last_response_time[addr] = current_time
-                        logger.debug(f"Received 'hame' from {addr}, sent 'ack'")
-                    else:
-                        logger.debug(
-                            f"Received 'hame' from {addr} but ignored due to dedupe window"
-                        )
-                else:
-                    logger.debug(f"Ignoring unknown message")
+            message = self._next_message(addr)
+        except Exception as e:
+            results.put(future, None, e)
+        else:
+            results.put(future, message)
 
-        finally:
-            udp_sock.close()
+    def _next_group_message(self, key):
+        """Read the values of a broadcast group once and render its frame."""
+        values = self.read_group(key)
+        if values is None:
+            return None
+        return self._render_frame(values)
+
+    @property
+    def broadcast(self):
+        return self.group_key is not None and self.read_group is not None
 
-    def handle_tcp_client(self, conn, addr):
+    async def handle_tcp_client(self, reader, writer):
+        addr = writer.get_extra_info("peername")
         logger.info(f"TCP connection established with {addr}")
         try:
-            data = conn.recv(1024)
-            decoded = data.decode()
-            if decoded == "hello":
-                logger.debug("Received 'hello'")
-
-                if self.on_connect:
-                    self.on_connect(addr)
-
-                last_send_time = 0
-                while not self._stop:
-                    current_time = time.time()
-                    time_since_last_send = current_time - last_send_time
-
-                    if time_since_last_send >= self.poll_interval:
-                        if self.before_send:
-                            self.before_send(addr)
-
-                        with self._value_mutex:
-                            if self.value is None:
-                                logger.debug(f"No value to send to {addr}")
-                                break
-                            value1, value2, value3 = self.value
-
-                        value1 = round(value1)
-                        value2 = round(value2)
-                        value3 = round(value3)
-
-                        message = f"HM:{value1}|{value2}|{value3}"
-                        try:
-                            conn.send(message.encode())
-                            last_send_time = current_time
-                            logger.debug(f"Sent message to {addr}: {message}")
-                            if self.after_send:
-                                self.after_send(addr)
-
-                            time.sleep(self.poll_interval)
-                        except BrokenPipeError:
-                            logger.warning(
-                                f"Connection with {addr} broken. Waiting for a new connection."
-                            )
-                            break
-                    else:
-                        logger.debug(
-                            f"Waiting for {self.poll_interval - time_since_last_send} seconds"
-                        )
-                        # Sleep a small amount to prevent busy waiting
-                        time.sleep(0.01)
-            else:
+            data = await reader.read(1024)
+            decoded = data.decode(errors="replace")
+            if decoded != "hello":
                 logger.warning(f"Received unknown TCP message: {decoded}")
+                return
+            logger.debug("Received 'hello'")
+
+            if self.on_connect:
+                self.on_connect(addr)
+
+            if self.broadcast:
+                await self._serve_group_member(addr, writer)
+            else:
+                await self._serve_polling_client(addr, writer)
         finally:
-            conn.close()
+            writer.close()
             logger.info(f"Connection with {addr} closed")
             if self.on_disconnect:
                 self.on_disconnect(addr)
 
-    def tcp_server(self):
-        tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        tcp_sock.bind(("", self._tcp_port))
-        tcp_sock.listen(5)
-        logger.info("TCP server is listening...")
+    async def _serve_polling_client(self, addr, writer):
+        deadline = self._scheduler.time()
+        while not self._stop:
+            if self.before_send:
+                message = await self._hook_message(addr)
+            else:
+                message = self._next_message(addr)
+            if message is None:
+                logger.debug(f"No value to send to {addr}")
+                break
+
+            try:
+                writer.write(message.encode())
+                await writer.drain()
+            except ConnectionError:
+                logger.warning(
+                    f"Connection with {addr} broken. Waiting for a new connection."
+                )
+                break
+            logger.debug(f"Sent message to {addr}: {message}")
+            if self.after_send:
+                self.after_send(addr)
+
+            deadline = self._scheduler.next_deadline(deadline, self.poll_interval)
+            await self._scheduler.wait_until(deadline)
+
+    async def _serve_group_member(self, addr, writer):
+        key = self.group_key(addr)
+        if key is None:
+            logger.debug(f"No broadcast group for {addr}")
+            return
 
+        closed = asyncio.get_running_loop().create_future()
+        members = self._groups.setdefault(key, {})
+        members[writer] = (addr, closed)
+        if key not in self._group_tasks:
+            self._group_tasks[key] = asyncio.ensure_future(self._broadcast_group(key))
         try:
-            while not self._stop:
-                conn, addr = tcp_sock.accept()
-                client_thread = threading.Thread(
-                    target=self.handle_tcp_client, args=(conn, addr)
+            await closed
+        finally:
+            members.pop(writer, None)
+
+    async def _broadcast_group(self, key):
+        """Fetch once per tick and fan the frame out to every group member."""
+        loop = asyncio.get_running_loop()
+        members = self._groups[key]
+        deadline = self._scheduler.time()
+        try:
+            while members and not self._stop:
+                try:
+                    message = await loop.run_in_executor(
+                        self._hook_executor, self._next_group_message, key
+                    )
+                except Exception as e:
+                    logger.error(f"Error reading values for group {key}: {e}")
+                    message = None
+                if message is None:
+                    logger.debug(f"No value to send to group {key}")
+                    for _, closed in list(members.values()):
+                        if not closed.done():
+                            closed.set_result(None)
+                    break
+
+                frame = message.encode()
+                receivers = list(members.items())
+                for writer, _ in receivers:
+                    writer.write(frame)
+                results = await asyncio.gather(
+                    *(writer.drain() for writer, _ in receivers),
+                    return_exceptions=True,
                 )
-                client_thread.start()
+                for (writer, (addr, closed)), result in zip(receivers, results):
+                    if isinstance(result, Exception):
+                        logger.warning(
+                            f"Connection with {addr} broken. Waiting for a new connection."
+                        )
+                        if not closed.done():
+                            closed.set_result(None)
+                        continue
+                    logger.debug(f"Sent message to {addr}: {message}")
+                    if self.after_send:
+                        self.after_send(addr)
+
+                deadline = self._scheduler.next_deadline(deadline, self.poll_interval)
+                wait = self._scheduler.wait_until(deadline)
+                if key in self._group_notified:
+                    # Notified while this tick was being sent
+                    self._group_notified.discard(key)
+                    wait.set_result(None)
+                self._group_waits[key] = wait
+                try:
+                    await wait
+                finally:
+                    self._group_waits.pop(key, None)
+                # Woken early by notify(): the schedule continues from now
+                deadline = min(deadline, self._scheduler.time())
+        finally:
+            self._group_tasks.pop(key, None)
+            self._group_notified.discard(key)
+            if not members:
+                self._groups.pop(key, None)
+
+    def notify(self, key):
+        """
+        Send the frame of broadcast group ``key`` now instead of at its next
+        tick, e.g. when its powermeter pushed a new reading. Thread-safe.
+        """
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake_group, key)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _wake_group(self, key):
+        wait = self._group_waits.get(key)
+        if wait is not None and not wait.done():
+            wait.set_result(None)
+        elif key in self._group_tasks:
+            self._group_notified.add(key)
+
+    def _track_client(self, reader, writer):
+        task = asyncio.ensure_future(self.handle_tcp_client(reader, writer))
+        self._client_tasks.add(task)
+        task.add_done_callback(self._client_tasks.discard)
+
+    def _bind(self):
+        if self._udp_sock is None:
+            udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            udp_sock.bind(("", self._udp_port))
+            udp_sock.setblocking(False)
+            self._udp_sock = udp_sock
+        if self._tcp_sock is None:
+            tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Lets a restart listen again while old connections linger
+            tcp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            tcp_sock.bind(("", self._tcp_port))
+            tcp_sock.listen(128)
+            tcp_sock.setblocking(False)
+            self._tcp_sock = tcp_sock
+
+    def _release(self):
+        for sock in (self._udp_sock, self._tcp_sock):
+            if sock is not None:
+                sock.close()
+        self._udp_sock = None
+        self._tcp_sock = None
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        self._stop_future = loop.create_future()
+        if self._stop:
+            return
+        self._scheduler = DeadlineScheduler(
+            loop, coalesce=min(self.TICK_COALESCE, self.poll_interval / 10)
+        )
+        self._hook_results = _HookResults(loop)
+
+        # The loop works on duplicates of the bound sockets. Closing them on
+        # restart leaves the originals bound and listening, so the port is
+        # never released and connection attempts queue up in the backlog.
+        udp_sock = self._udp_sock.dup()
+        udp_sock.setblocking(False)
+        loop.add_reader(udp_sock, self._on_discovery_readable, udp_sock)
+        logger.info("UDP server is listening...")
+        tcp_server = await asyncio.start_server(
+            self._track_client, sock=self._tcp_sock.dup()
+        )
+        logger.info("TCP server is listening...")
+        self._ready.set()
+
+        try:
+            if not self._stop:
+                await self._stop_future
         finally:
             logger.info("Stop listening for TCP connections")
-            tcp_sock.close()
+            tcp_server.close()
+            loop.remove_reader(udp_sock)
+            udp_sock.close()
+            tasks = list(self._client_tasks) + list(self._group_tasks.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._scheduler.close()
+            await tcp_server.wait_closed()
 
-    def start(self):
-        if self._udp_thread or self._tcp_thread:
+    def _request_stop(self):
+        if self._stop_future is not None and not self._stop_future.done():
+            self._stop_future.set_result(None)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._ready.set()
+            self._loop.close()
+
+    def _start(self):
+        if self._thread:
             return
+        self._bind()
         self._stop = False
-        self._udp_thread = threading.Thread(target=self.udp_server)
-        self._tcp_thread = threading.Thread(target=self.tcp_server)
+        self._ready.clear()
+        self._hook_executor = ThreadPoolExecutor(
+            max_workers=self._max_hook_workers, thread_name_prefix="ct001-hook"
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="ct001")
+        self._thread.start()
+        self._ready.wait(timeout=5)
 
-        self._udp_thread.start()
-        self._tcp_thread.start()
+    def _halt(self):
+        """Stop the event loop thread, keeping the listening sockets bound."""
+        self._stop = True
+        if self._loop and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._request_stop)
+            except RuntimeError:
+                pass  # loop already closed
+        if self._thread:
+            self._thread.join()
+        if self._hook_executor:
+            # Do not wait for hooks blocked on a slow powermeter
+            self._hook_executor.shutdown(wait=False)
+        self._thread = None
+        self._loop = None
+        self._hook_executor = None
+
+    def start(self):
+        with self._lifecycle:
+            self._start()
+
+    def restart(self):
+        """Restart the emulator in-process without releasing its ports."""
+        with self._lifecycle:
+            self._halt()
+            self._start()
 
     def join(self):
-        if self._udp_thread:
-            self._udp_thread.join()
-        if self._tcp_thread:
-            self._tcp_thread.join()
+        while True:
+            thread = self._thread
+            if thread is None:
+                return
+            thread.join()
+            # Wait for a restart in progress and follow its new thread
+            with self._lifecycle:
+                if self._thread is thread or self._thread is None:
+                    return
 
     def stop(self):
-        self._stop = True
-        if self._udp_thread:
-            self._udp_thread.join()
-        if self._tcp_thread:
-            self._tcp_thread.join()
-        self._udp_thread = None
-        self._tcp_thread = None
+        with self._lifecycle:
+            self._halt()
+            self._release()
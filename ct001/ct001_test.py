@@ -0,0 +1,206 @@
+import asyncio
+import socket
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from .ct001 import CT001, _HookResults
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as tcp, socket.socket(
+        socket.AF_INET, socket.SOCK_DGRAM
+    ) as udp:
+        tcp.bind(("", 0))
+        port = tcp.getsockname()[1]
+        udp.bind(("", port))
+        return port
+
+
+def _connect(port, timeout=2):
+    for _ in range(50):
+        try:
+            return socket.create_connection(("127.0.0.1", port), timeout=timeout)
+        except ConnectionRefusedError:
+            time.sleep(0.02)
+    raise ConnectionRefusedError(f"CT001 not listening on {port}")
+
+
+class TestCT001(unittest.TestCase):
+    def setUp(self):
+        self.port = _free_port()
+        self.device = CT001(udp_port=self.port, tcp_port=self.port, poll_interval=0.05)
+        self.device.value = [100.4, 200.6, -300]
+
+    def tearDown(self):
+        self.device.stop()
+
+    def test_udp_discovery_acks_once_per_dedupe_window(self):
+        self.device.start()
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+            client.settimeout(0.5)
+            client.sendto(b"hame", ("127.0.0.1", self.port))
+            data, _ = client.recvfrom(16)
+            self.assertEqual(data, b"ack")
+
+            client.sendto(b"hame", ("127.0.0.1", self.port))
+            with self.assertRaises(socket.timeout):
+                client.recvfrom(16)
+
+    def test_tcp_hello_receives_frames_and_hooks(self):
+        events = []
+        sent = threading.Event()
+        self.device.on_connect = lambda addr: events.append("connect")
+        self.device.before_send = lambda addr: events.append("before")
+        self.device.after_send = lambda addr: (events.append("after"), sent.set())
+        self.device.start()
+
+        with _connect(self.port) as client:
+            client.sendall(b"hello")
+            data = client.recv(64)
+            self.assertTrue(sent.wait(1))
+
+        self.assertEqual(data, b"HM:100|201|-300")
+        self.assertEqual(events[:3], ["connect", "before", "after"])
+
+    def test_many_clients_share_one_loop_thread(self):
+        self.device.start()
+        threads_before = threading.active_count()
+        clients = [_connect(self.port) for _ in range(50)]
+        try:
+            for client in clients:
+                client.sendall(b"hello")
+            for client in clients:
+                self.assertTrue(client.recv(64).startswith(b"HM:"))
+            # Hook workers are bounded, connections do not spawn threads
+            self.assertLessEqual(
+                threading.active_count() - threads_before,
+                self.device._max_hook_workers,
+            )
+        finally:
+            for client in clients:
+                client.close()
+
+    def test_none_value_closes_connection(self):
+        self.device.value = None
+        self.device.start()
+        with _connect(self.port) as client:
+            client.sendall(b"hello")
+            self.assertEqual(client.recv(64), b"")
+
+    def test_stop_is_fast_with_connected_clients(self):
+        self.device.start()
+        with _connect(self.port) as client:
+            client.sendall(b"hello")
+            client.recv(64)
+            started = time.monotonic()
+            self.device.stop()
+            self.assertLess(time.monotonic() - started, 0.5)
+            self.assertEqual(client.recv(64), b"")
+
+    def test_restart_keeps_port_bound(self):
+        self.device.start()
+        joined = threading.Event()
+        joiner = threading.Thread(target=lambda: (self.device.join(), joined.set()))
+        joiner.start()
+
+        self.device.restart()
+        # join() follows the restarted device instead of returning
+        self.assertFalse(joined.wait(0.1))
+        with _connect(self.port) as client:
+            client.sendall(b"hello")
+            self.assertTrue(client.recv(64).startswith(b"HM:"))
+
+        self.device.stop()
+        self.assertTrue(joined.wait(1))
+        joiner.join()
+
+    def test_second_instance_on_same_port_fails(self):
+        self.device.start()
+        second = CT001(udp_port=self.port, tcp_port=self.port)
+        with self.assertRaises(OSError):
+            second.start()
+
+    def test_slow_hook_does_not_delay_other_clients(self):
+        release = threading.Event()
+
+        def hook(addr):
+            if addr[1] == 0:
+                release.wait(2)
+
+        self.device.before_send = hook
+        self.device._hook_executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.device._hook_executor.shutdown)
+
+        async def send_all():
+            self.device._hook_results = _HookResults(asyncio.get_running_loop())
+            futures = [self.device._hook_message(("127.0.0.1", i)) for i in range(8)]
+            fast = await asyncio.wait_for(asyncio.gather(*futures[1:]), 1)
+            release.set()
+            return fast + [await futures[0]]
+
+        loop = asyncio.new_event_loop()
+        try:
+            messages = loop.run_until_complete(send_all())
+        finally:
+            loop.close()
+        self.assertEqual(messages, ["HM:100|201|-300"] * 8)
+
+
+class TestCT001Broadcast(unittest.TestCase):
+    def setUp(self):
+        self.port = _free_port()
+        self.reads = []
+        self.device = CT001(
+            udp_port=self.port,
+            tcp_port=self.port,
+            poll_interval=0.2,
+            group_key=lambda addr: "pm1" if addr[0] == "127.0.0.1" else None,
+            read_group=self._read_group,
+        )
+
+    def tearDown(self):
+        self.device.stop()
+
+    def _read_group(self, key):
+        self.reads.append(key)
+        return [1, 2, 3]
+
+    def test_one_read_per_tick_for_all_clients(self):
+        self.device.start()
+        clients = [_connect(self.port) for _ in range(10)]
+        try:
+            for client in clients:
+                client.sendall(b"hello")
+            for client in clients:
+                self.assertEqual(client.recv(64), b"HM:1|2|3")
+            # Ten clients in one group must not cause ten upstream reads
+            self.assertLessEqual(len(self.reads), 3)
+            self.assertEqual(set(self.reads), {"pm1"})
+        finally:
+            for client in clients:
+                client.close()
+
+    def test_notify_sends_without_waiting_for_tick(self):
+        self.device.poll_interval = 10
+        self.device.start()
+        with _connect(self.port) as client:
+            client.settimeout(2)
+            client.sendall(b"hello")
+            self.assertEqual(client.recv(64), b"HM:1|2|3")
+            start = time.time()
+            self.device.notify("pm1")
+            self.assertEqual(client.recv(64), b"HM:1|2|3")
+            self.assertLess(time.time() - start, 1)
+
+    def test_no_values_closes_group_connections(self):
+        self.device.read_group = lambda key: None
+        self.device.start()
+        with _connect(self.port) as client:
+            client.sendall(b"hello")
+            self.assertEqual(client.recv(64), b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+
+
+class DedupeCache:
+    """
+    Bounded table of recently answered peers with TTL expiry.
+
+    Entries are kept in insertion order, which is also expiry order, so
+    expired peers are dropped from the front in amortised O(1) on every
+    lookup. A hard ``max_size`` evicts the oldest entry when a burst of new
+    peers (ephemeral ports, DHCP churn) arrives within one TTL.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024, clock=time.monotonic):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        self._expire(self._clock())
+        return key in self._entries
+
+    @property
+    def evictions(self) -> int:
+        return self.expired + self.evicted
+
+    def check_and_add(self, key) -> bool:
+        """
+        Return True if ``key`` was not seen within the TTL and record it now.
+
+        A duplicate within the TTL counts as a hit and does not extend the
+        window, mirroring "answer at most once per window".
+        """
+        now = self._clock()
+        self._expire(now)
+        if key in self._entries:
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        self._entries[key] = now
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+        return True
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def _expire(self, now):
+        entries = self._entries
+        while entries:
+            key, added = next(iter(entries.items()))
+            if now - added <= self.ttl:
+                break
+            del entries[key]
+            self.expired += 1
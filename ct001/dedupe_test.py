@@ -0,0 +1,54 @@
+import unittest
+
+from .dedupe import DedupeCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDedupeCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_duplicate_within_ttl_is_a_hit(self):
+        cache = DedupeCache(ttl=10, clock=self.clock)
+        self.assertTrue(cache.check_and_add(("10.0.0.1", 1000)))
+        self.clock.now = 5
+        self.assertFalse(cache.check_and_add(("10.0.0.1", 1000)))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_entry_expires_after_ttl(self):
+        cache = DedupeCache(ttl=10, clock=self.clock)
+        cache.check_and_add("peer")
+        self.clock.now = 10.5
+        self.assertTrue(cache.check_and_add("peer"))
+        self.assertEqual(cache.expired, 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_size_is_bounded(self):
+        cache = DedupeCache(ttl=10, max_size=3, clock=self.clock)
+        for port in range(10):
+            self.assertTrue(cache.check_and_add(("10.0.0.1", port)))
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.evicted, 7)
+        self.assertIn(("10.0.0.1", 9), cache)
+        self.assertNotIn(("10.0.0.1", 0), cache)
+
+    def test_churn_stays_flat(self):
+        cache = DedupeCache(ttl=10, max_size=1000, clock=self.clock)
+        for i in range(100000):
+            self.clock.now = i * 0.5
+            cache.check_and_add(("10.0.0.1", 1024 + i % 60000))
+        # Only peers seen within the last TTL remain
+        self.assertLessEqual(len(cache), 21)
+        self.assertEqual(cache.evictions, 100000 - len(cache))
+
+
+if __name__ == "__main__":
+    unittest.main()
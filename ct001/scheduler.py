@@ -0,0 +1,83 @@
+import asyncio
+import heapq
+import itertools
+
+
+class DeadlineScheduler:
+    """
+    Heap of send deadlines driven by a single event loop timer.
+
+    Instead of every connection owning its own timer, waiters are kept in a
+    heap ordered by deadline and one ``call_at`` handle is armed for the
+    earliest of them. When it fires, all due waiters are released and the
+    timer is re-armed for the next deadline, so the loop only wakes up when a
+    send is actually due. Waiters due within ``coalesce`` seconds of a firing
+    timer are released with it, so nearby deadlines share one wakeup.
+    """
+
+    def __init__(self, loop=None, coalesce=0.0):
+        self._loop = loop or asyncio.get_event_loop()
+        self.coalesce = coalesce
+        self._heap = []
+        self._counter = itertools.count()
+        self._timer = None
+        self._timer_when = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def time(self):
+        return self._loop.time()
+
+    def wait_until(self, deadline):
+        """Return a future that resolves once ``deadline`` (loop time) is reached."""
+        future = self._loop.create_future()
+        heapq.heappush(self._heap, (deadline, next(self._counter), future))
+        self._arm()
+        return future
+
+    def next_deadline(self, previous, interval):
+        """
+        Next fixed-rate deadline after ``previous``.
+
+        Deadlines advance by ``interval`` from the previous one so sends do not
+        drift with processing time. If the schedule fell behind (e.g. a slow
+        powermeter read), it restarts from now instead of bursting to catch up.
+        """
+        deadline = previous + interval
+        now = self._loop.time()
+        return deadline if deadline > now else now
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._timer_when = None
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            future.cancel()
+
+    def _arm(self):
+        while self._heap and self._heap[0][2].done():
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return
+        when = self._heap[0][0]
+        if self._timer is not None:
+            if self._timer_when <= when:
+                return
+            self._timer.cancel()
+        self._timer_when = when
+        self._timer = self._loop.call_at(when, self._fire)
+
+    def _fire(self):
+        # The loop may run a timer marginally before its deadline (clock
+        # resolution), so everything up to the armed deadline counts as due.
+        due = max(self._loop.time(), self._timer_when) + self.coalesce
+        self._timer = None
+        self._timer_when = None
+        while self._heap and self._heap[0][0] <= due:
+            _, _, future = heapq.heappop(self._heap)
+            if not future.done():
+                future.set_result(None)
+        self._arm()
@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from .scheduler import DeadlineScheduler
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_waiters_wake_in_deadline_order(self):
+        async def run():
+            scheduler = DeadlineScheduler(self.loop)
+            now = scheduler.time()
+            woken = []
+
+            async def waiter(name, delay):
+                await scheduler.wait_until(now + delay)
+                woken.append(name)
+
+            await asyncio.gather(
+                waiter("c", 0.06), waiter("a", 0.02), waiter("b", 0.04)
+            )
+            self.assertEqual(woken, ["a", "b", "c"])
+            self.assertGreaterEqual(scheduler.time() - now, 0.06)
+            self.assertEqual(len(scheduler), 0)
+
+        self.loop.run_until_complete(run())
+
+    def test_cancelled_waiter_does_not_block_others(self):
+        async def run():
+            scheduler = DeadlineScheduler(self.loop)
+            now = scheduler.time()
+            early = scheduler.wait_until(now + 0.01)
+            late = scheduler.wait_until(now + 0.03)
+            early.cancel()
+            await late
+            self.assertTrue(late.done())
+
+        self.loop.run_until_complete(run())
+
+    def test_nearby_deadlines_share_one_wakeup(self):
+        async def run():
+            scheduler = DeadlineScheduler(self.loop, coalesce=0.02)
+            now = scheduler.time()
+            first = scheduler.wait_until(now + 0.01)
+            second = scheduler.wait_until(now + 0.025)
+            third = scheduler.wait_until(now + 0.1)
+            await first
+            self.assertTrue(second.done())
+            self.assertFalse(third.done())
+            await third
+
+        self.loop.run_until_complete(run())
+
+    def test_next_deadline_is_fixed_rate_without_bursting(self):
+        scheduler = DeadlineScheduler(self.loop)
+        now = scheduler.time()
+        self.assertAlmostEqual(scheduler.next_deadline(now, 0.5), now + 0.5, 3)
+        # A schedule that fell behind restarts at the current time
+        self.assertGreaterEqual(scheduler.next_deadline(now - 10, 0.5), now)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,52 +1,139 @@
 import configparser
 import argparse
 import logging
+import signal
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, List, Tuple
-from config.config_loader import read_all_powermeter_configs, ClientFilter
+from typing import Dict, Optional, List, Tuple
+from config.config_loader import (
+    read_all_powermeter_configs,
+    ClientFilter,
+    PowermeterResolver,
+)
 from ct001 import CT001
-from powermeter import Powermeter
+from powermeter import Powermeter, fetch_deadline
 from shelly import Shelly
 from collections import OrderedDict
 from config.logger import logger, setLogLevel
 from health_service import start_health_service, stop_health_service
 
 
-def test_powermeter(powermeter: Powermeter, client_filter: ClientFilter):
-    """Test powermeter configuration with minimal retry logic for edge cases."""
-    max_retries = 3
-    retry_delay = 5  # seconds
-
-    for attempt in range(max_retries + 1):
+def test_powermeter(
+    powermeter: Powermeter,
+    client_filter: ClientFilter,
+    deadline: float,
+    retry_delay: float = 5,
+):
+    """
+    Test a powermeter until it returns a value or ``deadline`` passes.
+
+    ``deadline`` is a ``time.monotonic()`` timestamp shared by all
+    powermeters tested at startup. Raises the last error if no value could
+    be fetched in time.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
         try:
-            logger.debug(
-                f"Testing powermeter configuration... (attempt {attempt + 1}/{max_retries + 1})"
-            )
-            powermeter.wait_for_message(
-                timeout=30
-            )  # Reduced timeout since HA should be ready
-            value = powermeter.get_powermeter_watts()
+            logger.debug(f"Testing powermeter configuration... (attempt {attempt})")
+            remaining = max(0.0, deadline - time.monotonic())
+            # Push sources signal their first reading, pull sources are
+            # ready right away; fetches are bounded by the same deadline
+            with fetch_deadline(remaining):
+                powermeter.wait_for_message(timeout=remaining)
+                value = powermeter.get_powermeter_watts()
             value_with_units = " | ".join([f"{v}W" for v in value])
-            powermeter_name = powermeter.__class__.__name__
+            # Report the actual source, not the wrappers around it
+            source = powermeter
+            while hasattr(source, "wrapped_powermeter"):
+                source = source.wrapped_powermeter
+            powermeter_name = source.__class__.__name__
             filter_description = ", ".join([str(n) for n in client_filter.netmasks])
             logger.info(
                 f"Successfully fetched {powermeter_name} powermeter value (filter {filter_description}): {value_with_units}"
             )
             return  # Success, exit the function
         except Exception as e:
-            logger.debug(f"Error on attempt {attempt + 1}: {e}")
-
-            if attempt < max_retries:
-                logger.info(f"Retrying powermeter test in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                continue
-            else:
-                # Last attempt failed
-                logger.error(
-                    f"Failed to test powermeter after {max_retries + 1} attempts: {e}"
-                )
-                exit(1)
+            logger.debug(f"Error on attempt {attempt}: {e}")
+            if deadline - time.monotonic() <= retry_delay:
+                raise
+            logger.info(f"Retrying powermeter test in {retry_delay} seconds...")
+            time.sleep(retry_delay)
+
+
+def test_powermeters(
+    powermeters: List[Tuple[Powermeter, ClientFilter]],
+    timeout: float,
+    retry_delay: float = 5,
+) -> bool:
+    """
+    Test all powermeters concurrently within one overall ``timeout``.
+
+    Startup then takes as long as the slowest powermeter instead of the
+    sum of all of them. Returns whether every powermeter returned a value.
+    """
+    if not powermeters:
+        return True
+    deadline = time.monotonic() + timeout
+    with ThreadPoolExecutor(
+        max_workers=len(powermeters), thread_name_prefix="powermeter-test"
+    ) as executor:
+        futures = [
+            executor.submit(
+                test_powermeter, powermeter, client_filter, deadline, retry_delay
+            )
+            for powermeter, client_filter in powermeters
+        ]
+        ok = True
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Failed to test powermeter within {timeout}s: {e}")
+                ok = False
+    return ok
+
+
+_running_devices = []
+_running_devices_lock = threading.Lock()
+
+
+def stop_devices(signum=None, frame=None):
+    """Stop all running emulators so run_device returns promptly."""
+    with _running_devices_lock:
+        devices = list(_running_devices)
+    logger.info("Stopping devices...")
+    for device in devices:
+        device.stop()
+
+
+def restart_devices(signum=None, frame=None):
+    """Restart all running emulators in-process, keeping their ports bound."""
+    with _running_devices_lock:
+        devices = list(_running_devices)
+    logger.info("Restarting devices...")
+    for device in devices:
+        device.restart()
+
+
+# UDP port of each emulated Shelly device type
+SHELLY_PORTS = {
+    "shellypro3em_old": 1010,
+    "shellypro3em_new": 2220,
+    "shellyemg3": 2222,
+    "shellyproem50": 2223,
+}
+
+
+def shelly_options(cfg: configparser.ConfigParser) -> dict:
+    return {
+        "request_deadline": cfg.getfloat(
+            "GENERAL", "SHELLY_REQUEST_DEADLINE", fallback=1.0
+        ),
+        "queue_size": cfg.getint("GENERAL", "SHELLY_QUEUE_SIZE", fallback=64),
+        "reuse_port": cfg.getboolean("GENERAL", "SHELLY_REUSE_PORT", fallback=False),
+    }
 
 
 def run_device(
@@ -55,8 +142,10 @@ def run_device(
     args: argparse.Namespace,
     powermeters: List[Tuple[Powermeter, ClientFilter]],
     device_id: Optional[str] = None,
+    ports: Optional[Dict[int, str]] = None,
 ):
     logger.debug(f"Starting device: {device_type}")
+    subscriptions = []
 
     if device_type == "ct001":
         disable_sum = (
@@ -72,7 +161,7 @@ def run_device(
         poll_interval = (
             args.poll_interval
             if args.poll_interval is not None
-            else cfg.getint("GENERAL", "POLL_INTERVAL", fallback=1)
+            else cfg.getfloat("GENERAL", "POLL_INTERVAL", fallback=1)
         )
 
         logger.debug(f"CT001 Settings for {device_id}:")
@@ -80,19 +169,24 @@ def run_device(
         logger.debug(f"Disable Absolute Values: {disable_absolute}")
         logger.debug(f"Poll Interval: {poll_interval}")
 
-        device = CT001(poll_interval=poll_interval)
+        broadcast = (
+            args.broadcast
+            if args.broadcast is not None
+            else cfg.getboolean("GENERAL", "CT001_BROADCAST", fallback=False)
+        )
+
+        logger.debug(f"Broadcast: {broadcast}")
 
-        def update_readings(addr):
-            powermeter = None
-            for pm, client_filter in powermeters:
-                if client_filter.matches(addr[0]):
-                    powermeter = pm
-                    break
-            if powermeter is None:
+        resolver = PowermeterResolver(powermeters)
+
+        def find_powermeter(addr):
+            index = resolver.index(addr[0])
+            if index is None:
                 logger.debug(f"No powermeter found for client {addr[0]}")
-                device.value = None
-                return
-            values = powermeter.get_powermeter_watts()
+            return index
+
+        def read_powermeter(index):
+            values = powermeters[index][0].get_reading().values
             value1 = values[0] if len(values) > 0 else 0
             value2 = values[1] if len(values) > 1 else 0
             value3 = values[2] if len(values) > 2 else 0
@@ -104,38 +198,58 @@ def run_device(
             if not disable_absolute:
                 value1, value2, value3 = map(abs, (value1, value2, value3))
 
-            device.value = [value1, value2, value3]
+            return [value1, value2, value3]
 
-        device.before_send = update_readings
-
-    elif device_type == "shellypro3em_old":
-        logger.debug(f"Shelly Pro 3EM Settings:")
-        logger.debug(f"Device ID: {device_id}")
-        device = Shelly(powermeters=powermeters, device_id=device_id, udp_port=1010)
-
-    elif device_type == "shellypro3em_new":
-        logger.debug(f"Shelly Pro 3EM Settings:")
-        logger.debug(f"Device ID: {device_id}")
-        device = Shelly(powermeters=powermeters, device_id=device_id, udp_port=2220)
-
-    elif device_type == "shellyemg3":
-        logger.debug(f"Shelly EM Gen3 Settings:")
-        logger.debug(f"Device ID: {device_id}")
-        device = Shelly(powermeters=powermeters, device_id=device_id, udp_port=2222)
-
-    elif device_type == "shellyproem50":
-        logger.debug(f"Shelly Pro EM 50 Settings:")
-        logger.debug(f"Device ID: {device_id}")
-        device = Shelly(powermeters=powermeters, device_id=device_id, udp_port=2223)
+        if broadcast:
+            device = CT001(
+                poll_interval=poll_interval,
+                group_key=find_powermeter,
+                read_group=read_powermeter,
+            )
+            # Push sources wake their group as soon as a new reading arrives,
+            # pull sources are already read once per tick
+            for index, (powermeter, _) in enumerate(powermeters):
+                if powermeter.supports_subscribe():
+                    subscriptions.append(
+                        powermeter.subscribe(
+                            lambda values, index=index: device.notify(index)
+                        )
+                    )
+        else:
+            device = CT001(poll_interval=poll_interval)
+
+            def update_readings(addr):
+                index = find_powermeter(addr)
+                device.value = None if index is None else read_powermeter(index)
+
+            device.before_send = update_readings
+
+    elif device_type == "shelly" or device_type in SHELLY_PORTS:
+        if ports is None:
+            ports = {SHELLY_PORTS[device_type]: device_id}
+        logger.debug(f"Shelly Settings:")
+        for port, port_device_id in ports.items():
+            logger.debug(f"UDP Port {port}: Device ID {port_device_id}")
+        device = Shelly(
+            powermeters=powermeters,
+            ports=ports,
+            **shelly_options(cfg),
+        )
 
     else:
         raise ValueError(f"Unsupported device type: {device_type}")
 
+    with _running_devices_lock:
+        _running_devices.append(device)
     try:
         device.start()
         device.join()
     finally:
+        for unsubscribe in subscriptions:
+            unsubscribe()
         device.stop()
+        with _running_devices_lock:
+            _running_devices.remove(device)
 
 
 def main():
@@ -169,7 +283,13 @@ def main():
     # B2500-specific arguments
     parser.add_argument("-s", "--disable-sum", action="store_true", default=None)
     parser.add_argument("-a", "--disable-absolute", action="store_true", default=None)
-    parser.add_argument("-p", "--poll-interval", type=int)
+    parser.add_argument("-p", "--poll-interval", type=float)
+    parser.add_argument(
+        "--broadcast",
+        action="store_true",
+        default=None,
+        help="CT001: read each powermeter once per poll interval and send the frame to all its clients",
+    )
     parser.add_argument(
         "--throttle-interval",
         type=float,
@@ -236,20 +356,46 @@ def main():
     # Create powermeter
     powermeters = read_all_powermeter_configs(cfg)
     if not skip_test:
-        for powermeter, client_filter in powermeters:
-            test_powermeter(powermeter, client_filter)
+        test_timeout = cfg.getfloat("GENERAL", "POWERMETER_TEST_TIMEOUT", fallback=120)
+        if not test_powermeters(powermeters, test_timeout):
+            exit(1)
+
+    # Stop quickly on container/supervisor shutdown, restart in-place on SIGHUP
+    signal.signal(signal.SIGTERM, stop_devices)
+    signal.signal(signal.SIGINT, stop_devices)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, restart_devices)
+
+    # All Shelly device types are served by one emulator listening on each
+    # of their ports
+    shelly_ports = {
+        SHELLY_PORTS[device_type]: device_id
+        for device_type, device_id in zip(device_types, device_ids)
+        if device_type in SHELLY_PORTS
+    }
+    devices = [
+        (device_type, device_id)
+        for device_type, device_id in zip(device_types, device_ids)
+        if device_type not in SHELLY_PORTS
+    ]
 
     # Run devices in parallel
     try:
-        with ThreadPoolExecutor(max_workers=len(device_types)) as executor:
+        with ThreadPoolExecutor(max_workers=len(devices) + 1) as executor:
             futures = []
-            for device_type, device_id in zip(device_types, device_ids):
+            for device_type, device_id in devices:
                 futures.append(
                     executor.submit(
                         run_device, device_type, cfg, args, powermeters, device_id
                     )
                 )
             # end for
+            if shelly_ports:
+                futures.append(
+                    executor.submit(
+                        run_device, "shelly", cfg, args, powermeters, None, shelly_ports
+                    )
+                )
 
             # Wait for all devices to complete
             for future in futures:
@@ -0,0 +1,62 @@
+import threading
+import time
+import unittest
+from ipaddress import IPv4Network
+
+import main
+from config import ClientFilter
+from powermeter import Powermeter, PushPowermeter
+
+
+class SlowPushPowermeter(PushPowermeter):
+    def __init__(self, delay):
+        super().__init__()
+        timer = threading.Timer(delay, self.ready.set)
+        timer.daemon = True
+        timer.start()
+
+    def get_powermeter_watts(self):
+        return [1.0]
+
+
+class FlakyPowermeter(Powermeter):
+    def __init__(self, failures):
+        self.failures = failures
+
+    def get_powermeter_watts(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("not reachable yet")
+        return [2.0]
+
+
+class FailingPowermeter(Powermeter):
+    def get_powermeter_watts(self):
+        raise ConnectionError("not reachable")
+
+
+class TestPowermeterStartupTest(unittest.TestCase):
+    client_filter = ClientFilter([IPv4Network("0.0.0.0/0")])
+
+    def test_powermeters_are_tested_concurrently(self):
+        powermeters = [
+            (SlowPushPowermeter(0.3), self.client_filter) for _ in range(5)
+        ] + [(FlakyPowermeter(2), self.client_filter)]
+        started = time.monotonic()
+        self.assertTrue(main.test_powermeters(powermeters, 5, retry_delay=0.05))
+        # Bounded by the slowest source, not the sum of all of them
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_failure_after_overall_deadline(self):
+        powermeters = [
+            (SlowPushPowermeter(0.05), self.client_filter),
+            (FailingPowermeter(), self.client_filter),
+            (SlowPushPowermeter(10), self.client_filter),
+        ]
+        started = time.monotonic()
+        self.assertFalse(main.test_powermeters(powermeters, 0.5, retry_delay=0.05))
+        self.assertLess(time.monotonic() - started, 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
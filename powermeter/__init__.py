@@ -1,4 +1,6 @@
 from .base import Powermeter
+from .reading import Reading
+from .deadline import fetch_deadline
 from .tasmota import Tasmota
 from .shelly import Shelly, Shelly1PM, ShellyPlus1PM, ShellyEM, Shelly3EM, Shelly3EMPro
 from .esphome import ESPHome
@@ -8,9 +10,16 @@ from .iobroker import IoBroker
 from .homeassistant import HomeAssistant
 from .vzlogger import VZLogger
 from .amisreader import AmisReader
-from .modbus import ModbusPowermeter
+from .modbus import ModbusPowermeter, ModbusMultiPowermeter, RegisterPoint
 from .mqtt import MqttPowermeter
 from .json_http import JsonHttpPowermeter
 from .script import Script
 from .throttling import ThrottledPowermeter
+from .singleflight import SingleFlightPowermeter
+from .push import PushPowermeter
+from .background import BackgroundPolledPowermeter
+from .circuit_breaker import CircuitBreakerPowermeter, CircuitOpenError
+from .composite import CompositePowermeter
+from .hedged import HedgedPowermeter
 from .tq_em import TQEnergyManager
+from .homeassistant_websocket import HomeAssistantWebSocket
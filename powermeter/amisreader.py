@@ -9,7 +9,7 @@ class AmisReader(Powermeter):
 
     def get_json(self, path):
         url = f"http://{self.ip}{path}"
-        return self.session.get(url, timeout=10).json()
+        return self.session.get(url, timeout=self.request_timeout()).json()
 
     def get_powermeter_watts(self):
         response = self.get_json("/rest")
@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import List, Optional
+from config.logger import logger
+from .base import Powermeter
+from .push import PushPowermeter
+from .reading import Reading
+
+
+class BackgroundPolledPowermeter(PushPowermeter):
+    """
+    A wrapper that polls the wrapped powermeter on its own thread.
+
+    Every ``interval`` seconds the wrapped powermeter is read and the result
+    is published as an immutable ``Reading`` snapshot. Requests only read
+    the current snapshot, which is a single attribute load, so they never
+    wait for the upstream source and need no lock. Snapshots older than
+    ``max_staleness`` seconds are not served; the request fails instead of
+    reporting outdated values to the storage. Subscribers are notified
+    whenever a poll returns changed values, and ``ready`` is set once the
+    first poll succeeded.
+    """
+
+    def __init__(
+        self,
+        wrapped_powermeter: Powermeter,
+        interval: float = 1.0,
+        max_staleness: float = 10.0,
+        clock=time.monotonic,
+    ):
+        super().__init__()
+        self.wrapped_powermeter = wrapped_powermeter
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self._clock = clock
+        self._snapshot: Optional[Reading] = None
+        self._last_error: Optional[Exception] = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._poll,
+            name=f"poll-{type(wrapped_powermeter).__name__}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    @property
+    def snapshot(self) -> Optional[Reading]:
+        return self._snapshot
+
+    def stop(self):
+        self._stopped.set()
+
+    def get_powermeter_watts(self) -> List[float]:
+        return list(self.get_reading().values)
+
+    def get_reading(self) -> Reading:
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise ValueError(f"No reading polled yet: {self._last_error}")
+        age = snapshot.age(self._clock())
+        if age > self.max_staleness:
+            raise ValueError(
+                f"Last reading is {age:.1f}s old (max {self.max_staleness}s): "
+                f"{self._last_error}"
+            )
+        return snapshot
+
+    def _poll(self):
+        while not self._stopped.is_set():
+            started = self._clock()
+            try:
+                values = self.wrapped_powermeter.get_powermeter_watts()
+            except Exception as e:
+                self._last_error = e
+                logger.debug(f"Background poll failed: {e}")
+            else:
+                self._last_error = None
+                previous = self._snapshot
+                captured_at = self._clock()
+                self._snapshot = Reading(
+                    values, captured_at, captured_at - started, Reading.POLLED
+                )
+                self.ready.set()
+                if previous is None or previous.values != self._snapshot.values:
+                    self.publish(list(values))
+            # Fixed rate: a slow fetch shortens the wait until the next one
+            elapsed = self._clock() - started
+            self._stopped.wait(max(0.0, self.interval - elapsed))
@@ -0,0 +1,84 @@
+import threading
+import unittest
+
+from .background import BackgroundPolledPowermeter
+from .base import Powermeter
+from .reading import Reading
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class BlockingPowermeter(Powermeter):
+    """Returns one reading, then blocks every further fetch until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.second_call = threading.Event()
+
+    def get_powermeter_watts(self):
+        self.calls += 1
+        if self.calls > 1:
+            self.second_call.set()
+            self.release.wait()
+        return [float(self.calls), 2.0, 3.0]
+
+
+class TestBackgroundPolledPowermeter(unittest.TestCase):
+    def setUp(self):
+        self.source = BlockingPowermeter()
+        self.clock = FakeClock()
+        self.powermeter = BackgroundPolledPowermeter(
+            self.source, interval=0, max_staleness=5, clock=self.clock
+        )
+        self.powermeter.wait_for_message(timeout=2)
+
+    def tearDown(self):
+        self.powermeter.stop()
+        self.source.release.set()
+
+    def test_ready_after_first_poll(self):
+        self.assertTrue(self.powermeter.ready.is_set())
+
+    def test_serves_snapshot_while_upstream_is_slow(self):
+        self.assertTrue(self.source.second_call.wait(2))
+        # The second fetch is still blocked upstream, requests do not wait
+        self.assertEqual(self.powermeter.get_powermeter_watts(), [1.0, 2.0, 3.0])
+        self.assertEqual(
+            self.powermeter.get_reading(),
+            Reading((1.0, 2.0, 3.0), 100.0, 0.0, Reading.POLLED),
+        )
+        self.assertEqual(self.powermeter.snapshot.age(now=101.5), 1.5)
+
+    def test_stale_snapshot_is_not_served(self):
+        self.assertTrue(self.source.second_call.wait(2))
+        self.clock.now += 6
+        with self.assertRaises(ValueError):
+            self.powermeter.get_powermeter_watts()
+
+
+class TestBackgroundPolledPowermeterStartup(unittest.TestCase):
+    def test_wait_for_message_times_out_without_reading(self):
+        class FailingPowermeter(Powermeter):
+            def get_powermeter_watts(self):
+                raise ConnectionError("unreachable")
+
+        powermeter = BackgroundPolledPowermeter(FailingPowermeter(), interval=0.01)
+        try:
+            with self.assertRaises(TimeoutError):
+                powermeter.wait_for_message(timeout=0.1)
+            self.assertFalse(powermeter.ready.is_set())
+            with self.assertRaises(ValueError):
+                powermeter.get_powermeter_watts()
+        finally:
+            powermeter.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,49 @@
+import time
+from typing import Callable, List, Optional
+from .deadline import remaining_timeout
+from .reading import Reading
+
+# Receives the values of every new reading of a subscribed powermeter
+ReadingCallback = Callable[[List[float]], None]
+
+
 # Powermeter classes
 class Powermeter:
+    # Seconds a backend waits for its source, shortened by the deadline of
+    # the request being served (see fetch_deadline)
+    timeout: Optional[float] = 10.0
+
+    def request_timeout(self) -> Optional[float]:
+        return remaining_timeout(self.timeout)
 
     def wait_for_message(self, timeout=5):
         pass
 
     def get_powermeter_watts(self):
         raise NotImplementedError()
+
+    def get_reading(self) -> Reading:
+        """
+        Fetch the current values as a timestamped ``Reading``.
+
+        Powermeters only implementing ``get_powermeter_watts`` get a live
+        reading with the time the call took as latency.
+        """
+        started = time.monotonic()
+        values = self.get_powermeter_watts()
+        captured_at = time.monotonic()
+        return Reading(values, captured_at, captured_at - started, Reading.LIVE)
+
+    def supports_subscribe(self) -> bool:
+        """Whether new readings are pushed to ``subscribe`` callbacks."""
+        return False
+
+    def subscribe(self, callback: ReadingCallback) -> Callable[[], None]:
+        """
+        Call ``callback`` with the values of every new reading.
+
+        Returns a function that cancels the subscription. Pull-only
+        powermeters do not implement this; wrap them in a
+        ``BackgroundPolledPowermeter`` to subscribe to them.
+        """
+        raise NotImplementedError()
@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+from typing import List, Optional
+from config.logger import logger
+from .base import Powermeter
+from .deadline import remaining_timeout
+from .reading import Reading
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of contacting a powermeter whose circuit is open."""
+
+
+class CircuitBreakerPowermeter(Powermeter):
+    """
+    A wrapper that stops calling a powermeter backend that keeps failing.
+
+    After ``failure_threshold`` consecutive errors the circuit opens and
+    every request fails immediately with ``CircuitOpenError`` instead of
+    waiting for the backend's timeout. A background thread probes the
+    backend with exponential backoff (``base_delay`` doubling up to
+    ``max_delay``, randomized by ``jitter``) and closes the circuit on the
+    first successful read.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        wrapped_powermeter: Powermeter,
+        failure_threshold: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        jitter: float = 0.2,
+        random_source=random.random,
+    ):
+        self.wrapped_powermeter = wrapped_powermeter
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._random = random_source
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._times_opened = 0
+        self._last_error: Optional[Exception] = None
+        self._retry_at = 0.0
+        self._stopped = threading.Event()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def stats(self):
+        retry_in = 0.0
+        if self._state != self.CLOSED:
+            retry_in = max(0.0, self._retry_at - time.monotonic())
+        return {
+            "state": self._state,
+            "consecutive_failures": self._failures,
+            "times_opened": self._times_opened,
+            "retry_in": retry_in,
+            "last_error": None if self._last_error is None else str(self._last_error),
+        }
+
+    def stop(self):
+        """Stop probing a backend while the circuit is open."""
+        self._stopped.set()
+
+    def wait_for_message(self, timeout=5):
+        """Pass through to wrapped powermeter."""
+        return self.wrapped_powermeter.wait_for_message(timeout)
+
+    def supports_subscribe(self) -> bool:
+        return self.wrapped_powermeter.supports_subscribe()
+
+    def subscribe(self, callback):
+        """Pass through to wrapped powermeter."""
+        return self.wrapped_powermeter.subscribe(callback)
+
+    def get_powermeter_watts(self) -> List[float]:
+        return self._call(self.wrapped_powermeter.get_powermeter_watts)
+
+    def get_reading(self) -> Reading:
+        return self._call(self.wrapped_powermeter.get_reading)
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before probe number ``attempt`` (0-based) of an outage."""
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        return delay * (1 + self.jitter * (2 * self._random() - 1))
+
+    def _call(self, fetch):
+        if self._state != self.CLOSED:
+            retry_in = max(0.0, self._retry_at - time.monotonic())
+            raise CircuitOpenError(
+                f"Powermeter unavailable after {self.failure_threshold} failures, "
+                f"next check in {retry_in:.1f}s: {self._last_error}"
+            )
+        # A caller whose deadline ran out before the call, e.g. while
+        # queueing, fails without counting against the backend. Timeouts of
+        # a started call do count: a hanging backend only ever ends at the
+        # caller's deadline.
+        remaining_timeout(None)
+        try:
+            result = fetch()
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        if self._failures:
+            with self._lock:
+                self._failures = 0
+        return result
+
+    def _record_failure(self, error: Exception):
+        with self._lock:
+            self._failures += 1
+            self._last_error = error
+            if self._state != self.CLOSED or self._failures < self.failure_threshold:
+                return
+            self._state = self.OPEN
+            self._times_opened += 1
+        logger.warning(
+            f"Powermeter failed {self._failures} times in a row, "
+            f"pausing requests: {error}"
+        )
+        threading.Thread(target=self._probe, name="circuit-probe", daemon=True).start()
+
+    def _probe(self):
+        attempt = 0
+        while True:
+            delay = self.backoff(attempt)
+            self._retry_at = time.monotonic() + delay
+            if self._stopped.wait(delay):
+                return
+            self._state = self.HALF_OPEN
+            try:
+                self.wrapped_powermeter.get_powermeter_watts()
+            except Exception as e:
+                logger.debug(f"Powermeter still unavailable: {e}")
+                with self._lock:
+                    self._last_error = e
+                    self._state = self.OPEN
+                attempt += 1
+                continue
+            with self._lock:
+                self._failures = 0
+                self._state = self.CLOSED
+            logger.info("Powermeter recovered, resuming requests")
+            return
@@ -0,0 +1,109 @@
+import time
+import unittest
+from unittest.mock import Mock
+
+from .circuit_breaker import CircuitBreakerPowermeter, CircuitOpenError
+from .deadline import fetch_deadline
+
+
+class TestCircuitBreakerPowermeter(unittest.TestCase):
+    def setUp(self):
+        self.mock_powermeter = Mock()
+        self.mock_powermeter.get_powermeter_watts.side_effect = ConnectionError(
+            "timed out"
+        )
+        self.breaker = CircuitBreakerPowermeter(
+            self.mock_powermeter,
+            failure_threshold=2,
+            base_delay=0.05,
+            max_delay=0.05,
+        )
+
+    def tearDown(self):
+        self.breaker.stop()
+
+    def _wait_for_state(self, state, timeout=2):
+        deadline = time.monotonic() + timeout
+        while self.breaker.state != state and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(self.breaker.state, state)
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.get_powermeter_watts()
+        self.assertEqual(self.breaker.state, CircuitBreakerPowermeter.OPEN)
+
+        calls = self.mock_powermeter.get_powermeter_watts.call_count
+        start = time.monotonic()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.get_powermeter_watts()
+        self.assertLess(time.monotonic() - start, 0.01)
+        self.assertEqual(self.mock_powermeter.get_powermeter_watts.call_count, calls)
+        self.assertEqual(self.breaker.stats()["times_opened"], 1)
+
+    def test_background_probe_closes_circuit_on_recovery(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.get_powermeter_watts()
+        self.mock_powermeter.get_powermeter_watts.side_effect = None
+        self.mock_powermeter.get_powermeter_watts.return_value = [42.0]
+
+        self._wait_for_state(CircuitBreakerPowermeter.CLOSED)
+        self.assertEqual(self.breaker.get_powermeter_watts(), [42.0])
+        self.assertEqual(self.breaker.stats()["consecutive_failures"], 0)
+
+    def test_success_resets_failure_count(self):
+        self.mock_powermeter.get_powermeter_watts.side_effect = [
+            ConnectionError("timed out"),
+            [1.0],
+            ConnectionError("timed out"),
+        ]
+        for expected in (ConnectionError, None, ConnectionError):
+            if expected is None:
+                self.assertEqual(self.breaker.get_powermeter_watts(), [1.0])
+            else:
+                with self.assertRaises(expected):
+                    self.breaker.get_powermeter_watts()
+        self.assertEqual(self.breaker.state, CircuitBreakerPowermeter.CLOSED)
+
+    def test_backend_hanging_until_deadline_opens_circuit(self):
+        def hanging_fetch():
+            # Like an HTTP backend, give up once the request deadline is over
+            time.sleep(self.breaker.request_timeout())
+            raise TimeoutError("timed out")
+
+        self.mock_powermeter.get_powermeter_watts.side_effect = hanging_fetch
+        for _ in range(2):
+            # Shelly requests always carry a deadline
+            with fetch_deadline(0.05):
+                with self.assertRaises(TimeoutError):
+                    self.breaker.get_powermeter_watts()
+        self.assertEqual(self.breaker.state, CircuitBreakerPowermeter.OPEN)
+
+        start = time.monotonic()
+        with fetch_deadline(0.05):
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.get_powermeter_watts()
+        self.assertLess(time.monotonic() - start, 0.01)
+
+    def test_expired_deadline_does_not_call_backend(self):
+        with fetch_deadline(0):
+            with self.assertRaises(TimeoutError):
+                self.breaker.get_powermeter_watts()
+        self.mock_powermeter.get_powermeter_watts.assert_not_called()
+        self.assertEqual(self.breaker.stats()["consecutive_failures"], 0)
+
+    def test_backoff_doubles_up_to_max_with_jitter(self):
+        breaker = CircuitBreakerPowermeter(
+            Mock(), base_delay=1, max_delay=8, jitter=0.5, random_source=lambda: 0.5
+        )
+        self.assertEqual([breaker.backoff(n) for n in range(5)], [1, 2, 4, 8, 8])
+        breaker = CircuitBreakerPowermeter(
+            Mock(), base_delay=1, max_delay=8, jitter=0.5, random_source=lambda: 1.0
+        )
+        self.assertEqual(breaker.backoff(1), 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
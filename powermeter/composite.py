@@ -0,0 +1,80 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence
+from .base import Powermeter
+from .reading import Reading
+
+
+class CompositePowermeter(Powermeter):
+    """
+    Combines the readings of several powermeters into one.
+
+    All sources are read in parallel on a bounded pool, so a combined read
+    takes as long as the slowest source rather than the sum of all of them.
+    The readings are merged according to ``mode``:
+
+    - ``SUM``: phase-wise sum of all sources, e.g. several sub-meters
+    - ``SUBTRACT``: the first source minus all others, phase-wise, e.g. a
+      main meter minus a PV sub-meter
+    - ``PHASES``: the total of each source becomes one phase, e.g. one
+      single-phase meter per phase
+    """
+
+    SUM = "SUM"
+    SUBTRACT = "SUBTRACT"
+    PHASES = "PHASES"
+    MODES = (SUM, SUBTRACT, PHASES)
+
+    def __init__(
+        self, sources: Sequence[Powermeter], mode: str = SUM, max_workers: int = 8
+    ):
+        if not sources:
+            raise ValueError("A composite powermeter needs at least one source")
+        mode = mode.strip().upper()
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported composite mode: {mode}")
+        self.sources = list(sources)
+        self.mode = mode
+        self._executor = ThreadPoolExecutor(
+            max_workers=min(len(self.sources), max_workers),
+            thread_name_prefix="composite",
+        )
+
+    def wait_for_message(self, timeout=5):
+        # One deadline for all sources rather than the timeout for each
+        deadline = time.monotonic() + timeout
+        for source in self.sources:
+            source.wait_for_message(max(0.0, deadline - time.monotonic()))
+
+    def get_powermeter_watts(self) -> List[float]:
+        return list(self.get_reading().values)
+
+    def get_reading(self) -> Reading:
+        started = time.monotonic()
+        # Each fetch runs in the caller's context so request deadlines apply
+        futures = [
+            self._executor.submit(contextvars.copy_context().run, source.get_reading)
+            for source in self.sources
+        ]
+        readings = [future.result() for future in futures]
+        latency = time.monotonic() - started
+        # The combination is only as fresh as its oldest part
+        oldest = min(readings, key=lambda reading: reading.captured_at)
+        return Reading(
+            self.combine([reading.values for reading in readings]),
+            oldest.captured_at,
+            latency,
+            oldest.source,
+        )
+
+    def combine(self, values: Sequence[Sequence[float]]) -> List[float]:
+        if self.mode == self.PHASES:
+            return [sum(phases) for phases in values]
+        width = max(len(phases) for phases in values)
+        combined = [0.0] * width
+        for index, phases in enumerate(values):
+            sign = -1 if self.mode == self.SUBTRACT and index > 0 else 1
+            for phase, value in enumerate(phases):
+                combined[phase] += sign * value
+        return combined
@@ -0,0 +1,98 @@
+import time
+import unittest
+
+from .base import Powermeter
+from .composite import CompositePowermeter
+from .deadline import fetch_deadline, remaining_timeout
+from .reading import Reading
+
+
+class SlowPowermeter(Powermeter):
+    def __init__(self, values, delay=0.0):
+        self.values = values
+        self.delay = delay
+        self.seen_timeout = None
+
+    def get_powermeter_watts(self):
+        self.seen_timeout = remaining_timeout(None)
+        time.sleep(self.delay)
+        return self.values
+
+
+class TestCompositePowermeter(unittest.TestCase):
+    def test_sum_is_phase_wise(self):
+        composite = CompositePowermeter(
+            [SlowPowermeter([100.0, 200.0, 300.0]), SlowPowermeter([10.0])], "sum"
+        )
+        self.assertEqual(composite.get_powermeter_watts(), [110.0, 200.0, 300.0])
+
+    def test_subtract_removes_sub_meters_from_first(self):
+        composite = CompositePowermeter(
+            [SlowPowermeter([500.0]), SlowPowermeter([-200.0]), SlowPowermeter([50.0])],
+            CompositePowermeter.SUBTRACT,
+        )
+        self.assertEqual(composite.get_powermeter_watts(), [650.0])
+
+    def test_phases_assigns_one_source_per_phase(self):
+        composite = CompositePowermeter(
+            [
+                SlowPowermeter([100.0]),
+                SlowPowermeter([20.0, 30.0]),
+                SlowPowermeter([-5.0]),
+            ],
+            CompositePowermeter.PHASES,
+        )
+        self.assertEqual(composite.get_powermeter_watts(), [100.0, 50.0, -5.0])
+
+    def test_sources_are_read_in_parallel(self):
+        sources = [SlowPowermeter([1.0], delay=0.2) for _ in range(3)]
+        composite = CompositePowermeter(sources)
+        start = time.monotonic()
+        reading = composite.get_reading()
+        elapsed = time.monotonic() - start
+        self.assertEqual(reading.values, (3.0,))
+        self.assertLess(elapsed, 0.5)
+        self.assertGreaterEqual(reading.latency, 0.2)
+
+    def test_deadline_reaches_sources(self):
+        source = SlowPowermeter([1.0])
+        composite = CompositePowermeter([source])
+        with fetch_deadline(0.5):
+            composite.get_powermeter_watts()
+        self.assertIsNotNone(source.seen_timeout)
+        self.assertLessEqual(source.seen_timeout, 0.5)
+
+    def test_reading_takes_source_and_time_of_oldest_part(self):
+        class FixedPowermeter(Powermeter):
+            def __init__(self, reading):
+                self.reading = reading
+
+            def get_reading(self):
+                return self.reading
+
+        now = time.monotonic()
+        polled = Reading([100.0], now - 3, source=Reading.POLLED)
+        live = Reading([10.0], now)
+        reading = CompositePowermeter(
+            [FixedPowermeter(live), FixedPowermeter(polled)]
+        ).get_reading()
+        self.assertEqual(list(reading.values), [110.0])
+        self.assertEqual(reading.captured_at, polled.captured_at)
+        self.assertEqual(reading.source, Reading.POLLED)
+
+    def test_failing_source_fails_the_composite(self):
+        class FailingPowermeter(Powermeter):
+            def get_powermeter_watts(self):
+                raise ConnectionError("unreachable")
+
+        composite = CompositePowermeter([SlowPowermeter([1.0]), FailingPowermeter()])
+        with self.assertRaises(ConnectionError):
+            composite.get_powermeter_watts()
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            CompositePowermeter([SlowPowermeter([1.0])], "AVERAGE")
+
+
+if __name__ == "__main__":
+    unittest.main()
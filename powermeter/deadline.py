@@ -0,0 +1,47 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Monotonic time by which the current request's fetch has to be done
+_deadline = contextvars.ContextVar("powermeter_deadline", default=None)
+
+
+@contextmanager
+def fetch_deadline(timeout: Optional[float]) -> Iterator[None]:
+    """
+    Limit powermeter fetches in this context to ``timeout`` seconds from now.
+
+    Emulators wrap a request in this so backends stop waiting for their
+    source once the storage has given up on the answer. Nested deadlines
+    never extend an outer one; ``None`` leaves the current deadline as is.
+    """
+    if timeout is None:
+        yield
+        return
+    deadline = time.monotonic() + timeout
+    current = _deadline.get()
+    if current is not None and current < deadline:
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_timeout(default: Optional[float]) -> Optional[float]:
+    """
+    Timeout for the next blocking call of a backend.
+
+    Returns ``default`` (the backend's own timeout, ``None`` for none)
+    unless the current deadline leaves less time, and raises
+    ``TimeoutError`` once the deadline has passed so no new call is started.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Deadline for fetching the powermeter exceeded")
+    return remaining if default is None else min(default, remaining)
@@ -0,0 +1,51 @@
+import time
+import unittest
+from .deadline import fetch_deadline, remaining_timeout
+from unittest.mock import Mock
+
+from .script import Script
+from .vzlogger import VZLogger
+
+
+class TestFetchDeadline(unittest.TestCase):
+    def test_without_deadline_backend_timeout_applies(self):
+        self.assertEqual(remaining_timeout(10), 10)
+        self.assertIsNone(remaining_timeout(None))
+
+    def test_deadline_shortens_timeout_and_never_extends(self):
+        with fetch_deadline(0.5):
+            self.assertLessEqual(remaining_timeout(10), 0.5)
+            self.assertEqual(remaining_timeout(0.1), 0.1)
+            with fetch_deadline(30):
+                self.assertLessEqual(remaining_timeout(None), 0.5)
+        self.assertEqual(remaining_timeout(10), 10)
+
+    def test_expired_deadline_raises(self):
+        with fetch_deadline(0):
+            with self.assertRaises(TimeoutError):
+                remaining_timeout(10)
+
+    def test_http_backend_uses_remaining_time(self):
+        powermeter = VZLogger("127.0.0.1", "8080", "uuid")
+        powermeter.session = Mock()
+        powermeter.session.get.return_value.json.return_value = {
+            "data": [{"tuples": [[0, 100]]}]
+        }
+        powermeter.timeout = 4
+        powermeter.get_powermeter_watts()
+        self.assertEqual(powermeter.session.get.call_args[1]["timeout"], 4)
+        with fetch_deadline(0.5):
+            powermeter.get_powermeter_watts()
+        self.assertLessEqual(powermeter.session.get.call_args[1]["timeout"], 0.5)
+
+    def test_script_is_killed_at_deadline(self):
+        script = Script("sleep 5; echo 1")
+        start = time.monotonic()
+        with fetch_deadline(0.2):
+            with self.assertRaises(Exception):
+                script.get_powermeter_watts()
+        self.assertLess(time.monotonic() - start, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,7 +12,7 @@ class ESPHome(Powermeter):
 
     def get_json(self, path):
         url = f"http://{self.ip}:{self.port}{path}"
-        return self.session.get(url, timeout=10).json()
+        return self.session.get(url, timeout=self.request_timeout()).json()
 
     def get_powermeter_watts(self):
         ParsedData = self.get_json(f"/{self.domain}/{self.id}")
@@ -0,0 +1,202 @@
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional, Sequence
+from .base import Powermeter
+from .deadline import remaining_timeout
+from .reading import Reading
+
+
+class LatencyTracker:
+    """Sliding window of the latencies of recent successful fetches."""
+
+    def __init__(self, window: int = 100):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def record(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(fraction * len(samples)) - 1))
+        return samples[index]
+
+
+class HedgedPowermeter(Powermeter):
+    """
+    Reads redundant sources in order of preference, hedging slow requests.
+
+    The primary source is queried first. If it has not answered within its
+    hedge delay (the ``percentile`` of its recent latencies, e.g. p95), or it
+    failed, the next source is queried as well and the first consistent
+    answer wins. Until ``min_samples`` latencies are known a source is given
+    ``initial_delay`` seconds.
+
+    A reading is consistent when all of its values are finite and, if
+    ``max_deviation`` is set, a fallback source's total is within
+    ``max_deviation`` watts of the primary's last reading (if that reading
+    is not older than ``consistency_window`` seconds). Inconsistent
+    readings are treated like errors.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[Powermeter],
+        percentile: float = 0.95,
+        initial_delay: float = 0.5,
+        min_delay: float = 0.01,
+        max_delay: float = 5.0,
+        max_deviation: Optional[float] = None,
+        consistency_window: float = 30.0,
+        min_samples: int = 5,
+        window: int = 100,
+    ):
+        if not sources:
+            raise ValueError("A hedged powermeter needs at least one source")
+        self.sources = list(sources)
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_deviation = max_deviation
+        self.consistency_window = consistency_window
+        self.min_samples = min_samples
+        self.latencies = [LatencyTracker(window) for _ in self.sources]
+        self.hedged = 0
+        self.rejected = 0
+        self._last_primary: Optional[Reading] = None
+        # Losing requests keep running until their source answers
+        self._executor = ThreadPoolExecutor(
+            max_workers=2 * len(self.sources), thread_name_prefix="hedged"
+        )
+
+    def hedge_delay(self, index: int) -> float:
+        tracker = self.latencies[index]
+        if len(tracker) < self.min_samples:
+            return self.initial_delay
+        delay = tracker.percentile(self.percentile)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def stats(self):
+        return {
+            "hedged": self.hedged,
+            "rejected": self.rejected,
+            "hedge_delays": [self.hedge_delay(i) for i in range(len(self.sources))],
+        }
+
+    def wait_for_message(self, timeout=5):
+        """
+        Return as soon as any source is ready, so a down primary does not
+        hold up a section its backups can already serve.
+        """
+        deadline = time.monotonic() + timeout
+        executor = ThreadPoolExecutor(
+            max_workers=len(self.sources), thread_name_prefix="hedged-wait"
+        )
+        try:
+            pending = {
+                executor.submit(source.wait_for_message, timeout)
+                for source in self.sources
+            }
+            error = None
+            while pending:
+                done, pending = wait(
+                    pending,
+                    max(0.0, deadline - time.monotonic()),
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        return
+                    error = future.exception()
+            raise TimeoutError(f"Timeout waiting for any failover source: {error}")
+        finally:
+            # Waits of sources that are still down end at their own timeout
+            executor.shutdown(wait=False)
+
+    def get_powermeter_watts(self) -> List[float]:
+        return list(self.get_reading().values)
+
+    def get_reading(self) -> Reading:
+        pending = {}
+        errors = []
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            future = self._executor.submit(
+                contextvars.copy_context().run, self._fetch, launched
+            )
+            pending[future] = launched
+            launched += 1
+
+        launch()
+        while pending:
+            timeout = remaining_timeout(None)
+            can_hedge = launched < len(self.sources)
+            if can_hedge:
+                delay = self.hedge_delay(launched - 1)
+                timeout = delay if timeout is None else min(timeout, delay)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge:
+                    self.hedged += 1
+                    launch()
+                # Otherwise the deadline passed, remaining_timeout raises
+                continue
+
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    reading = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if self._consistent(index, reading):
+                    return reading
+                self.rejected += 1
+                errors.append(
+                    ValueError(f"Inconsistent reading from source {index + 1}")
+                )
+            # Fail over right away instead of waiting for the hedge delay
+            if launched < len(self.sources):
+                launch()
+
+        raise errors[-1]
+
+    def _fetch(self, index: int) -> Reading:
+        started = time.monotonic()
+        reading = self.sources[index].get_reading()
+        self.latencies[index].record(time.monotonic() - started)
+        if index == 0:
+            # Also kept when a fallback won the race, for the consistency check
+            self._last_primary = reading
+        return reading
+
+    def _consistent(self, index: int, reading: Reading) -> bool:
+        if not all(math.isfinite(value) for value in reading.values):
+            return False
+        primary = self._last_primary
+        if index == 0:
+            return True
+        if (
+            self.max_deviation is None
+            or primary is None
+            or primary.age() > self.consistency_window
+        ):
+            return True
+        deviation = abs(sum(reading.values) - sum(primary.values))
+        return deviation <= self.max_deviation
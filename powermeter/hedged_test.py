@@ -0,0 +1,116 @@
+import time
+import unittest
+
+from .base import Powermeter
+from .hedged import HedgedPowermeter, LatencyTracker
+from .push import PushPowermeter
+
+
+class DelayedPowermeter(Powermeter):
+    def __init__(self, values, delay=0.0, error=None):
+        self.values = values
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def get_powermeter_watts(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.values
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_percentile(self):
+        tracker = LatencyTracker(window=100)
+        self.assertIsNone(tracker.percentile(0.95))
+        for latency in range(1, 101):
+            tracker.record(latency / 100)
+        self.assertEqual(tracker.percentile(0.95), 0.95)
+        self.assertEqual(tracker.percentile(0.5), 0.5)
+
+
+class TestHedgedPowermeter(unittest.TestCase):
+    def test_ready_when_any_source_is_ready(self):
+        backup = PushPowermeter()
+        hedged = HedgedPowermeter([PushPowermeter(), backup])
+        with self.assertRaises(TimeoutError):
+            hedged.wait_for_message(timeout=0.05)
+
+        backup.ready.set()
+        start = time.monotonic()
+        hedged.wait_for_message(timeout=1)
+        self.assertLess(time.monotonic() - start, 0.5)
+        # A pull source is always ready
+        HedgedPowermeter([PushPowermeter(), DelayedPowermeter([5.0])]).wait_for_message(
+            timeout=1
+        )
+
+    def test_fast_primary_is_not_hedged(self):
+        primary = DelayedPowermeter([100.0])
+        secondary = DelayedPowermeter([999.0])
+        hedged = HedgedPowermeter([primary, secondary], initial_delay=0.2)
+        self.assertEqual(hedged.get_powermeter_watts(), [100.0])
+        self.assertEqual(secondary.calls, 0)
+        self.assertEqual(hedged.hedged, 0)
+
+    def test_slow_primary_is_hedged_after_delay(self):
+        primary = DelayedPowermeter([100.0], delay=1.0)
+        secondary = DelayedPowermeter([101.0])
+        hedged = HedgedPowermeter([primary, secondary], initial_delay=0.05)
+        start = time.monotonic()
+        self.assertEqual(hedged.get_powermeter_watts(), [101.0])
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(hedged.hedged, 1)
+
+    def test_failed_primary_fails_over_immediately(self):
+        primary = DelayedPowermeter([100.0], error=ConnectionError("down"))
+        secondary = DelayedPowermeter([101.0])
+        hedged = HedgedPowermeter([primary, secondary], initial_delay=5)
+        start = time.monotonic()
+        self.assertEqual(hedged.get_powermeter_watts(), [101.0])
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_all_sources_failing_raises(self):
+        hedged = HedgedPowermeter(
+            [
+                DelayedPowermeter([1.0], error=ConnectionError("down")),
+                DelayedPowermeter([1.0], error=TimeoutError("slow")),
+            ]
+        )
+        with self.assertRaises(TimeoutError):
+            hedged.get_powermeter_watts()
+
+    def test_hedge_delay_follows_primary_latency(self):
+        primary = DelayedPowermeter([100.0], delay=0.02)
+        hedged = HedgedPowermeter(
+            [primary, DelayedPowermeter([100.0])], initial_delay=1, min_samples=3
+        )
+        self.assertEqual(hedged.hedge_delay(0), 1)
+        for _ in range(3):
+            hedged.get_powermeter_watts()
+        self.assertGreaterEqual(hedged.hedge_delay(0), 0.02)
+        self.assertLess(hedged.hedge_delay(0), 0.5)
+
+    def test_inconsistent_fallback_is_rejected(self):
+        primary = DelayedPowermeter([100.0])
+        secondary = DelayedPowermeter([5000.0])
+        hedged = HedgedPowermeter([primary, secondary], max_deviation=50)
+        hedged.get_powermeter_watts()
+        primary.error = ConnectionError("down")
+        with self.assertRaises(ValueError):
+            hedged.get_powermeter_watts()
+        self.assertEqual(hedged.rejected, 1)
+        secondary.values = [120.0]
+        self.assertEqual(hedged.get_powermeter_watts(), [120.0])
+
+    def test_non_finite_values_are_rejected(self):
+        hedged = HedgedPowermeter(
+            [DelayedPowermeter([float("nan")]), DelayedPowermeter([42.0])]
+        )
+        self.assertEqual(hedged.get_powermeter_watts(), [42.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
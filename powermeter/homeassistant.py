@@ -1,11 +1,25 @@
 from .base import Powermeter
 import requests
 import json
-from typing import Union, List
+from typing import Dict, Union, List
 from config.logger import logger
 
 
 class HomeAssistant(Powermeter):
+    """
+    Reads power entities through the Home Assistant REST API.
+
+    By default each entity is fetched with its own request. In the bulk
+    fetch modes all entities are read in one round-trip, either by
+    rendering their states with the ``/api/template`` endpoint or by
+    fetching ``/api/states`` once and picking the entities locally.
+    """
+
+    ENTITY = "ENTITY"
+    TEMPLATE = "TEMPLATE"
+    STATES = "STATES"
+    FETCH_MODES = (ENTITY, TEMPLATE, STATES)
+
     def __init__(
         self,
         ip: str,
@@ -17,7 +31,14 @@ class HomeAssistant(Powermeter):
         power_input_alias: Union[str, List[str]],
         power_output_alias: Union[str, List[str]],
         path_prefix: str,
+        fetch_mode: str = ENTITY,
     ):
+        fetch_mode = fetch_mode.upper()
+        if fetch_mode not in self.FETCH_MODES:
+            raise ValueError(
+                f"Unsupported fetch mode {fetch_mode!r}, "
+                f"expected one of {', '.join(self.FETCH_MODES)}"
+            )
         self.ip = ip
         self.port = port
         self.use_https = use_https
@@ -39,22 +60,30 @@ class HomeAssistant(Powermeter):
             else power_output_alias
         )
         self.path_prefix = path_prefix
+        self.fetch_mode = fetch_mode
         self.session = requests.Session()
 
-    def get_json(self, path):
+    def _url(self, path):
         if self.path_prefix:
             path = self.path_prefix + path
         if self.use_https:
-            url = f"https://{self.ip}:{self.port}{path}"
-        else:
-            url = f"http://{self.ip}:{self.port}{path}"
-        headers = {
+            return f"https://{self.ip}:{self.port}{path}"
+        return f"http://{self.ip}:{self.port}{path}"
+
+    def _headers(self):
+        return {
             "Authorization": "Bearer " + self.access_token,
             "content-type": "application/json",
         }
 
+    def get_json(self, path):
+        url = self._url(path)
+        headers = self._headers()
+
         try:
-            response = self.session.get(url, headers=headers, timeout=10)
+            response = self.session.get(
+                url, headers=headers, timeout=self.request_timeout()
+            )
             response.raise_for_status()  # Raise an exception for bad status codes
             return response.json()
         except json.JSONDecodeError as e:
@@ -70,22 +99,82 @@ class HomeAssistant(Powermeter):
             logger.error(f"Unexpected error calling Home Assistant API: {e}")
             raise ValueError(f"Home Assistant API error: {e}")
 
-    def get_powermeter_watts(self):
+    def render_template(self, template: str) -> str:
+        try:
+            response = self.session.post(
+                self._url("/api/template"),
+                headers=self._headers(),
+                json={"template": template},
+                timeout=self.request_timeout(),
+            )
+            response.raise_for_status()
+            return response.text
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to connect to Home Assistant API: {e}")
+            raise ValueError(f"Home Assistant API connection error: {e}")
+
+    def entities(self) -> List[str]:
+        """All entities read per reading, in the order they are combined."""
         if not self.power_calculate:
-            results = []
-            for entity in self.current_power_entity:
-                path = f"/api/states/{entity}"
-                response = self.get_json(path)
-                results.append(float(response["state"]))
-            return results
+            return list(self.current_power_entity)
+        entities = []
+        for in_entity, out_entity in zip(
+            self.power_input_alias, self.power_output_alias
+        ):
+            entities.extend((in_entity, out_entity))
+        return entities
+
+    def _fetch_states_per_entity(self, entities: List[str]) -> Dict[str, str]:
+        return {
+            entity: self.get_json(f"/api/states/{entity}")["state"]
+            for entity in entities
+        }
+
+    def _fetch_states_template(self, entities: List[str]) -> Dict[str, str]:
+        # Entity ids are rendered as JSON string literals, which Jinja accepts
+        template = (
+            "{{ ["
+            + ", ".join(f"states({json.dumps(entity)})" for entity in entities)
+            + "] | tojson }}"
+        )
+        rendered = self.render_template(template)
+        try:
+            states = json.loads(rendered)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Home Assistant template returned invalid JSON: {e}")
+        if not isinstance(states, list) or len(states) != len(entities):
+            raise ValueError(f"Unexpected template result: {rendered[:200]}")
+        return dict(zip(entities, states))
+
+    def _fetch_states_all(self, entities: List[str]) -> Dict[str, str]:
+        wanted = set(entities)
+        states = {
+            state["entity_id"]: state["state"]
+            for state in self.get_json("/api/states")
+            if state.get("entity_id") in wanted
+        }
+        missing = [entity for entity in entities if entity not in states]
+        if missing:
+            raise ValueError(f"Entities not found: {', '.join(missing)}")
+        return states
+
+    def get_powermeter_watts(self):
+        entities = self.entities()
+        if self.fetch_mode == self.TEMPLATE:
+            states = self._fetch_states_template(entities)
+        elif self.fetch_mode == self.STATES:
+            states = self._fetch_states_all(entities)
         else:
-            results = []
+            states = self._fetch_states_per_entity(entities)
+        return self.combine(states)
+
+    def combine(self, states: Dict[str, str]) -> List[float]:
+        """Phase values from the states of all entities."""
+        if not self.power_calculate:
+            return [float(states[entity]) for entity in self.current_power_entity]
+        return [
+            float(states[in_entity]) - float(states[out_entity])
             for in_entity, out_entity in zip(
                 self.power_input_alias, self.power_output_alias
-            ):
-                response = self.get_json(f"/api/states/{in_entity}")
-                power_in = float(response["state"])
-                response = self.get_json(f"/api/states/{out_entity}")
-                power_out = float(response["state"])
-                results.append(power_in - power_out)
-            return results
+            )
+        ]
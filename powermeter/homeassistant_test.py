@@ -100,6 +100,79 @@ class TestPowermeters(unittest.TestCase):
         )
         self.assertEqual(homeassistant.get_powermeter_watts(), [800.0, 1700.0, 2600.0])
 
+    @patch("requests.Session.post")
+    def test_homeassistant_template_fetch_mode(self, mock_post):
+        mock_response = MagicMock()
+        mock_response.text = '["1000", "200", "2000", "300"]'
+        mock_post.return_value = mock_response
+
+        homeassistant = HomeAssistant(
+            "192.168.1.8",
+            "8123",
+            False,
+            "token",
+            "",
+            True,
+            ["sensor.power_in_1", "sensor.power_in_2"],
+            ["sensor.power_out_1", "sensor.power_out_2"],
+            None,
+            "template",
+        )
+        self.assertEqual(homeassistant.get_powermeter_watts(), [800.0, 1700.0])
+        mock_post.assert_called_once()
+        args, kwargs = mock_post.call_args
+        self.assertEqual(args[0], "http://192.168.1.8:8123/api/template")
+        self.assertEqual(
+            kwargs["json"]["template"],
+            '{{ [states("sensor.power_in_1"), states("sensor.power_out_1"), '
+            'states("sensor.power_in_2"), states("sensor.power_out_2")] | tojson }}',
+        )
+
+    @patch("requests.Session.get")
+    def test_homeassistant_states_fetch_mode(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = [
+            {"entity_id": "sensor.power_phase2", "state": "200"},
+            {"entity_id": "sensor.other", "state": "5"},
+            {"entity_id": "sensor.power_phase1", "state": "100"},
+        ]
+        mock_get.return_value = mock_response
+
+        homeassistant = HomeAssistant(
+            "192.168.1.8",
+            "8123",
+            False,
+            "token",
+            ["sensor.power_phase1", "sensor.power_phase2"],
+            False,
+            "",
+            "",
+            None,
+            HomeAssistant.STATES,
+        )
+        self.assertEqual(homeassistant.get_powermeter_watts(), [100.0, 200.0])
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args[0][0], "http://192.168.1.8:8123/api/states")
+
+        mock_response.json.return_value = mock_response.json.return_value[:2]
+        with self.assertRaises(ValueError):
+            homeassistant.get_powermeter_watts()
+
+    def test_homeassistant_unknown_fetch_mode(self):
+        with self.assertRaises(ValueError):
+            HomeAssistant(
+                "ip",
+                "8123",
+                False,
+                "token",
+                "sensor.power",
+                False,
+                "",
+                "",
+                None,
+                "BULK",
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,204 @@
+import json
+import threading
+from typing import Dict, List, Optional, Union
+import websocket
+from config.logger import logger
+from .homeassistant import HomeAssistant
+from .push import PushPowermeter
+
+
+class HomeAssistantWebSocket(HomeAssistant, PushPowermeter):
+    """
+    Home Assistant powermeter fed by the WebSocket API.
+
+    Authenticates once, subscribes to state changes of only the configured
+    entities (``subscribe_entities``) and keeps their last states in memory,
+    so reads do not touch the network. New values are pushed to subscribers
+    as soon as Home Assistant reports them. A lost connection is re-opened
+    with exponential backoff and the entities are subscribed to again;
+    until the first states of the new connection have arrived, reads wait
+    up to ``timeout`` seconds and then fail rather than report outdated
+    values. Once they have arrived, reads fail right away while an entity
+    is missing or unavailable, like the REST API does.
+
+    ``ready`` is the only readiness signal: it is set when the current
+    connection has delivered the states of the subscribed entities, and
+    cleared when the connection is lost. ``wait_for_message`` and reads
+    wait on it.
+    """
+
+    FETCH_MODE = "WEBSOCKET"
+
+    def __init__(
+        self,
+        ip: str,
+        port: str,
+        use_https: bool,
+        access_token: str,
+        current_power_entity: Union[str, List[str]],
+        power_calculate: bool,
+        power_input_alias: Union[str, List[str]],
+        power_output_alias: Union[str, List[str]],
+        path_prefix: str,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        idle_timeout: float = 90.0,
+    ):
+        HomeAssistant.__init__(
+            self,
+            ip,
+            port,
+            use_https,
+            access_token,
+            current_power_entity,
+            power_calculate,
+            power_input_alias,
+            power_output_alias,
+            path_prefix,
+        )
+        PushPowermeter.__init__(self)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.idle_timeout = idle_timeout
+        self._states: Dict[str, str] = {}
+        self._values: Optional[List[float]] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._websocket: Optional[websocket.WebSocket] = None
+        self._message_id = 0
+        self.connections = 0
+        self._thread = threading.Thread(
+            target=self._run, name="homeassistant-websocket", daemon=True
+        )
+        self._thread.start()
+
+    def websocket_url(self) -> str:
+        url = self._url("/api/websocket")
+        return "ws" + url[len("http") :]
+
+    def get_powermeter_watts(self):
+        if self._values is None:
+            self.ready.wait(self.request_timeout())
+        values = self._values
+        if values is None:
+            raise ValueError("No state received from Home Assistant")
+        return values
+
+    def stop(self):
+        self._stopped.set()
+        connection = self._websocket
+        if connection is not None:
+            # Wakes up the thread blocked in recv
+            connection.abort()
+        self._thread.join()
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            connections = self.connections
+            try:
+                self._session()
+            except (OSError, ValueError, websocket.WebSocketException) as e:
+                if self._stopped.is_set():
+                    break
+                logger.warning(f"Home Assistant WebSocket connection lost: {e}")
+            finally:
+                self._disconnect()
+            if self.connections != connections:
+                # The connection worked, so start backing off from scratch
+                delay = self.reconnect_delay
+            if self._stopped.wait(delay):
+                break
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _disconnect(self):
+        connection, self._websocket = self._websocket, None
+        if connection is not None:
+            connection.shutdown()
+        with self._lock:
+            self._states = {}
+            self._values = None
+            self.ready.clear()
+
+    def _send(self, connection: websocket.WebSocket, message: dict) -> int:
+        self._message_id += 1
+        message["id"] = self._message_id
+        connection.send(json.dumps(message))
+        return self._message_id
+
+    @staticmethod
+    def _receive(connection: websocket.WebSocket) -> dict:
+        text = connection.recv()
+        if not text:
+            # A close frame, pings are answered by the client itself
+            raise ConnectionError("WebSocket connection closed by Home Assistant")
+        return json.loads(text)
+
+    def _session(self):
+        connection = websocket.create_connection(
+            self.websocket_url(), timeout=self.timeout
+        )
+        self._websocket = connection
+        if self._stopped.is_set():
+            return
+
+        message = self._receive(connection)
+        if message.get("type") == "auth_required":
+            connection.send(
+                json.dumps({"type": "auth", "access_token": self.access_token})
+            )
+            message = self._receive(connection)
+        if message.get("type") != "auth_ok":
+            raise ValueError(f"Home Assistant authentication failed: {message}")
+
+        self._message_id = 0
+        subscription = self._send(
+            connection,
+            {"type": "subscribe_entities", "entity_ids": sorted(set(self.entities()))},
+        )
+        self.connections += 1
+        logger.info("Subscribed to Home Assistant entities via WebSocket")
+
+        connection.settimeout(self.idle_timeout)
+        pinged = False
+        while not self._stopped.is_set():
+            try:
+                message = self._receive(connection)
+            except websocket.WebSocketTimeoutException:
+                # Check the connection is still alive before giving up on it
+                if pinged:
+                    raise ConnectionError("No answer from Home Assistant")
+                self._send(connection, {"type": "ping"})
+                pinged = True
+                continue
+            pinged = False
+            if message.get("id") != subscription:
+                continue
+            if message.get("type") == "result" and not message.get("success"):
+                raise ValueError(f"Subscribing to entities failed: {message}")
+            if message.get("type") == "event":
+                self._on_event(message.get("event") or {})
+
+    def _on_event(self, event: dict):
+        with self._lock:
+            # The initial states of this connection have arrived
+            self.ready.set()
+            for entity, state in event.get("a", {}).items():
+                self._states[entity] = state.get("s")
+            for entity, diff in event.get("c", {}).items():
+                state = diff.get("+", {})
+                if "s" in state:
+                    self._states[entity] = state["s"]
+            for entity in event.get("r", []):
+                self._states.pop(entity, None)
+
+            try:
+                values = self.combine(self._states)
+            except (KeyError, TypeError, ValueError):
+                # Not all entities known yet, or one is unavailable
+                self._values = None
+                return
+            changed = values != self._values
+            self._values = values
+        if changed:
+            self.publish(values)
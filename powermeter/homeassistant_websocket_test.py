@@ -0,0 +1,228 @@
+import base64
+import hashlib
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+import unittest
+
+from .homeassistant_websocket import HomeAssistantWebSocket
+
+
+class ServerWebSocket:
+    """Server side of a WebSocket connection, as much as the tests need."""
+
+    def __init__(self, conn):
+        self.file = conn.makefile("rb")
+        self.conn = conn
+
+    def handshake(self):
+        key = None
+        for line in iter(self.file.readline, b"\r\n"):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "sec-websocket-key":
+                key = value.strip()
+        digest = hashlib.sha1(
+            (key + "258EAFA5-E914-47DA-95CA-C5AB0DC85B11").encode()
+        ).digest()
+        self.conn.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {base64.b64encode(digest).decode()}\r\n\r\n"
+            ).encode()
+        )
+
+    def send_text(self, text):
+        payload = text.encode()
+        if len(payload) < 126:
+            header = struct.pack("!BB", 0x81, len(payload))
+        else:
+            header = struct.pack("!BBH", 0x81, 126, len(payload))
+        self.conn.sendall(header + payload)
+
+    def recv_text(self):
+        while True:
+            head = self.file.read(2)
+            if len(head) < 2:
+                raise ConnectionError("Client closed the connection")
+            opcode, length = head[0] & 0x0F, head[1] & 0x7F
+            if length == 126:
+                (length,) = struct.unpack("!H", self.file.read(2))
+            elif length == 127:
+                (length,) = struct.unpack("!Q", self.file.read(8))
+            mask = self.file.read(4)
+            payload = bytes(
+                b ^ mask[i % 4] for i, b in enumerate(self.file.read(length))
+            )
+            if opcode == 0x8:
+                raise ConnectionError("Client closed the connection")
+            if opcode == 0x1:
+                return payload.decode()
+
+
+class StandInHomeAssistant:
+    """Local WebSocket server speaking the subset of the HA API used here."""
+
+    def __init__(self, states, token="token"):
+        self.states = states
+        self.token = token
+        self.subscriptions = queue.Queue()
+        self.outbox = queue.Queue()
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            try:
+                self._session(conn)
+            except (OSError, ValueError):
+                pass
+            finally:
+                conn.close()
+
+    def _session(self, conn):
+        websocket = ServerWebSocket(conn)
+        websocket.handshake()
+        websocket.send_text(json.dumps({"type": "auth_required"}))
+        auth = json.loads(websocket.recv_text())
+        if auth["access_token"] != self.token:
+            websocket.send_text(json.dumps({"type": "auth_invalid"}))
+            return
+        websocket.send_text(json.dumps({"type": "auth_ok"}))
+
+        request = json.loads(websocket.recv_text())
+        self.subscriptions.put(request)
+        subscription = request["id"]
+        websocket.send_text(
+            json.dumps({"id": subscription, "type": "result", "success": True})
+        )
+        added = {
+            entity: {"s": state, "a": {}}
+            for entity, state in self.states.items()
+            if entity in request["entity_ids"]
+        }
+        websocket.send_text(
+            json.dumps({"id": subscription, "type": "event", "event": {"a": added}})
+        )
+        while True:
+            changes = self.outbox.get()
+            if changes is None:
+                return
+            self.states.update(changes)
+            event = {"c": {entity: {"+": {"s": s}} for entity, s in changes.items()}}
+            websocket.send_text(
+                json.dumps({"id": subscription, "type": "event", "event": event})
+            )
+
+    def change(self, **states):
+        self.outbox.put({f"sensor.{name}": state for name, state in states.items()})
+
+    def drop_connection(self):
+        self.outbox.put(None)
+
+    def close(self):
+        self.listener.close()
+        self.outbox.put(None)
+
+
+class TestHomeAssistantWebSocket(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInHomeAssistant(
+            {
+                "sensor.power_in": "1000",
+                "sensor.power_out": "200",
+                "sensor.unrelated": "5",
+            }
+        )
+        self.addCleanup(self.server.close)
+
+    def create(self, token="token"):
+        powermeter = HomeAssistantWebSocket(
+            "127.0.0.1",
+            str(self.server.port),
+            False,
+            token,
+            "",
+            True,
+            "sensor.power_in",
+            "sensor.power_out",
+            None,
+            reconnect_delay=0.01,
+        )
+        self.addCleanup(powermeter.stop)
+        return powermeter
+
+    def test_reads_subscribed_states_without_requests(self):
+        powermeter = self.create()
+        powermeter.wait_for_message(timeout=2)
+        self.assertTrue(powermeter.ready.is_set())
+        subscription = self.server.subscriptions.get(timeout=2)
+        self.assertEqual(subscription["type"], "subscribe_entities")
+        self.assertEqual(
+            subscription["entity_ids"], ["sensor.power_in", "sensor.power_out"]
+        )
+        self.assertEqual(powermeter.get_powermeter_watts(), [800.0])
+
+    def test_pushes_state_changes(self):
+        powermeter = self.create()
+        powermeter.wait_for_message(timeout=2)
+        pushed = queue.Queue()
+        powermeter.subscribe(pushed.put)
+
+        self.server.change(power_in="1500")
+        self.assertEqual(pushed.get(timeout=2), [1300.0])
+        self.assertEqual(powermeter.get_powermeter_watts(), [1300.0])
+
+    def test_unavailable_entity_fails_reads(self):
+        powermeter = self.create()
+        powermeter.wait_for_message(timeout=2)
+
+        self.server.change(power_out="unavailable")
+        deadline = time.monotonic() + 2
+        while powermeter._values is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Fails right away instead of waiting for the request timeout
+        started = time.monotonic()
+        with self.assertRaises(ValueError):
+            powermeter.get_powermeter_watts()
+        self.assertLess(time.monotonic() - started, 0.5)
+
+        self.server.change(power_out="100")
+        powermeter.wait_for_message(timeout=2)
+        deadline = time.monotonic() + 2
+        while powermeter._values is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(powermeter.get_powermeter_watts(), [900.0])
+
+    def test_reconnects_and_resubscribes(self):
+        powermeter = self.create()
+        powermeter.wait_for_message(timeout=2)
+        self.server.subscriptions.get(timeout=2)
+
+        self.server.change(power_in="1100")
+        self.server.drop_connection()
+        self.server.subscriptions.get(timeout=2)
+        # The new connection is ready once its states have arrived
+        powermeter.wait_for_message(timeout=2)
+        self.assertEqual(powermeter.get_powermeter_watts(), [900.0])
+        self.assertEqual(powermeter.connections, 2)
+
+    def test_invalid_token(self):
+        powermeter = self.create(token="wrong")
+        with self.assertRaises(TimeoutError):
+            powermeter.wait_for_message(timeout=0.2)
+        self.assertFalse(powermeter.ready.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,7 +22,7 @@ class IoBroker(Powermeter):
 
     def get_json(self, path):
         url = f"http://{self.ip}:{self.port}{path}"
-        return self.session.get(url, timeout=10).json()
+        return self.session.get(url, timeout=self.request_timeout()).json()
 
     def get_powermeter_watts(self):
         if not self.power_calculate:
@@ -2,18 +2,9 @@ from .base import Powermeter
 import requests
 from typing import Union, List, Dict, Optional
 import json
-from jsonpath_ng import parse
 from requests.auth import HTTPBasicAuth
 from config.logger import logger
-
-
-def extract_json_value(data, path):
-    jsonpath_expr = parse(path)
-    match = jsonpath_expr.find(data)
-    if match:
-        return float(match[0].value)
-    else:
-        raise ValueError("No match found for the JSON path")
+from .json_path import JsonPaths
 
 
 class JsonHttpPowermeter(Powermeter):
@@ -27,6 +18,7 @@ class JsonHttpPowermeter(Powermeter):
     ):
         self.url = url
         self.json_paths = [json_path] if isinstance(json_path, str) else list(json_path)
+        self._extractor = JsonPaths(self.json_paths)
         self.auth = HTTPBasicAuth(username, password) if username or password else None
         self.headers = headers or {}
         self.session = requests.Session()
@@ -34,7 +26,10 @@ class JsonHttpPowermeter(Powermeter):
     def get_json(self):
         try:
             response = self.session.get(
-                self.url, headers=self.headers, auth=self.auth, timeout=10
+                self.url,
+                headers=self.headers,
+                auth=self.auth,
+                timeout=self.request_timeout(),
             )
             response.raise_for_status()
             return response.json()
@@ -47,8 +42,4 @@ class JsonHttpPowermeter(Powermeter):
             raise ValueError(f"HTTP request error: {e}")
 
     def get_powermeter_watts(self) -> List[float]:
-        data = self.get_json()
-        values = []
-        for path in self.json_paths:
-            values.append(extract_json_value(data, path))
-        return values
+        return self._extractor.extract(self.get_json())
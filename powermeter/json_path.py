@@ -0,0 +1,114 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from jsonpath_ng import parse
+
+# Paths made of plain keys and list indices only, e.g. $.SML.values[0].curr_w
+_SIMPLE_PATH = re.compile(r"\$(?:\.[A-Za-z_]\w*|\[\d+\])*\Z")
+_SIMPLE_STEP = re.compile(r"\.([A-Za-z_]\w*)|\[(\d+)\]")
+
+Step = Union[str, int]
+
+_MISSING = object()
+
+
+def _simple_steps(path: str) -> Optional[Tuple[Step, ...]]:
+    path = path.strip()
+    if not _SIMPLE_PATH.match(path):
+        return None
+    return tuple(
+        key if key else int(index) for key, index in _SIMPLE_STEP.findall(path)
+    )
+
+
+def _step(node: Any, step: Step) -> Any:
+    if type(step) is int:
+        # Like jsonpath_ng, indices also apply to strings
+        if isinstance(node, (list, str)) and step < len(node):
+            return node[step]
+        return _MISSING
+    if isinstance(node, dict):
+        return node.get(step, _MISSING)
+    return _MISSING
+
+
+class JsonPath:
+    """
+    A JSONPath expression compiled once for repeated extraction.
+
+    Paths consisting only of keys and list indices (``$.a.b[0].c``) are
+    resolved by walking the document directly; every other expression is
+    parsed by jsonpath_ng once and evaluated with it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.steps = _simple_steps(path)
+        self._expression = None if self.steps is not None else parse(path)
+
+    def find(self, data: Any) -> Any:
+        """The first value matching the path; raises ``ValueError`` if none."""
+        if self.steps is None:
+            match = self._expression.find(data)
+            if match:
+                return match[0].value
+            raise ValueError("No match found for the JSON path")
+        node = data
+        for step in self.steps:
+            node = _step(node, step)
+            if node is _MISSING:
+                raise ValueError("No match found for the JSON path")
+        return node
+
+    def extract(self, data: Any) -> float:
+        return float(self.find(data))
+
+
+class JsonPaths:
+    """
+    Several compiled JSONPath expressions evaluated over one document.
+
+    The simple paths are merged into a tree of their steps, so a prefix
+    shared by several paths (e.g. ``$.ENERGY.Power[0]`` and
+    ``$.ENERGY.Power[1]``) is walked only once per document.
+    """
+
+    def __init__(self, paths: Sequence[str]):
+        self.paths = [JsonPath(path) for path in paths]
+        self._tree: Dict[Step, Any] = {}
+        for index, path in enumerate(self.paths):
+            if path.steps is None:
+                continue
+            node = self._tree
+            for step in path.steps:
+                node = node.setdefault(step, {})
+            node.setdefault(None, []).append(index)
+
+    def extract(self, data: Any) -> List[float]:
+        values: List[Any] = [_MISSING] * len(self.paths)
+        self._walk(self._tree, data, values)
+        for index, path in enumerate(self.paths):
+            if path.steps is None:
+                values[index] = path.find(data)
+            elif values[index] is _MISSING:
+                raise ValueError("No match found for the JSON path")
+        return [float(value) for value in values]
+
+    def _walk(self, tree: Dict[Step, Any], node: Any, values: List[Any]):
+        for step, child in tree.items():
+            if step is None:
+                for index in child:
+                    values[index] = node
+                continue
+            value = _step(node, step)
+            if value is not _MISSING:
+                self._walk(child, value, values)
+
+
+@lru_cache(maxsize=128)
+def compile_json_path(path: str) -> JsonPath:
+    return JsonPath(path)
+
+
+def extract_json_value(data, path):
+    return compile_json_path(path).extract(data)
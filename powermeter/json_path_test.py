@@ -0,0 +1,56 @@
+import unittest
+
+from .json_path import JsonPath, JsonPaths, compile_json_path, extract_json_value
+
+
+class TestJsonPath(unittest.TestCase):
+    data = {
+        "StatusSNS": {
+            "ENERGY": {"Power": [100, "200.5", 300]},
+            "Meters": [{"id": "a", "power": 1}, {"id": "b", "power": 2}],
+        }
+    }
+
+    def test_simple_paths_skip_jsonpath_ng(self):
+        path = JsonPath("$.StatusSNS.ENERGY.Power[1]")
+        self.assertEqual(path.steps, ("StatusSNS", "ENERGY", "Power", 1))
+        self.assertIsNone(path._expression)
+        self.assertEqual(path.extract(self.data), 200.5)
+
+    def test_other_paths_use_jsonpath_ng(self):
+        path = JsonPath("$.StatusSNS.Meters[*].power")
+        self.assertIsNone(path.steps)
+        self.assertEqual(path.extract(self.data), 1)
+
+    def test_missing_values(self):
+        for path in (
+            "$.StatusSNS.ENERGY.Voltage",
+            "$.StatusSNS.ENERGY.Power[3]",
+            "$.StatusSNS.ENERGY[0]",
+            "$.StatusSNS.Meters.power",
+        ):
+            with self.assertRaises(ValueError):
+                JsonPath(path).find(self.data)
+
+    def test_paths_share_prefixes(self):
+        paths = JsonPaths(
+            [
+                "$.StatusSNS.ENERGY.Power[2]",
+                "$.StatusSNS.ENERGY.Power[0]",
+                "$.StatusSNS.Meters[*].power",
+                "$.StatusSNS.ENERGY.Power[2]",
+            ]
+        )
+        self.assertEqual(list(paths._tree), ["StatusSNS"])
+        self.assertEqual(paths.extract(self.data), [300.0, 100.0, 1.0, 300.0])
+
+        with self.assertRaises(ValueError):
+            JsonPaths(["$.StatusSNS.ENERGY.Power[0]", "$.missing"]).extract(self.data)
+
+    def test_extract_json_value_compiles_once(self):
+        self.assertIs(compile_json_path("$.a.b"), compile_json_path("$.a.b"))
+        self.assertEqual(extract_json_value({"a": {"b": "1.5"}}, "$.a.b"), 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
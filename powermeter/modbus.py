@@ -1,20 +1,23 @@
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
 from .base import Powermeter
 from pymodbus.client import ModbusTcpClient
-from pymodbus.payload import BinaryPayloadDecoder
-from pymodbus.constants import Endian
+from pymodbus.exceptions import ModbusException
 
-
-DATA_TYPE_DECODERS = {
-    "FLOAT32": "decode_32bit_float",
-    "INT16": "decode_16bit_int",
-    "UINT16": "decode_16bit_uint",
-    "INT32": "decode_32bit_int",
-    "UINT32": "decode_32bit_uint",
+# struct format character and register count of each data type
+DATA_TYPES = {
+    "FLOAT32": ("f", 2),
+    "INT16": ("h", 1),
+    "UINT16": ("H", 1),
+    "INT32": ("i", 2),
+    "UINT32": ("I", 2),
 }
 
 BYTE_ORDERS = {
-    "BIG": Endian.BIG,
-    "LITTLE": Endian.LITTLE,
+    "BIG": ">",
+    "LITTLE": "<",
 }
 
 
@@ -23,8 +26,159 @@ REGISTER_TYPES = {
     "INPUT": "read_input_registers",
 }
 
+# Most registers a single read request may return
+MAX_REGISTERS_PER_READ = 125
+
+
+class RegisterPoint:
+    """
+    A value stored in one or more registers, decoded straight from them.
+
+    The byte order applies within each register, the word order to the
+    registers of multi-register values, as with pymodbus'
+    ``BinaryPayloadDecoder``.
+    """
+
+    def __init__(
+        self,
+        address: int,
+        data_type: str = "UINT16",
+        byte_order: str = "BIG",
+        word_order: str = "BIG",
+    ):
+        self.address = address
+        self.data_type = data_type.upper()
+        if self.data_type not in DATA_TYPES:
+            raise ValueError(f"Unsupported data type: {data_type}")
+        code, self.count = DATA_TYPES[self.data_type]
+        byte_prefix = BYTE_ORDERS.get(byte_order.upper(), ">")
+        self._words = struct.Struct(f"{byte_prefix}{self.count}H")
+        self._value = struct.Struct(f">{code}")
+        self._reverse_words = word_order.upper() == "LITTLE"
+
+    def decode(self, registers: Sequence[int], offset: int = 0) -> float:
+        words = registers[offset : offset + self.count]
+        if len(words) < self.count:
+            raise ValueError(f"Not enough registers for {self.data_type}")
+        if self._reverse_words:
+            words = words[::-1]
+        return float(self._value.unpack(self._words.pack(*words))[0])
+
+
+def plan_blocks(
+    points: Sequence[RegisterPoint], max_gap: int = 8
+) -> List[Tuple[int, int, List[int]]]:
+    """
+    Coalesce points into as few block reads as possible.
+
+    Points whose registers are adjacent, overlapping or at most ``max_gap``
+    registers apart are read together, as long as a block stays within the
+    Modbus limit of registers per read. Returns ``(address, count, indices)``
+    per block, with the indices of its points in ``points``.
+    """
+    blocks = []
+    for index in sorted(range(len(points)), key=lambda i: points[i].address):
+        point = points[index]
+        end = point.address + point.count
+        if blocks:
+            start, count, indices = blocks[-1]
+            if (
+                point.address <= start + count + max_gap
+                and max(end, start + count) - start <= MAX_REGISTERS_PER_READ
+            ):
+                blocks[-1] = (start, max(end, start + count) - start, indices)
+                indices.append(index)
+                continue
+        blocks.append((point.address, point.count, [index]))
+    return blocks
+
+
+class ModbusConnection:
+    """
+    One supervised TCP connection to a Modbus host, shared by its readers.
+
+    Requests are serialized, since the client is not thread-safe. After a
+    connection error the client is closed and not reconnected before an
+    exponentially growing delay has passed; until then reads fail right
+    away instead of each waiting for the timeout.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self.host = host
+        self.port = port
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._retry_at = 0.0
+        self.reads = 0
+        self.client = ModbusTcpClient(host, port=port)
+
+    def read(
+        self,
+        register_type: str,
+        address: int,
+        count: int,
+        unit_id: int,
+        timeout: Optional[float],
+    ) -> List[int]:
+        read = getattr(self.client, REGISTER_TYPES[register_type])
+        with self._lock:
+            if self._failures and self._clock() < self._retry_at:
+                raise ConnectionError(
+                    f"Modbus host {self.host}:{self.port} unreachable, "
+                    f"retrying in {self._retry_at - self._clock():.1f}s"
+                )
+            # The client reads its timeout from comm_params on every request
+            self.client.comm_params.timeout_connect = timeout
+            try:
+                if not self.client.connected and not self.client.connect():
+                    raise ConnectionError(
+                        f"Cannot connect to Modbus host {self.host}:{self.port}"
+                    )
+                result = read(address, count=count, slave=unit_id)
+            except (ConnectionError, ModbusException) as e:
+                self._failed()
+                raise ConnectionError(f"Modbus connection error: {e}") from e
+            self._failures = 0
+            self.reads += 1
+        if result.isError():
+            raise ValueError(f"Error reading Modbus registers {address}+{count}")
+        return result.registers
+
+    def _failed(self):
+        self.client.close()
+        self._failures += 1
+        delay = self.base_delay * 2 ** (self._failures - 1)
+        self._retry_at = self._clock() + min(delay, self.max_delay)
+
+
+_connections: Dict[Tuple[str, int], ModbusConnection] = {}
+_connections_lock = threading.Lock()
+
+
+def shared_connection(host: str, port: int) -> ModbusConnection:
+    """The connection to ``host:port`` shared by all powermeters using it."""
+    with _connections_lock:
+        connection = _connections.get((host, port))
+        if connection is None:
+            connection = ModbusConnection(host, port)
+            _connections[(host, port)] = connection
+        return connection
+
 
 class ModbusPowermeter(Powermeter):
+    # pymodbus' own default
+    timeout = 3.0
+
     def __init__(
         self,
         host,
@@ -46,11 +200,9 @@ class ModbusPowermeter(Powermeter):
         self.byte_order = byte_order.upper()
         self.word_order = word_order.upper()
 
-        self._byte_order = BYTE_ORDERS.get(self.byte_order, Endian.BIG)
-        self._word_order = BYTE_ORDERS.get(self.word_order, Endian.BIG)
-        self._decode_method = DATA_TYPE_DECODERS.get(self.data_type)
-        if not self._decode_method:
-            raise ValueError(f"Unsupported data type: {data_type}")
+        self._point = RegisterPoint(
+            address, self.data_type, self.byte_order, self.word_order
+        )
 
         self.register_type = register_type.upper()
         self._read_method = REGISTER_TYPES.get(self.register_type)
@@ -60,14 +212,59 @@ class ModbusPowermeter(Powermeter):
         self.client = ModbusTcpClient(host, port=port)
 
     def get_powermeter_watts(self):
+        # The client reads its timeout from comm_params on every request
+        self.client.comm_params.timeout_connect = self.request_timeout()
         read = getattr(self.client, self._read_method)
-        result = read(self.address, self.count, unit=self.unit_id)
+        result = read(self.address, count=self.count, slave=self.unit_id)
         if result.isError():
             raise Exception("Error reading Modbus data")
-        decoder = BinaryPayloadDecoder.fromRegisters(
-            result.registers,
-            byteorder=self._byte_order,
-            wordorder=self._word_order,
-        )
-        value = getattr(decoder, self._decode_method)()
-        return [float(value)]
+        return [self._point.decode(result.registers)]
+
+
+class ModbusMultiPowermeter(Powermeter):
+    """
+    Reads several register points of one device, e.g. one per phase.
+
+    Points are coalesced into the fewest block reads (see ``plan_blocks``)
+    and decoded straight from the returned registers. All powermeters of a
+    host share one supervised connection.
+    """
+
+    # pymodbus' own default
+    timeout = 3.0
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        unit_id: int,
+        points: Sequence[RegisterPoint],
+        register_type: str = "HOLDING",
+        max_gap: int = 8,
+    ):
+        if not points:
+            raise ValueError("At least one register address is required")
+        self.host = host
+        self.port = port
+        self.unit_id = unit_id
+        self.points = list(points)
+        self.register_type = register_type.upper()
+        if self.register_type not in REGISTER_TYPES:
+            raise ValueError(f"Unsupported register type: {register_type}")
+        self.blocks = plan_blocks(self.points, max_gap)
+        self.connection = shared_connection(host, port)
+
+    def get_powermeter_watts(self) -> List[float]:
+        values = [0.0] * len(self.points)
+        for address, count, indices in self.blocks:
+            registers = self.connection.read(
+                self.register_type,
+                address,
+                count,
+                self.unit_id,
+                self.request_timeout(),
+            )
+            for index in indices:
+                point = self.points[index]
+                values[index] = point.decode(registers, point.address - address)
+        return values
@@ -1,6 +1,21 @@
+import asyncio
+import itertools
+import math
+import random
+import struct
+import threading
 import unittest
 from unittest.mock import patch
-from powermeter import ModbusPowermeter
+from pymodbus.datastore import (
+    ModbusSequentialDataBlock,
+    ModbusServerContext,
+    ModbusSlaveContext,
+)
+from pymodbus.payload import BinaryPayloadDecoder
+from pymodbus.constants import Endian
+from pymodbus.server import ModbusTcpServer
+from powermeter import ModbusPowermeter, ModbusMultiPowermeter, RegisterPoint
+from .modbus import DATA_TYPES, ModbusConnection, plan_blocks
 
 
 class TestPowermeters(unittest.TestCase):
@@ -46,5 +61,139 @@ class TestPowermeters(unittest.TestCase):
         mock_client.read_input_registers.assert_called_once()
 
 
+class TestRegisterPoint(unittest.TestCase):
+    def test_decoding_matches_binary_payload_decoder(self):
+        methods = {
+            "FLOAT32": "decode_32bit_float",
+            "INT16": "decode_16bit_int",
+            "UINT16": "decode_16bit_uint",
+            "INT32": "decode_32bit_int",
+            "UINT32": "decode_32bit_uint",
+        }
+        orders = {"BIG": Endian.BIG, "LITTLE": Endian.LITTLE}
+        rng = random.Random(1)
+        for data_type, byte_order, word_order in itertools.product(
+            DATA_TYPES, orders, orders
+        ):
+            point = RegisterPoint(0, data_type, byte_order, word_order)
+            for _ in range(20):
+                registers = [rng.randrange(1 << 16) for _ in range(point.count)]
+                decoder = BinaryPayloadDecoder.fromRegisters(
+                    registers,
+                    byteorder=orders[byte_order],
+                    wordorder=orders[word_order],
+                )
+                expected = getattr(decoder, methods[data_type])()
+                value = point.decode(registers)
+                if not (math.isnan(expected) and math.isnan(value)):
+                    self.assertEqual(value, expected)
+
+    def test_blocks_coalesce_nearby_points(self):
+        points = [
+            RegisterPoint(4, "FLOAT32"),
+            RegisterPoint(0, "FLOAT32"),
+            RegisterPoint(2, "FLOAT32"),
+            RegisterPoint(20, "INT16"),
+            RegisterPoint(200, "UINT32"),
+        ]
+        self.assertEqual(
+            plan_blocks(points, max_gap=0),
+            [(0, 6, [1, 2, 0]), (20, 1, [3]), (200, 2, [4])],
+        )
+        self.assertEqual(
+            plan_blocks(points, max_gap=16), [(0, 21, [1, 2, 0, 3]), (200, 2, [4])]
+        )
+        # A block never exceeds the registers allowed per read
+        far = [RegisterPoint(0), RegisterPoint(124), RegisterPoint(125)]
+        self.assertEqual(
+            plan_blocks(far, max_gap=200), [(0, 125, [0, 1]), (125, 1, [2])]
+        )
+
+
+def float_registers(*values):
+    return list(
+        struct.unpack(f">{2 * len(values)}H", struct.pack(f">{len(values)}f", *values))
+    )
+
+
+class LocalModbusServer:
+    """pymodbus TCP server with an in-memory datastore, run on its own loop."""
+
+    def __init__(self, holding_registers):
+        store = ModbusSlaveContext(
+            hr=ModbusSequentialDataBlock(0, holding_registers), zero_mode=True
+        )
+        self.context = ModbusServerContext(slaves={1: store}, single=False)
+        self.loop = asyncio.new_event_loop()
+        self.started = threading.Event()
+        self.thread = threading.Thread(
+            target=self.loop.run_until_complete, args=(self._serve(),), daemon=True
+        )
+        self.thread.start()
+        self.started.wait(5)
+        self.port = self.server.transport.sockets[0].getsockname()[1]
+
+    async def _serve(self):
+        self.server = ModbusTcpServer(self.context, address=("127.0.0.1", 0))
+        task = asyncio.ensure_future(self.server.serve_forever())
+        while self.server.transport is None:
+            await asyncio.sleep(0.01)
+        self.started.set()
+        await task
+
+    def stop(self):
+        if not self.thread.is_alive():
+            return
+        asyncio.run_coroutine_threadsafe(self.server.shutdown(), self.loop).result(5)
+        self.thread.join(5)
+
+
+class TestModbusMultiPowermeter(unittest.TestCase):
+    def setUp(self):
+        registers = [0] * 64
+        registers[0:6] = float_registers(100.5, -200.25, 300.0)
+        registers[40] = 0xFFFF
+        self.server = LocalModbusServer(registers)
+        self.addCleanup(self.server.stop)
+
+    def create(self, points, **kwargs):
+        return ModbusMultiPowermeter("127.0.0.1", self.server.port, 1, points, **kwargs)
+
+    def test_phases_are_read_in_one_block(self):
+        powermeter = self.create(
+            [RegisterPoint(address, "FLOAT32") for address in (0, 2, 4)]
+        )
+        self.assertEqual(powermeter.get_powermeter_watts(), [100.5, -200.25, 300.0])
+        self.assertEqual(powermeter.connection.reads, 1)
+
+    def test_sections_share_the_connection(self):
+        first = self.create([RegisterPoint(0, "FLOAT32")])
+        second = self.create([RegisterPoint(40, "INT16"), RegisterPoint(4, "FLOAT32")])
+        self.assertIs(first.connection, second.connection)
+        self.assertEqual(len(second.blocks), 2)
+        self.assertEqual(second.get_powermeter_watts(), [-1.0, 300.0])
+        self.assertEqual(first.get_powermeter_watts(), [100.5])
+
+    def test_unreachable_host_backs_off(self):
+        now = [0.0]
+        connection = ModbusConnection(
+            "127.0.0.1", self.server.port, base_delay=1.0, clock=lambda: now[0]
+        )
+        self.server.stop()
+        self.addCleanup(connection.client.close)
+        with self.assertRaises(ConnectionError):
+            connection.read("HOLDING", 0, 1, 1, 0.5)
+        with patch.object(connection.client, "connect") as connect:
+            # Fails right away until the backoff delay has passed
+            with self.assertRaises(ConnectionError):
+                connection.read("HOLDING", 0, 1, 1, 0.5)
+            connect.assert_not_called()
+            now[0] = 1.5
+            connect.return_value = False
+            with self.assertRaises(ConnectionError):
+                connection.read("HOLDING", 0, 1, 1, 0.5)
+            connect.assert_called_once()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,21 +1,31 @@
-from .base import Powermeter
+from .push import PushPowermeter
 import json
-import paho.mqtt.client as mqtt
-from jsonpath_ng import parse
+import threading
 import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from paho.mqtt.client import topic_matches_sub
 from config.logger import logger
+from .json_path import JsonPath, extract_json_value
+from . import mqtt_client
 
 
-def extract_json_value(data, path):
-    jsonpath_expr = parse(path)
-    match = jsonpath_expr.find(data)
-    if match:
-        return float(match[0].value)
-    else:
-        raise ValueError("No match found for the JSON path")
+class MqttPowermeter(PushPowermeter):
+    """
+    Powermeter fed by MQTT messages.
 
+    Each phase is read from its own topic and optional JSON path, several
+    phases may also come from one topic with different paths. All
+    powermeters using the same broker and credentials share one client.
+    A reading is published once every phase has been refreshed since the
+    previous one, with all phase values received within ``phase_window``
+    seconds, so subscribers never see a mix of old and new phases. Reads
+    return the current phase values while they are within the window of
+    each other and otherwise the last set that was.
+    """
+
+    # Seconds a request waits for the first message, none by default
+    timeout = 0.0
 
-class MqttPowermeter(Powermeter):
     def __init__(
         self,
         broker: str,
@@ -24,51 +34,101 @@ class MqttPowermeter(Powermeter):
         json_path: str = None,
         username: str = None,
         password: str = None,
+        topics: Optional[Sequence[Tuple[str, Optional[str]]]] = None,
+        phase_window: float = 5.0,
     ):
+        super().__init__()
         self.broker = broker
         self.port = port
         self.topic = topic
         self.json_path = json_path
         self.username = username
         self.password = password
-        self.value = None
+        self.phases = list(topics) if topics else [(topic, json_path)]
+        self.phase_window = phase_window
+        self.values: List[Optional[float]] = [None] * len(self.phases)
+        self._received_at = [0.0] * len(self.phases)
+        self._refreshed = set()
+        self._consistent: Optional[List[float]] = None
+        self._lock = threading.Lock()
 
-        # Initialize MQTT client
-        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-        if self.username and self.password:
-            self.client.username_pw_set(self.username, self.password)
-        self.client.on_connect = self.on_connect
-        self.client.on_message = self.on_message
+        # Phases read from each topic, with the compiled JSON path of each
+        self._topics: Dict[str, List[Tuple[int, Optional[JsonPath]]]] = {}
+        for phase, (phase_topic, phase_path) in enumerate(self.phases):
+            self._topics.setdefault(phase_topic, []).append(
+                (phase, JsonPath(phase_path) if phase_path else None)
+            )
 
-        # Connect to the broker
-        self.client.connect(self.broker, self.port, 60)
-        self.client.loop_start()
+        self._shared = None
+        for phase_topic in self._topics:
+            self._shared = mqtt_client.subscribe(
+                broker, port, username, password, phase_topic, self.on_message
+            )
+        self.client = self._shared.client
 
-    def on_connect(self, client, userdata, flags, reason_code, properties):
-        logger.info(f"Connected with result code {reason_code}")
-        # Subscribe to the topic
-        client.subscribe(self.topic)
+    @property
+    def value(self) -> Optional[float]:
+        return self.values[0]
 
-    def on_message(self, client, userdata, msg):
-        payload = msg.payload.decode()
-        if self.json_path:
-            try:
-                data = json.loads(payload)
-                self.value = extract_json_value(data, self.json_path)
-            except json.JSONDecodeError:
-                logger.error("Failed to decode JSON")
-        else:
-            self.value = float(payload)
+    def stop(self):
+        for phase_topic in self._topics:
+            mqtt_client.unsubscribe(self._shared, phase_topic, self.on_message)
 
-    def get_powermeter_watts(self):
-        if self.value is not None:
-            return [self.value]
-        else:
-            raise ValueError("No value received from MQTT")
+    def on_message(self, topic: str, payload: bytes):
+        phases = self._topics.get(topic)
+        if phases is None:
+            # Delivered through a wildcard subscription
+            phases = [
+                phase
+                for subscription, entries in self._topics.items()
+                for phase in entries
+                if topic_matches_sub(subscription, topic)
+            ]
+        text = payload.decode()
+        data = None
+        updates = []
+        for phase, path in phases:
+            if path is None:
+                updates.append((phase, float(text)))
+                continue
+            if data is None:
+                try:
+                    data = json.loads(text)
+                except json.JSONDecodeError:
+                    logger.error("Failed to decode JSON")
+                    return
+            updates.append((phase, path.extract(data)))
 
-    def wait_for_message(self, timeout=5):
-        start_time = time.time()
-        while self.value is None:
-            if time.time() - start_time > timeout:
-                raise TimeoutError("Timeout waiting for MQTT message")
-            time.sleep(1)
+        now = time.monotonic()
+        with self._lock:
+            for phase, value in updates:
+                self.values[phase] = value
+                self._received_at[phase] = now
+                self._refreshed.add(phase)
+            if None in self.values:
+                return
+            self.ready.set()
+            if now - min(self._received_at) > self.phase_window:
+                return
+            self._consistent = list(self.values)
+            if len(self._refreshed) < len(self.phases):
+                return
+            self._refreshed = set()
+            values = list(self.values)
+        self.publish(values)
+
+    def get_powermeter_watts(self):
+        if None in self.values:
+            self.ready.wait(self.request_timeout())
+        with self._lock:
+            if None in self.values:
+                raise ValueError("No value received from MQTT")
+            if time.monotonic() - min(self._received_at) <= self.phase_window:
+                return list(self.values)
+            values = self._consistent
+        if values is None:
+            raise ValueError(
+                f"No MQTT phase values received within {self.phase_window}s "
+                "of each other"
+            )
+        return values
@@ -0,0 +1,129 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+import paho.mqtt.client as mqtt
+from config.logger import logger
+
+# Receives the topic and raw payload of every message on a subscribed topic
+MessageHandler = Callable[[str, bytes], None]
+
+
+class SharedMqttClient:
+    """
+    One broker connection shared by all powermeters using that broker.
+
+    Handlers are registered per topic (wildcards allowed) and all topics
+    are subscribed to again whenever the client reconnects. Messages are
+    dispatched on the paho network thread; an exception in one handler is
+    logged and does not affect the others or the network loop.
+    """
+
+    def __init__(
+        self,
+        broker: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+    ):
+        self.broker = broker
+        self.port = port
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+        self._lock = threading.Lock()
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        if username and password:
+            self.client.username_pw_set(username, password)
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+
+    def start(self):
+        self.client.connect(self.broker, self.port, 60)
+        self.client.loop_start()
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    @property
+    def topics(self) -> List[str]:
+        return list(self._handlers)
+
+    def add_handler(self, topic: str, handler: MessageHandler):
+        with self._lock:
+            handlers = self._handlers.get(topic, [])
+            # Replaced rather than mutated, so dispatch needs no lock
+            self._handlers = {**self._handlers, topic: handlers + [handler]}
+            first = not handlers
+        if first and self.client.is_connected():
+            self.client.subscribe(topic)
+
+    def remove_handler(self, topic: str, handler: MessageHandler) -> bool:
+        """Remove a handler; returns whether any handlers are left."""
+        with self._lock:
+            handlers = [h for h in self._handlers.get(topic, []) if h != handler]
+            remaining = dict(self._handlers)
+            if handlers:
+                remaining[topic] = handlers
+            else:
+                remaining.pop(topic, None)
+            self._handlers = remaining
+            last = not handlers
+        if last and self.client.is_connected():
+            self.client.unsubscribe(topic)
+        return bool(remaining)
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        logger.info(f"Connected to {self.broker} with result code {reason_code}")
+        topics = self.topics
+        if topics:
+            client.subscribe([(topic, 0) for topic in topics])
+
+    def _on_message(self, client, userdata, msg):
+        handlers = self._handlers
+        matched = handlers.get(msg.topic, [])
+        for topic, topic_handlers in handlers.items():
+            if topic != msg.topic and mqtt.topic_matches_sub(topic, msg.topic):
+                matched = matched + topic_handlers
+        for handler in matched:
+            try:
+                handler(msg.topic, msg.payload)
+            except Exception as e:
+                logger.error(f"Error handling MQTT message on {msg.topic}: {e}")
+
+
+_clients: Dict[Tuple, SharedMqttClient] = {}
+_clients_lock = threading.Lock()
+
+
+def subscribe(
+    broker: str,
+    port: int,
+    username: Optional[str],
+    password: Optional[str],
+    topic: str,
+    handler: MessageHandler,
+) -> SharedMqttClient:
+    """
+    Register ``handler`` for ``topic`` on the shared client of the broker.
+
+    Clients are shared per broker, port and credentials and connected when
+    the first handler is registered.
+    """
+    key = (broker, port, username, password)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = SharedMqttClient(broker, port, username, password)
+            client.start()
+            _clients[key] = client
+        client.add_handler(topic, handler)
+        return client
+
+
+def unsubscribe(client: SharedMqttClient, topic: str, handler: MessageHandler):
+    """Remove a handler and disconnect the client once it has none left."""
+    with _clients_lock:
+        if client.remove_handler(topic, handler):
+            return
+        for key, shared in list(_clients.items()):
+            if shared is client:
+                del _clients[key]
+    client.stop()
@@ -1,5 +1,11 @@
+import json
+import threading
+import time
 import unittest
-from .mqtt import extract_json_value
+from types import SimpleNamespace
+from unittest.mock import patch
+from .mqtt import MqttPowermeter, extract_json_value
+from . import mqtt_client
 
 
 class TestExtractJsonValue(unittest.TestCase):
@@ -41,5 +47,115 @@ class TestExtractJsonValue(unittest.TestCase):
         self.assertEqual(extract_json_value(data, path), 200.75)
 
 
+@patch("paho.mqtt.client.Client")
+class TestMqttPowermeter(unittest.TestCase):
+    def create(self, *args, **kwargs):
+        powermeter = MqttPowermeter("broker", 1883, *args, **kwargs)
+        self.addCleanup(powermeter.stop)
+        return powermeter
+
+    def deliver(self, powermeter, topic, payload):
+        message = SimpleNamespace(topic=topic, payload=payload.encode())
+        powermeter._shared._on_message(powermeter.client, None, message)
+
+    def test_sections_share_one_client_per_broker(self, client_class):
+        first = self.create("meter/l1")
+        second = self.create("meter/l2", username="user", password="pass")
+        third = self.create("meter/l3")
+        self.assertIs(first._shared, third._shared)
+        self.assertIsNot(first._shared, second._shared)
+        self.assertEqual(first._shared.topics, ["meter/l1", "meter/l3"])
+        self.assertEqual(first.client.connect.call_count, 2)
+
+        third.stop()
+        first.client.unsubscribe.assert_called_with("meter/l3")
+        first.stop()
+        first.client.disconnect.assert_called()
+        self.assertNotIn(first._shared, mqtt_client._clients.values())
+
+    def test_phases_from_several_topics(self, client_class):
+        powermeter = self.create(
+            "",
+            topics=[
+                ("meter/l1", "$.power"),
+                ("meter/l2", "$.power"),
+                ("meter/l3", None),
+            ],
+        )
+        published = []
+        powermeter.subscribe(published.append)
+
+        self.deliver(powermeter, "meter/l1", json.dumps({"power": 100}))
+        self.deliver(powermeter, "meter/l2", json.dumps({"power": 200}))
+        self.assertEqual(published, [])
+        self.deliver(powermeter, "meter/l3", "300")
+        self.assertEqual(published, [[100.0, 200.0, 300.0]])
+        self.assertEqual(powermeter.get_powermeter_watts(), [100.0, 200.0, 300.0])
+
+        # A new reading needs every phase to be refreshed again
+        self.deliver(powermeter, "meter/l1", json.dumps({"power": 110}))
+        self.deliver(powermeter, "meter/l1", json.dumps({"power": 120}))
+        self.assertEqual(len(published), 1)
+        self.deliver(powermeter, "meter/l2", json.dumps({"power": 210}))
+        self.deliver(powermeter, "meter/l3", "310")
+        self.assertEqual(published[-1], [120.0, 210.0, 310.0])
+
+    def test_phases_outside_window_are_not_published(self, client_class):
+        powermeter = self.create(
+            "", topics=[("meter/l1", None), ("meter/l2", None)], phase_window=0.0
+        )
+        published = []
+        powermeter.subscribe(published.append)
+        self.deliver(powermeter, "meter/l1", "1")
+        self.deliver(powermeter, "meter/l2", "2")
+        self.assertEqual(published, [])
+        with self.assertRaises(ValueError):
+            powermeter.get_powermeter_watts()
+
+    def test_reads_return_last_consistent_phases(self, client_class):
+        powermeter = self.create(
+            "", topics=[("meter/l1", None), ("meter/l2", None)], phase_window=0.05
+        )
+        self.deliver(powermeter, "meter/l1", "1")
+        self.deliver(powermeter, "meter/l2", "2")
+        self.assertEqual(powermeter.get_powermeter_watts(), [1.0, 2.0])
+
+        # Only one phase keeps updating, so the other one falls out of the window
+        time.sleep(0.1)
+        self.deliver(powermeter, "meter/l1", "10")
+        self.assertEqual(powermeter.get_powermeter_watts(), [1.0, 2.0])
+        self.deliver(powermeter, "meter/l2", "20")
+        self.assertEqual(powermeter.get_powermeter_watts(), [10.0, 20.0])
+
+    def test_one_topic_with_several_paths(self, client_class):
+        powermeter = self.create(
+            "",
+            topics=[("tele/meter/SENSOR", f"$.ENERGY.Power[{i}]") for i in range(3)],
+        )
+        self.assertEqual(powermeter._shared.topics, ["tele/meter/SENSOR"])
+        self.deliver(
+            powermeter,
+            "tele/meter/SENSOR",
+            json.dumps({"ENERGY": {"Power": [1, 2, 3]}}),
+        )
+        self.assertEqual(powermeter.get_powermeter_watts(), [1.0, 2.0, 3.0])
+
+    def test_wait_for_message_wakes_on_first_reading(self, client_class):
+        powermeter = self.create("meter/power")
+        with self.assertRaises(TimeoutError):
+            powermeter.wait_for_message(timeout=0.01)
+        timer = threading.Timer(0.05, self.deliver, (powermeter, "meter/power", "42"))
+        timer.start()
+        started = time.monotonic()
+        powermeter.wait_for_message(timeout=5)
+        self.assertLess(time.monotonic() - started, 1)
+        timer.join()
+
+    def test_wildcard_topic(self, client_class):
+        powermeter = self.create("meter/+/power")
+        self.deliver(powermeter, "meter/grid/power", "42")
+        self.assertEqual(powermeter.get_powermeter_watts(), [42.0])
+
+
 if __name__ == "__main__":
     unittest.main()
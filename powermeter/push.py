@@ -0,0 +1,69 @@
+import threading
+from typing import Callable, List
+from config.logger import logger
+from .base import Powermeter, ReadingCallback
+
+
+class PushPowermeter(Powermeter):
+    """
+    Base class for powermeters that receive their readings by push.
+
+    Subclasses call ``publish`` whenever a new reading arrives, which hands
+    the values to every subscriber on the publishing thread. Callbacks
+    should therefore return quickly, e.g. by only waking up an emulator.
+    Once reads can be answered from received data, typically when the first
+    complete reading is available, subclasses set the ``ready`` event,
+    which ``wait_for_message`` blocks on.
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+        self.ready = threading.Event()
+
+    def wait_for_message(self, timeout=5):
+        if not self.ready.wait(timeout):
+            raise TimeoutError(
+                f"Timeout waiting for the first {type(self).__name__} reading"
+            )
+
+    def supports_subscribe(self) -> bool:
+        return True
+
+    def subscribe(self, callback: ReadingCallback) -> Callable[[], None]:
+        with self._subscribers_lock:
+            self._subscribers = self._subscribers + [callback]
+            first = len(self._subscribers) == 1
+        if first:
+            self._on_first_subscriber()
+
+        def unsubscribe():
+            with self._subscribers_lock:
+                if callback not in self._subscribers:
+                    return
+                subscribers = list(self._subscribers)
+                subscribers.remove(callback)
+                self._subscribers = subscribers
+                last = not subscribers
+            if last:
+                self._on_last_unsubscribe()
+
+        return unsubscribe
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, values: List[float]):
+        # The list is replaced on every change, so no lock is needed to read it
+        for callback in self._subscribers:
+            try:
+                callback(values)
+            except Exception as e:
+                logger.error(f"Error in powermeter subscriber: {e}")
+
+    def _on_first_subscriber(self):
+        pass
+
+    def _on_last_unsubscribe(self):
+        pass
@@ -0,0 +1,44 @@
+import unittest
+
+from .base import Powermeter
+from .push import PushPowermeter
+from .singleflight import SingleFlightPowermeter
+from .throttling import ThrottledPowermeter
+
+
+class TestPushPowermeter(unittest.TestCase):
+    def test_publish_reaches_subscribers_until_unsubscribed(self):
+        powermeter = PushPowermeter()
+        received = []
+        unsubscribe = powermeter.subscribe(received.append)
+        powermeter.publish([1.0])
+        unsubscribe()
+        powermeter.publish([2.0])
+        self.assertEqual(received, [[1.0]])
+        self.assertEqual(powermeter.subscriber_count, 0)
+
+    def test_failing_subscriber_does_not_block_others(self):
+        powermeter = PushPowermeter()
+        received = []
+
+        def fail(values):
+            raise RuntimeError("boom")
+
+        powermeter.subscribe(fail)
+        powermeter.subscribe(received.append)
+        powermeter.publish([3.0])
+        self.assertEqual(received, [[3.0]])
+
+    def test_wrappers_pass_subscriptions_through(self):
+        source = PushPowermeter()
+        wrapped = SingleFlightPowermeter(ThrottledPowermeter(source))
+        received = []
+        self.assertTrue(wrapped.supports_subscribe())
+        wrapped.subscribe(received.append)
+        source.publish([4.0])
+        self.assertEqual(received, [[4.0]])
+        self.assertFalse(SingleFlightPowermeter(Powermeter()).supports_subscribe())
+
+
+if __name__ == "__main__":
+    unittest.main()
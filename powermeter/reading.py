@@ -0,0 +1,66 @@
+import time
+from typing import Optional, Sequence, Tuple
+
+
+class Reading:
+    """
+    One powermeter reading with the context needed to judge its freshness.
+
+    ``captured_at`` is the ``time.monotonic()`` value when the fetch
+    completed, ``latency`` how long the fetch took in seconds and ``source``
+    whether the values were fetched for this request (``LIVE``), reused
+    from an earlier fetch (``CACHED``) or taken from a background poll
+    (``POLLED``). Readings are immutable, so a single instance can be
+    handed to any number of concurrent callers.
+    """
+
+    LIVE = "live"
+    CACHED = "cached"
+    POLLED = "polled"
+
+    __slots__ = ("values", "captured_at", "latency", "source")
+
+    values: Tuple[float, ...]
+    captured_at: float
+    latency: float
+    source: str
+
+    def __init__(
+        self,
+        values: Sequence[float],
+        captured_at: float,
+        latency: float = 0.0,
+        source: str = LIVE,
+    ):
+        object.__setattr__(self, "values", tuple(values))
+        object.__setattr__(self, "captured_at", captured_at)
+        object.__setattr__(self, "latency", latency)
+        object.__setattr__(self, "source", source)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Reading is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, Reading):
+            return NotImplemented
+        return (
+            self.values == other.values
+            and self.captured_at == other.captured_at
+            and self.latency == other.latency
+            and self.source == other.source
+        )
+
+    def __hash__(self):
+        return hash((self.values, self.captured_at, self.latency, self.source))
+
+    def __repr__(self):
+        return (
+            f"Reading(values={self.values!r}, captured_at={self.captured_at!r}, "
+            f"latency={self.latency!r}, source={self.source!r})"
+        )
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.monotonic() if now is None else now) - self.captured_at
+
+    def with_source(self, source: str) -> "Reading":
+        return Reading(self.values, self.captured_at, self.latency, source)
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import Mock
+
+from .base import Powermeter
+from .reading import Reading
+from .throttling import ThrottledPowermeter
+
+
+class StaticPowermeter(Powermeter):
+    def get_powermeter_watts(self):
+        return [1.0, 2.0, 3.0]
+
+
+class TestReading(unittest.TestCase):
+    def test_reading_is_immutable(self):
+        reading = Reading([1.0, 2.0], captured_at=10.0, latency=0.5)
+        self.assertEqual(reading.values, (1.0, 2.0))
+        self.assertEqual(reading.source, Reading.LIVE)
+        self.assertEqual(reading.age(now=12.5), 2.5)
+        with self.assertRaises(AttributeError):
+            reading.values = (3.0,)
+        with self.assertRaises(AttributeError):
+            reading.extra = 1
+        cached = reading.with_source(Reading.CACHED)
+        self.assertEqual(cached.values, reading.values)
+        self.assertEqual(cached.captured_at, reading.captured_at)
+        self.assertNotEqual(cached, reading)
+
+    def test_default_get_reading_wraps_legacy_api(self):
+        reading = StaticPowermeter().get_reading()
+        self.assertEqual(reading.values, (1.0, 2.0, 3.0))
+        self.assertEqual(reading.source, Reading.LIVE)
+        self.assertGreaterEqual(reading.latency, 0)
+        self.assertLess(reading.age(), 1)
+
+    def test_throttled_fallback_is_marked_cached(self):
+        source = Mock()
+        source.get_powermeter_watts.return_value = [5.0]
+        throttled = ThrottledPowermeter(source, throttle_interval=0.01)
+        fresh = throttled.get_reading()
+        source.get_powermeter_watts.side_effect = ConnectionError("down")
+        fallback = throttled.get_reading()
+        self.assertEqual(fallback.source, Reading.CACHED)
+        self.assertEqual(fallback.values, fresh.values)
+        self.assertEqual(fallback.captured_at, fresh.captured_at)
+        # Repeated fallbacks reuse the same reading
+        self.assertIs(throttled.get_reading(), fallback)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,12 +3,18 @@ import subprocess
 
 
 class Script(Powermeter):
+    # Scripts may run as long as they need unless a timeout is configured;
+    # on timeout the script is killed
+    timeout = None
+
     def __init__(self, command: str):
         self.script = command
 
     def get_powermeter_watts(self):
         power = (
-            subprocess.check_output(self.script, shell=True)
+            subprocess.check_output(
+                self.script, shell=True, timeout=self.request_timeout()
+            )
             .decode()
             .strip()
             .split("\n")
@@ -15,7 +15,10 @@ class Shelly(Powermeter):
         url = f"http://{self.ip}{path}"
         headers = {"content-type": "application/json"}
         return self.session.get(
-            url, headers=headers, auth=(self.user, self.password), timeout=10
+            url,
+            headers=headers,
+            auth=(self.user, self.password),
+            timeout=self.request_timeout(),
         ).json()
 
     def get_rpc_json(self, path):
@@ -25,7 +28,7 @@ class Shelly(Powermeter):
             url,
             headers=headers,
             auth=HTTPDigestAuth(self.user, self.password),
-            timeout=10,
+            timeout=self.request_timeout(),
         ).json()
 
     def get_powermeter_watts(self):
@@ -0,0 +1,90 @@
+import threading
+from typing import List
+from .base import Powermeter
+from .deadline import remaining_timeout
+from .reading import Reading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent invocations into a single in-flight call.
+
+    The first caller (the leader) runs the function; callers arriving while
+    it is still running wait for it and receive the same result or
+    exception, waiting no longer than their own fetch deadline allows.
+    Once the call completes, the next caller starts a new one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._call = None
+
+    @property
+    def in_flight(self) -> bool:
+        return self._call is not None
+
+    def do(self, fn, *args, **kwargs):
+        with self._lock:
+            call = self._call
+            leader = call is None
+            if leader:
+                call = self._call = _Call()
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._call = None
+                call.done.set()
+        elif not call.done.wait(remaining_timeout(None)):
+            raise TimeoutError("Deadline for fetching the powermeter exceeded")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class SingleFlightPowermeter(Powermeter):
+    """
+    A wrapper that shares one upstream fetch between concurrent callers.
+
+    Requests arriving while a fetch of the wrapped powermeter is in flight
+    wait for that fetch instead of starting their own, so upstream traffic
+    stays constant no matter how many storages poll at the same time.
+    Plain values are taken from the shared reading, so mixing
+    ``get_powermeter_watts`` and ``get_reading`` callers still costs a
+    single fetch.
+    """
+
+    def __init__(self, wrapped_powermeter: Powermeter):
+        self.wrapped_powermeter = wrapped_powermeter
+        self._flight = SingleFlight()
+
+    def wait_for_message(self, timeout=5):
+        """Pass through to wrapped powermeter."""
+        return self.wrapped_powermeter.wait_for_message(timeout)
+
+    def supports_subscribe(self) -> bool:
+        return self.wrapped_powermeter.supports_subscribe()
+
+    def subscribe(self, callback):
+        """Pass through to wrapped powermeter."""
+        return self.wrapped_powermeter.subscribe(callback)
+
+    def get_powermeter_watts(self) -> List[float]:
+        return list(self.get_reading().values)
+
+    def get_reading(self) -> Reading:
+        return self._flight.do(self.wrapped_powermeter.get_reading)
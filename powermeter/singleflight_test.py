@@ -0,0 +1,114 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+from .base import Powermeter
+from .deadline import fetch_deadline
+from .singleflight import SingleFlightPowermeter
+
+
+class MockPowermeter(Powermeter):
+    """Powermeter whose fetch is a mock, with the default ``get_reading``."""
+
+    def __init__(self):
+        self.get_powermeter_watts = Mock()
+        self.wait_for_message = Mock()
+
+
+class TestSingleFlightPowermeter(unittest.TestCase):
+    def setUp(self):
+        self.mock_powermeter = MockPowermeter()
+        self.release = threading.Event()
+
+        def slow_fetch():
+            self.release.wait(1)
+            return [100.0, 200.0, 300.0]
+
+        self.mock_powermeter.get_powermeter_watts.side_effect = slow_fetch
+
+    def _call_concurrently(self, powermeter, count):
+        results = []
+        errors = []
+
+        def call():
+            try:
+                results.append(powermeter.get_powermeter_watts())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for t in threads:
+            t.start()
+        # Give all callers time to queue up behind the in-flight fetch
+        time.sleep(0.1)
+        self.release.set()
+        for t in threads:
+            t.join()
+        return results, errors
+
+    def test_concurrent_callers_share_one_fetch(self):
+        powermeter = SingleFlightPowermeter(self.mock_powermeter)
+        results, errors = self._call_concurrently(powermeter, 10)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [[100.0, 200.0, 300.0]] * 10)
+        self.assertEqual(self.mock_powermeter.get_powermeter_watts.call_count, 1)
+
+    def test_sequential_callers_fetch_again(self):
+        self.release.set()
+        powermeter = SingleFlightPowermeter(self.mock_powermeter)
+        powermeter.get_powermeter_watts()
+        powermeter.get_powermeter_watts()
+        self.assertEqual(self.mock_powermeter.get_powermeter_watts.call_count, 2)
+
+    def test_error_is_shared_by_waiting_callers(self):
+        def failing_fetch():
+            self.release.wait(1)
+            raise ValueError("upstream down")
+
+        self.mock_powermeter.get_powermeter_watts.side_effect = failing_fetch
+        powermeter = SingleFlightPowermeter(self.mock_powermeter)
+        results, errors = self._call_concurrently(powermeter, 5)
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 5)
+        self.assertEqual(self.mock_powermeter.get_powermeter_watts.call_count, 1)
+
+    def test_watts_and_reading_callers_share_one_fetch(self):
+        powermeter = SingleFlightPowermeter(self.mock_powermeter)
+        readings = []
+        reader = threading.Thread(
+            target=lambda: readings.append(powermeter.get_reading())
+        )
+        reader.start()
+        results, errors = self._call_concurrently(powermeter, 3)
+        reader.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [[100.0, 200.0, 300.0]] * 3)
+        self.assertEqual(list(readings[0].values), [100.0, 200.0, 300.0])
+        self.assertEqual(self.mock_powermeter.get_powermeter_watts.call_count, 1)
+
+    def test_waiting_caller_gives_up_at_its_deadline(self):
+        powermeter = SingleFlightPowermeter(self.mock_powermeter)
+        leader = threading.Thread(target=powermeter.get_powermeter_watts)
+        leader.start()
+        while not powermeter._flight.in_flight:
+            time.sleep(0.001)
+
+        started = time.monotonic()
+        with fetch_deadline(0.05):
+            with self.assertRaises(TimeoutError):
+                powermeter.get_powermeter_watts()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.release.set()
+        leader.join()
+
+    def test_wait_for_message_passthrough(self):
+        powermeter = SingleFlightPowermeter(self.mock_powermeter)
+        powermeter.wait_for_message(timeout=30)
+        self.mock_powermeter.wait_for_message.assert_called_once_with(30)
+
+
+if __name__ == "__main__":
+    unittest.main()
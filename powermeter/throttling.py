@@ -2,6 +2,8 @@ import time
 import threading
 from typing import List, Optional
 from .base import Powermeter
+from .deadline import remaining_timeout
+from .reading import Reading
 
 
 class ThrottledPowermeter(Powermeter):
@@ -13,6 +15,10 @@ class ThrottledPowermeter(Powermeter):
     too frequently, it waits for the remaining time before fetching fresh
     values, ensuring the storage always receives relatively fresh data at
     a controlled rate.
+
+    Callers never sleep while holding the lock: everyone arriving within the
+    interval waits on a condition for the next scheduled fetch, which is
+    performed by exactly one of them and shared with all the others.
     """
 
     def __init__(self, wrapped_powermeter: Powermeter, throttle_interval: float = 0.0):
@@ -28,54 +34,130 @@ class ThrottledPowermeter(Powermeter):
         self.last_update_time = 0.0
         self.last_values: Optional[List[float]] = None
         self.lock = threading.Lock()
+        self._fetched = threading.Condition(self.lock)
+        self._fetching = False
+        # Number of completed fetches and the outcome of the latest one
+        self._generation = 0
+        self._result: Optional[Reading] = None
+        self._error: Optional[Exception] = None
+        self._last_reading: Optional[Reading] = None
+        # The last reading marked as served from cache, built once per error
+        self._cached_reading: Optional[Reading] = None
 
     def wait_for_message(self, timeout=5):
         """Pass through to wrapped powermeter."""
         return self.wrapped_powermeter.wait_for_message(timeout)
 
+    def supports_subscribe(self) -> bool:
+        return self.wrapped_powermeter.supports_subscribe()
+
+    def subscribe(self, callback):
+        """Pass through to wrapped powermeter."""
+        return self.wrapped_powermeter.subscribe(callback)
+
     def get_powermeter_watts(self) -> List[float]:
-        with self.lock:
-            current_time = time.time()
-
-            # If throttling is disabled, always fetch fresh values
-            if self.throttle_interval <= 0:
-                values = self.wrapped_powermeter.get_powermeter_watts()
-                self.last_values = values
-                self.last_update_time = current_time
-                return values
-
-            # Check if enough time has passed since last update
-            time_since_last_update = current_time - self.last_update_time
-
-            if time_since_last_update < self.throttle_interval:
-                # Not enough time has passed, wait for the remaining time
-                wait_time = self.throttle_interval - time_since_last_update
+        return list(self.get_reading().values)
+
+    def get_reading(self) -> Reading:
+        # If throttling is disabled, always fetch fresh values
+        if self.throttle_interval <= 0:
+            reading = self._fetch()
+            with self.lock:
+                self._store(reading)
+            return reading
+
+        with self._fetched:
+            # Any fetch completing after this point is fresh enough
+            target = self._generation + 1
+            while self._generation < target:
+                # Never wait past the deadline of the request being served
+                time_left = self._time_left()
+                if time_left is not None and time_left <= 0:
+                    return self._expired()
+                if self._fetching:
+                    self._fetched.wait(time_left)
+                    continue
+                wait_time = self.last_update_time + self.throttle_interval
+                wait_time -= time.monotonic()
+                if wait_time <= 0:
+                    self._fetching = True
+                    break
+                if (
+                    time_left is not None
+                    and time_left < wait_time
+                    and self._last_reading is not None
+                ):
+                    # The next fetch is due after the deadline, answer now
+                    return self._expired()
                 print(
                     f"Throttling: Waiting {wait_time:.1f}s before fetching fresh values..."
                 )
-                time.sleep(wait_time)
-                current_time = time.time()  # Update current time after sleep
-
-            # Time to get fresh values (either enough time passed or we waited)
-            try:
-                values = self.wrapped_powermeter.get_powermeter_watts()
-                self.last_values = values
-                self.last_update_time = current_time
-                total_interval = current_time - (
-                    self.last_update_time - time_since_last_update
-                    if time_since_last_update < self.throttle_interval
-                    else self.last_update_time
-                )
-                print(
-                    f"Throttling: Fetched fresh values after {total_interval:.1f}s interval: {values}"
+                # Releases the lock, so other callers can queue up meanwhile
+                self._fetched.wait(
+                    wait_time if time_left is None else min(wait_time, time_left)
                 )
-                return values
-            except Exception as e:
-                print(f"Throttling: Error getting fresh values: {e}")
-                # Fall back to cached values if available, otherwise re-raise
-                if self.last_values is not None:
-                    print(
-                        f"Throttling: Using cached values due to error: {self.last_values}"
-                    )
-                    return self.last_values
-                raise
+            else:
+                return self._outcome()
+
+        # This caller performs the fetch for everybody waiting
+        try:
+            reading = self._fetch()
+            error = None
+        except Exception as e:
+            reading = None
+            error = e
+
+        with self._fetched:
+            if error is None:
+                self._store(reading)
+                print(f"Throttling: Fetched fresh values: {list(reading.values)}")
+            else:
+                print(f"Throttling: Error getting fresh values: {error}")
+            self._result = reading
+            self._error = error
+            self._generation += 1
+            self._fetching = False
+            self._fetched.notify_all()
+            return self._outcome()
+
+    @staticmethod
+    def _time_left() -> Optional[float]:
+        """Seconds until the current request's deadline, ``None`` without one."""
+        try:
+            return remaining_timeout(None)
+        except TimeoutError:
+            return 0.0
+
+    def _expired(self) -> Reading:
+        """Outcome for a caller whose deadline leaves no time to fetch."""
+        if self._last_reading is None:
+            raise TimeoutError("Deadline for fetching the powermeter exceeded")
+        return self._cached()
+
+    def _cached(self) -> Reading:
+        if self._cached_reading is None:
+            self._cached_reading = self._last_reading.with_source(Reading.CACHED)
+        return self._cached_reading
+
+    def _fetch(self) -> Reading:
+        started = time.monotonic()
+        values = self.wrapped_powermeter.get_powermeter_watts()
+        captured_at = time.monotonic()
+        return Reading(values, captured_at, captured_at - started)
+
+    def _store(self, reading: Reading):
+        self.last_values = list(reading.values)
+        # The interval runs from the start of a fetch, so a slow source is
+        # still fetched every throttle_interval seconds
+        self.last_update_time = reading.captured_at - reading.latency
+        self._last_reading = reading
+        self._cached_reading = None
+
+    def _outcome(self) -> Reading:
+        if self._error is None:
+            return self._result
+        # Fall back to cached values if available, otherwise re-raise
+        if self._last_reading is not None:
+            print(f"Throttling: Using cached values due to error: {self.last_values}")
+            return self._cached()
+        raise self._error
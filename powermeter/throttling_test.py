@@ -1,6 +1,9 @@
+import threading
 import time
 import unittest
 from unittest.mock import Mock
+from .deadline import fetch_deadline
+from .reading import Reading
 from .throttling import ThrottledPowermeter
 
 
@@ -95,6 +98,101 @@ class TestThrottledPowermeter(unittest.TestCase):
         result2 = throttled.get_powermeter_watts()
         self.assertEqual(result2, [100.0, 200.0, 300.0])
 
+    def test_concurrent_callers_share_one_fetch(self):
+        """Simultaneous callers get one upstream fetch and a bounded wait."""
+        calls = []
+
+        def slow_fetch():
+            calls.append(time.monotonic())
+            time.sleep(0.1)
+            return [float(len(calls)), 0.0, 0.0]
+
+        self.mock_powermeter.get_powermeter_watts.side_effect = slow_fetch
+        throttled = ThrottledPowermeter(self.mock_powermeter, throttle_interval=0.3)
+        self.assertEqual(throttled.get_powermeter_watts(), [1.0, 0.0, 0.0])
+
+        results = []
+        durations = []
+
+        def caller():
+            start = time.monotonic()
+            results.append(throttled.get_powermeter_watts())
+            durations.append(time.monotonic() - start)
+
+        threads = [threading.Thread(target=caller) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        # While one caller waits for the interval, the lock stays available
+        self.assertTrue(throttled.lock.acquire(timeout=0.05))
+        throttled.lock.release()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(results, [[2.0, 0.0, 0.0]] * 10)
+        # The remaining interval plus one fetch, not ten serialized fetches
+        self.assertLess(max(durations), 0.6)
+
+    def test_interval_is_measured_between_fetch_starts(self):
+        """A slow source is fetched every interval, not every interval plus latency."""
+        starts = []
+
+        def slow_fetch():
+            starts.append(time.monotonic())
+            time.sleep(0.1)
+            return [1.0, 2.0, 3.0]
+
+        self.mock_powermeter.get_powermeter_watts.side_effect = slow_fetch
+        throttled = ThrottledPowermeter(self.mock_powermeter, throttle_interval=0.2)
+        for _ in range(3):
+            throttled.get_reading()
+        spacing = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        for gap in spacing:
+            self.assertGreaterEqual(gap, 0.19)
+            self.assertLess(gap, 0.27)
+
+    def test_deadline_before_next_fetch_returns_cached_reading(self):
+        """A request due before the next fetch is answered from the cache."""
+        throttled = ThrottledPowermeter(self.mock_powermeter, throttle_interval=1.0)
+        throttled.get_reading()
+
+        start = time.monotonic()
+        with fetch_deadline(0.1):
+            reading = throttled.get_reading()
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertEqual(reading.source, Reading.CACHED)
+        self.assertEqual(list(reading.values), [100.0, 200.0, 300.0])
+        self.assertEqual(self.mock_powermeter.get_powermeter_watts.call_count, 1)
+
+    def test_expired_deadline_does_not_fetch(self):
+        """Without a cached reading an expired deadline fails without fetching."""
+        throttled = ThrottledPowermeter(self.mock_powermeter, throttle_interval=1.0)
+        with fetch_deadline(0):
+            with self.assertRaises(TimeoutError):
+                throttled.get_reading()
+        self.mock_powermeter.get_powermeter_watts.assert_not_called()
+
+    def test_wait_for_running_fetch_is_bounded_by_deadline(self):
+        """Callers joining a slow fetch give up at their deadline."""
+        release = threading.Event()
+        self.mock_powermeter.get_powermeter_watts.side_effect = lambda: (
+            release.wait(),
+            [1.0, 2.0, 3.0],
+        )[1]
+        throttled = ThrottledPowermeter(self.mock_powermeter, throttle_interval=1.0)
+        leader = threading.Thread(target=throttled.get_reading)
+        leader.start()
+        while not throttled._fetching:
+            time.sleep(0.001)
+
+        start = time.monotonic()
+        with fetch_deadline(0.1):
+            with self.assertRaises(TimeoutError):
+                throttled.get_reading()
+        self.assertLess(time.monotonic() - start, 0.5)
+        release.set()
+        leader.join()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -34,7 +34,7 @@ class TQEnergyManager(Powermeter):
     _MAX_IDLE = 60 * 30  # 30 min
 
     def __init__(self, host: str, password: str = "", *, timeout: float = 5.0) -> None:
-        self._host, self._pw, self._timeout = host.rstrip("/"), password, timeout
+        self._host, self._pw, self.timeout = host.rstrip("/"), password, timeout
         self._sess = requests.Session()
         self._serial: str | None = None
         self._last_use = 0.0
@@ -80,7 +80,9 @@ class TQEnergyManager(Powermeter):
 
     def _login(self) -> None:
         """Authenticate lazily with the device."""
-        r1 = self._sess.get(f"http://{self._host}/start.php", timeout=self._timeout)
+        r1 = self._sess.get(
+            f"http://{self._host}/start.php", timeout=self.request_timeout()
+        )
         r1.raise_for_status()
         j1 = r1.json()
 
@@ -96,7 +98,9 @@ class TQEnergyManager(Powermeter):
             payload["password"] = self._pw
 
         r2 = self._sess.post(
-            f"http://{self._host}/start.php", data=payload, timeout=self._timeout
+            f"http://{self._host}/start.php",
+            data=payload,
+            timeout=self.request_timeout(),
         )
         r2.raise_for_status()
         if r2.json().get("authentication") is not True:
@@ -104,7 +108,8 @@ class TQEnergyManager(Powermeter):
 
     def _read_live_json(self) -> dict:
         r = self._sess.get(
-            f"http://{self._host}/mum-webservice/data.php", timeout=self._timeout
+            f"http://{self._host}/mum-webservice/data.php",
+            timeout=self.request_timeout(),
         )
         if r.status_code in (401, 403):
             raise _SessionExpired
@@ -11,7 +11,7 @@ class VZLogger(Powermeter):
 
     def get_json(self):
         url = f"http://{self.ip}:{self.port}/{self.uuid}"
-        return self.session.get(url, timeout=10).json()
+        return self.session.get(url, timeout=self.request_timeout()).json()
 
     def get_powermeter_watts(self):
         return [int(self.get_json()["data"][0]["tuples"][0][1])]
@@ -1,28 +1,108 @@
+import logging
+import re
+import selectors
 import socket
 import threading
 import json
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Tuple
-from config import ClientFilter
+from typing import Any, Dict, List, Optional, Tuple
+from config import ClientFilter, PowermeterResolver
 from powermeter import Powermeter
 from config.logger import logger
+from .work_queue import SheddingWorkQueue
+
+RESPONSE_METHODS = ("EM.GetStatus", "EM1.GetStatus")
+
+# Requests as sent by the storages, e.g.
+# {"id":1,"src":"cli","method":"EM.GetStatus","params":{"id":0}}
+_COMPACT_REQUEST = re.compile(
+    rb'\{"id":(\d+),"src":"[^"\\]*","method":"([\w.]+)","params":\{"id":(\d+)\}\}\Z'
+)
+
+
+def parse_request(data: bytes) -> Tuple[Any, Optional[str], Any]:
+    """
+    Extract ``id``, ``method`` and ``params.id`` from an RPC request.
+
+    Compact requests in the layout used by the storages are matched without
+    building a dict; everything else falls back to a full JSON parse.
+    """
+    match = _COMPACT_REQUEST.match(data)
+    if match:
+        request_id, method, params_id = match.groups()
+        return int(request_id), method.decode(), int(params_id)
+
+    request = json.loads(data)
+    if not isinstance(request, dict):
+        return None, None, None
+    params = request.get("params")
+    params_id = params.get("id") if isinstance(params, dict) else None
+    return request.get("id"), request.get("method"), params_id
 
 
 class Shelly:
+    """
+    Shelly RPC-over-UDP emulator.
+
+    One instance serves every emulated Shelly device type: all UDP ports
+    are watched by a single selector thread and share one response cache
+    and worker queue, so the thread count does not grow with the number of
+    ports. Requests that waited longer than ``request_deadline`` seconds for
+    a worker are dropped, since the storage has already given up on them.
+
+    With ``reuse_port`` the sockets are bound with ``SO_REUSEPORT``, so
+    several emulator processes can listen on the same ports and the kernel
+    spreads the requests across them.
+    """
+
+    # Upper bound of datagrams received per selector wakeup
+    MAX_DATAGRAMS_PER_WAKEUP = 64
+
     def __init__(
         self,
         powermeters: List[Tuple[Powermeter, ClientFilter]],
-        udp_port: int,
-        device_id,
+        udp_port: Optional[int] = None,
+        device_id=None,
+        request_deadline: float = 1.0,
+        queue_size: int = 64,
+        workers: int = 5,
+        ports: Optional[Dict[int, str]] = None,
+        reuse_port: bool = False,
     ):
-        self._udp_port = udp_port
-        self._device_id = device_id
+        if ports is None:
+            if udp_port is None:
+                raise ValueError("Either udp_port or ports must be given")
+            ports = {udp_port: device_id}
+        if not ports:
+            raise ValueError("At least one UDP port is required")
+        if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("SO_REUSEPORT is not supported on this platform")
+        self._ports = dict(ports)
+        self._device_id = (
+            device_id if device_id is not None else next(iter(self._ports.values()))
+        )
+        self._reuse_port = reuse_port
         self._powermeters = powermeters
+        self._resolver = PowermeterResolver(powermeters)
+        self._rendered = {}
         self._udp_thread = None
         self._stop = False
         self._value_mutex = threading.Lock()
-        self._executor = ThreadPoolExecutor(max_workers=5)
+        self._work_queue = SheddingWorkQueue(
+            self._handle_request,
+            workers=workers,
+            max_size=queue_size,
+            deadline=request_deadline,
+            name="shelly",
+        )
         self._send_lock = threading.Lock()
+        self._socks = {}
+        self._wakeup_recv = None
+        self._wakeup_send = None
+        self._lifecycle = threading.RLock()
+
+    @property
+    def ports(self) -> Dict[int, str]:
+        return dict(self._ports)
 
     def _calculate_derived_values(self, power):
         decimal_point_enforcer = 0.001
@@ -35,7 +115,7 @@ class Shelly:
             1,
         )
 
-    def _create_em_response(self, request_id, powers):
+    def _create_em_response(self, request_id, powers, device_id=None):
         if len(powers) == 1:
             powers = [powers[0], 0, 0]
         elif len(powers) != 3:
@@ -54,7 +134,7 @@ class Shelly:
 
         return {
             "id": request_id,
-            "src": self._device_id,
+            "src": self._device_id if device_id is None else device_id,
             "dst": "unknown",
             "result": {
                 "a_act_power": a,
@@ -64,7 +144,7 @@ class Shelly:
             },
         }
 
-    def _create_em1_response(self, request_id, powers):
+    def _create_em1_response(self, request_id, powers, device_id=None):
         total_power = round(sum(powers), 3)
         total_power = total_power + (
             0.001 if total_power == round(total_power) or total_power == 0 else 0
@@ -72,77 +152,195 @@ class Shelly:
 
         return {
             "id": request_id,
-            "src": self._device_id,
+            "src": self._device_id if device_id is None else device_id,
             "dst": "unknown",
             "result": {
                 "act_power": total_power,
             },
         }
 
-    def _handle_request(self, sock, data, addr):
-        request_str = data.decode()
-        logger.debug(f"Received UDP message: {request_str}")
-        logger.debug(f"From: {addr[0]}:{addr[1]}")
+    def _render_responses(self, powers, device_id):
+        """Serialize all responses for one reading, without the request id."""
+        prefix_length = len(b'{"id":null')
+        return {
+            method: json.dumps(
+                create(None, powers, device_id), separators=(",", ":")
+            ).encode()[prefix_length:]
+            for method, create in (
+                ("EM.GetStatus", self._create_em_response),
+                ("EM1.GetStatus", self._create_em1_response),
+            )
+        }
 
-        try:
-            request = json.loads(request_str)
-            logger.debug(f"Parsed request: {json.dumps(request, indent=2)}")
-            if isinstance(request.get("params", {}).get("id"), int):
-                powermeter = None
-                for pm, client_filter in self._powermeters:
-                    if client_filter.matches(addr[0]):
-                        powermeter = pm
-                        break
-                if powermeter is None:
-                    logger.warning(f"No powermeter found for client {addr[0]}")
-                    return
+    def _response_bytes(self, powermeter, method, request_id, powers, device_id=None):
+        """
+        Response payload for ``method``, rendered once per new reading.
 
-                powers = powermeter.get_powermeter_watts()
+        Only the request id is patched in per reply; the rest of the payload
+        is reused for as long as the powermeter reports the same values. The
+        cache is shared by all ports, each device id is rendered on first use.
+        """
+        if device_id is None:
+            device_id = self._device_id
+        reading = tuple(powers)
+        cached = self._rendered.get(powermeter)
+        if cached is None or cached[0] != reading:
+            cached = (reading, {})
+            self._rendered[powermeter] = cached
+        tails = cached[1].get(device_id)
+        if tails is None:
+            tails = self._render_responses(powers, device_id)
+            cached[1][device_id] = tails
+        if type(request_id) is int:
+            id_bytes = str(request_id).encode()
+        else:
+            id_bytes = json.dumps(request_id).encode()
+        return b'{"id":' + id_bytes + tails[method]
 
-                if request.get("method") == "EM.GetStatus":
-                    response = self._create_em_response(request["id"], powers)
-                elif request.get("method") == "EM1.GetStatus":
-                    response = self._create_em1_response(request["id"], powers)
-                else:
-                    return
+    def _handle_request(self, sock, data, addr, device_id=None):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f"Received UDP message: {data.decode(errors='replace')}")
+            logger.debug(f"From: {addr[0]}:{addr[1]}")
+
+        try:
+            request_id, method, params_id = parse_request(data)
+            if debug:
+                logger.debug(
+                    f"Parsed request: id={request_id!r} method={method!r} "
+                    f"params.id={params_id!r}"
+                )
+            if not isinstance(params_id, int) or method not in RESPONSE_METHODS:
+                return
+
+            powermeter = self._resolver.resolve(addr[0])
+            if powermeter is None:
+                logger.warning(f"No powermeter found for client {addr[0]}")
+                return
 
-                response_json = json.dumps(response, separators=(",", ":"))
-                logger.debug(f"Sending response: {response_json}")
-                response_data = response_json.encode()
-                with self._send_lock:
-                    sock.sendto(response_data, addr)
+            reading = powermeter.get_reading()
+            response_data = self._response_bytes(
+                powermeter, method, request_id, reading.values, device_id
+            )
+            if debug:
+                logger.debug(
+                    f"Reading from {reading.source} fetch, {reading.age():.3f}s old"
+                )
+                logger.debug(f"Sending response: {response_data.decode()}")
+            with self._send_lock:
+                sock.sendto(response_data, addr)
         except json.JSONDecodeError:
             logger.error("Error: Invalid JSON")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
 
+    def _bind(self):
+        for port in self._ports:
+            if port in self._socks:
+                continue
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if self._reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            try:
+                sock.bind(("", port))
+            except OSError:
+                sock.close()
+                self._release()
+                raise
+            sock.setblocking(False)
+            self._socks[port] = sock
+
+    def _release(self):
+        for sock in self._socks.values():
+            sock.close()
+        self._socks = {}
+
+    @property
+    def stats(self):
+        return self._work_queue.stats()
+
+    def _drain(self, sock, view, device_id):
+        """Receive all queued datagrams (up to a bound) for one wakeup."""
+        buffer = view.obj
+        for _ in range(self.MAX_DATAGRAMS_PER_WAKEUP):
+            try:
+                nbytes, addr = sock.recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug(f"Error receiving UDP datagram: {e}")
+                return
+            # Workers outlive the shared buffer, so hand over an exact-size copy
+            self._work_queue.submit(sock, view[:nbytes].tobytes(), addr, device_id)
+
     def udp_server(self):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.bind(("", self._udp_port))
-        logger.info(f"Shelly emulator listening on UDP port {self._udp_port}...")
+        view = memoryview(bytearray(1024))
+        wakeup = self._wakeup_recv
+        selector = selectors.DefaultSelector()
+        for port, sock in self._socks.items():
+            selector.register(sock, selectors.EVENT_READ, self._ports[port])
+        selector.register(wakeup, selectors.EVENT_READ)
+        ports = ", ".join(str(port) for port in self._socks)
+        logger.info(f"Shelly emulator listening on UDP ports {ports}...")
 
         try:
             while not self._stop:
-                data, addr = sock.recvfrom(1024)
-                self._executor.submit(self._handle_request, sock, data, addr)
-
+                for key, _ in selector.select():
+                    if key.fileobj is wakeup:
+                        wakeup.recv(64)
+                        continue
+                    self._drain(key.fileobj, view, key.data)
         finally:
-            sock.close()
+            selector.close()
 
-    def start(self):
+    def _start(self):
         if self._udp_thread:
             return
+        self._bind()
         self._stop = False
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._work_queue.start()
         self._udp_thread = threading.Thread(target=self.udp_server)
         self._udp_thread.start()
 
-    def join(self):
-        if self._udp_thread:
-            self._udp_thread.join()
-
-    def stop(self):
+    def _halt(self):
+        """Stop the server thread, keeping the UDP sockets bound."""
         self._stop = True
+        if self._wakeup_send is not None:
+            self._wakeup_send.send(b"\0")
         if self._udp_thread:
             self._udp_thread.join()
             self._udp_thread = None
-        self._executor.shutdown(wait=True)
+        for wakeup in (self._wakeup_recv, self._wakeup_send):
+            if wakeup is not None:
+                wakeup.close()
+        self._wakeup_recv = self._wakeup_send = None
+        # Do not wait for requests blocked on a slow powermeter
+        self._work_queue.stop()
+
+    def start(self):
+        with self._lifecycle:
+            self._start()
+
+    def restart(self):
+        """Restart the emulator in-process without releasing its ports."""
+        with self._lifecycle:
+            self._halt()
+            self._start()
+
+    def join(self):
+        while True:
+            thread = self._udp_thread
+            if thread is None:
+                return
+            thread.join()
+            # Wait for a restart in progress and follow its new thread
+            with self._lifecycle:
+                if self._udp_thread is thread or self._udp_thread is None:
+                    return
+
+    def stop(self):
+        with self._lifecycle:
+            self._halt()
+            self._release()
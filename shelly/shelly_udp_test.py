@@ -1,13 +1,15 @@
 import unittest
 import socket
 import json
+import select
 import threading
 import time
 from ipaddress import IPv4Network
+from unittest.mock import Mock, patch
 
 from config import ClientFilter
 from powermeter import Powermeter, ThrottledPowermeter
-from shelly.shelly import Shelly
+from shelly.shelly import Shelly, parse_request
 
 
 class DummyPowermeter(Powermeter):
@@ -60,6 +62,194 @@ class TestShellyUDP(unittest.TestCase):
                 s.sendto(b"{}", ("127.0.0.1", port))
             shelly.stop()
 
+    def test_stop_and_restart(self):
+        pm = DummyPowermeter()
+        cf = ClientFilter([IPv4Network("127.0.0.1/32")])
+
+        tmp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        tmp.bind(("", 0))
+        port = tmp.getsockname()[1]
+        tmp.close()
+
+        shelly = Shelly([(pm, cf)], udp_port=port, device_id="test")
+        shelly.start()
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        client.settimeout(1)
+        req = {"id": 1, "src": "cli", "method": "EM1.GetStatus", "params": {"id": 0}}
+        try:
+            shelly.restart()
+            client.sendto(json.dumps(req).encode(), ("127.0.0.1", port))
+            data, _ = client.recvfrom(1024)
+            self.assertEqual(json.loads(data.decode())["id"], 1)
+
+            # No packet is needed to unblock the server
+            start = time.time()
+            shelly.stop()
+            self.assertLess(time.time() - start, 0.5)
+        finally:
+            client.close()
+            shelly.stop()
+
+    def test_one_instance_serves_all_ports(self):
+        pm = DummyPowermeter()
+        cf = ClientFilter([IPv4Network("127.0.0.1/32")])
+
+        ports = []
+        for _ in range(2):
+            tmp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            tmp.bind(("", 0))
+            ports.append(tmp.getsockname()[1])
+            tmp.close()
+
+        shelly = Shelly([(pm, cf)], ports={ports[0]: "old", ports[1]: "new"}, workers=2)
+        threads_before = set(threading.enumerate())
+        shelly.start()
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        client.settimeout(1)
+        try:
+            # One selector thread plus the shared workers, whatever the ports
+            new_threads = set(threading.enumerate()) - threads_before
+            self.assertEqual(len(new_threads), 3)
+            for port, device_id in ((ports[0], "old"), (ports[1], "new")):
+                req = {
+                    "id": port,
+                    "src": "cli",
+                    "method": "EM.GetStatus",
+                    "params": {"id": 0},
+                }
+                client.sendto(json.dumps(req).encode(), ("127.0.0.1", port))
+                data, _ = client.recvfrom(1024)
+                response = json.loads(data.decode())
+                self.assertEqual(response["id"], port)
+                self.assertEqual(response["src"], device_id)
+        finally:
+            client.close()
+            shelly.stop()
+
+    @unittest.skipUnless(hasattr(socket, "SO_REUSEPORT"), "requires SO_REUSEPORT")
+    def test_reuse_port_allows_several_instances(self):
+        tmp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        tmp.bind(("", 0))
+        port = tmp.getsockname()[1]
+        tmp.close()
+
+        first = Shelly([], udp_port=port, device_id="a", reuse_port=True)
+        second = Shelly([], udp_port=port, device_id="b", reuse_port=True)
+        first.start()
+        try:
+            second.start()
+            second.stop()
+        finally:
+            first.stop()
+
+    def test_second_instance_without_reuse_port_fails(self):
+        tmp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        tmp.bind(("", 0))
+        port = tmp.getsockname()[1]
+        tmp.close()
+
+        first = Shelly([], udp_port=port, device_id="a")
+        second = Shelly([], udp_port=port, device_id="b")
+        first.start()
+        try:
+            with self.assertRaises(OSError):
+                second.start()
+        finally:
+            first.stop()
+
+
+class TestShellyResponses(unittest.TestCase):
+    def setUp(self):
+        self.shelly = Shelly([], udp_port=0, device_id="test")
+        self.pm = DummyPowermeter()
+
+    def test_prerendered_response_matches_dict_response(self):
+        for powers in ([1.0], [0, 0, 0], [123.4, -56.0, 78.95], [5, 6]):
+            for request_id in (0, 42, "abc"):
+                for method, create in (
+                    ("EM.GetStatus", self.shelly._create_em_response),
+                    ("EM1.GetStatus", self.shelly._create_em1_response),
+                ):
+                    data = self.shelly._response_bytes(
+                        self.pm, method, request_id, powers
+                    )
+                    self.assertEqual(
+                        json.loads(data.decode()), create(request_id, powers)
+                    )
+
+    def test_rendered_once_per_reading(self):
+        self.shelly._response_bytes(self.pm, "EM.GetStatus", 1, [1.0, 2.0, 3.0])
+        rendered = self.shelly._rendered[self.pm]
+        self.shelly._response_bytes(self.pm, "EM1.GetStatus", 2, [1.0, 2.0, 3.0])
+        self.assertIs(self.shelly._rendered[self.pm], rendered)
+        self.shelly._response_bytes(self.pm, "EM.GetStatus", 3, [4.0, 2.0, 3.0])
+        self.assertIsNot(self.shelly._rendered[self.pm], rendered)
+
+    def test_parse_request(self):
+        compact = b'{"id":7,"src":"cli","method":"EM.GetStatus","params":{"id":0}}'
+        self.assertEqual(parse_request(compact), (7, "EM.GetStatus", 0))
+        spaced = json.dumps(
+            {"id": 8, "method": "EM1.GetStatus", "params": {"id": 0}, "src": "x"}
+        ).encode()
+        self.assertEqual(parse_request(spaced), (8, "EM1.GetStatus", 0))
+        self.assertEqual(parse_request(b'{"id":9}'), (9, None, None))
+        self.assertEqual(parse_request(b"[1]"), (None, None, None))
+        with self.assertRaises(json.JSONDecodeError):
+            parse_request(b"{invalid")
+
+
+class TestShellyReceive(unittest.TestCase):
+    def setUp(self):
+        self.shelly = Shelly([], udp_port=0, device_id="test")
+        self.shelly._work_queue = Mock()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.setblocking(False)
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.server.close)
+        self.addCleanup(self.client.close)
+
+    def send(self, *datagrams):
+        for datagram in datagrams:
+            self.client.sendto(datagram, self.server.getsockname())
+        select.select([self.server], [], [], 1)
+
+    def received(self):
+        return [call.args[1] for call in self.shelly._work_queue.submit.call_args_list]
+
+    def test_back_to_back_datagrams_reuse_buffer(self):
+        requests = [
+            json.dumps(
+                {"id": i, "src": "x" * (50 - 10 * i), "method": "EM.GetStatus"}
+            ).encode()
+            for i in range(5)
+        ]
+        self.send(*requests)
+
+        view = memoryview(bytearray(1024))
+        self.shelly._drain(self.server, view, "test")
+        # Shorter datagrams must not carry over the tail of longer ones
+        self.assertEqual(self.received(), requests)
+        self.assertEqual(
+            [parse_request(data)[0] for data in self.received()], list(range(5))
+        )
+
+    def test_datagram_larger_than_buffer_is_truncated(self):
+        oversized = json.dumps({"id": 1, "src": "x" * 2000}).encode()
+        request = json.dumps({"id": 2, "method": "EM.GetStatus"}).encode()
+        self.send(oversized, request)
+
+        view = memoryview(bytearray(1024))
+        self.shelly._drain(self.server, view, "test")
+        oversized_data, request_data = self.received()
+        self.assertEqual(oversized_data, oversized[:1024])
+        # The next datagram starts at the beginning of the buffer again
+        self.assertEqual(request_data, request)
+        # The truncated request is dropped without a reply or an exception
+        with patch("shelly.shelly.logger") as logger:
+            self.shelly._handle_request(self.server, oversized_data, ("x", 1))
+        logger.error.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+from config.logger import logger
+from powermeter.deadline import fetch_deadline
+
+
+class SheddingWorkQueue:
+    """
+    Bounded work queue with deadline-based load shedding.
+
+    Every item is stamped with its arrival time. Workers drop items that
+    waited longer than ``deadline`` seconds, and a full queue drops its
+    oldest item to make room for the new one, so under overload the newest
+    requests are answered quickly instead of every request being answered
+    late. The remaining deadline of a request also bounds the powermeter
+    fetches made while handling it (see ``fetch_deadline``).
+    """
+
+    _SENTINEL = object()
+
+    def __init__(
+        self,
+        handler,
+        workers: int = 5,
+        max_size: int = 64,
+        deadline: float = 1.0,
+        name: str = "worker",
+        clock=time.monotonic,
+    ):
+        self._handler = handler
+        self._workers = workers
+        self.deadline = deadline
+        self._name = name
+        self._clock = clock
+        self.max_size = max_size
+        # The bound is enforced in submit() so stop() can always enqueue
+        # its sentinels without blocking.
+        self._queue = queue.Queue()
+        self._threads = []
+        self._counter_lock = threading.Lock()
+        self.handled = 0
+        self.shed_expired = 0
+        self.shed_overflow = 0
+
+    @property
+    def shed(self) -> int:
+        return self.shed_expired + self.shed_overflow
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "handled": self.handled,
+            "shed_expired": self.shed_expired,
+            "shed_overflow": self.shed_overflow,
+        }
+
+    def start(self):
+        if self._threads:
+            return
+        for index in range(self._workers):
+            thread = threading.Thread(
+                target=self._work, name=f"{self._name}-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Ask the workers to exit without waiting for in-flight items."""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self._threads:
+            self._queue.put(self._SENTINEL)
+        self._threads = []
+
+    def submit(self, *args):
+        item = (self._clock(), args)
+        # The caller is the only producer and workers only shrink the queue,
+        # so after taking one item out there is room for the new one.
+        if self._queue.qsize() >= self.max_size:
+            try:
+                self._queue.get_nowait()
+                self._count("shed_overflow")
+            except queue.Empty:
+                pass
+        self._queue.put_nowait(item)
+
+    def _count(self, counter):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is self._SENTINEL:
+                return
+            arrival, args = item
+            age = self._clock() - arrival
+            if age > self.deadline:
+                self._count("shed_expired")
+                logger.debug(f"Dropping request that waited {age:.3f}s")
+                continue
+            try:
+                # Fetches made by the handler end with the request's deadline
+                with fetch_deadline(self.deadline - age):
+                    self._handler(*args)
+            except Exception as e:
+                logger.error(f"Error processing queued request: {e}")
+            self._count("handled")
@@ -0,0 +1,75 @@
+import threading
+import unittest
+
+from .work_queue import SheddingWorkQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSheddingWorkQueue(unittest.TestCase):
+    def test_items_are_handled(self):
+        handled = []
+        done = threading.Event()
+
+        def handler(value):
+            handled.append(value)
+            if len(handled) == 3:
+                done.set()
+
+        work_queue = SheddingWorkQueue(handler, workers=2)
+        work_queue.start()
+        try:
+            for value in range(3):
+                work_queue.submit(value)
+            self.assertTrue(done.wait(1))
+            self.assertEqual(sorted(handled), [0, 1, 2])
+        finally:
+            work_queue.stop()
+
+    def _drain(self, work_queue, handled, expected):
+        done = threading.Event()
+
+        def handler(value):
+            handled.append(value)
+            if len(handled) == expected:
+                done.set()
+
+        work_queue._handler = handler
+        work_queue.start()
+        try:
+            self.assertTrue(done.wait(1))
+        finally:
+            work_queue.stop()
+
+    def test_expired_items_are_shed(self):
+        clock = FakeClock()
+        handled = []
+        work_queue = SheddingWorkQueue(None, workers=1, deadline=1.0, clock=clock)
+        work_queue.submit("stale")
+        clock.now = 2.0
+        work_queue.submit("fresh")
+        self._drain(work_queue, handled, 1)
+
+        self.assertEqual(handled, ["fresh"])
+        self.assertEqual(work_queue.shed_expired, 1)
+
+    def test_full_queue_drops_oldest(self):
+        handled = []
+        work_queue = SheddingWorkQueue(None, workers=1, max_size=2)
+        for value in range(5):
+            work_queue.submit(value)
+        self.assertEqual(work_queue.shed_overflow, 3)
+
+        self._drain(work_queue, handled, 2)
+        self.assertEqual(handled, [3, 4])
+        self.assertEqual(work_queue.shed, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()